@@ -53,6 +53,9 @@ setup(
         'schema>=0.5.0',
         'behave>=1.2.6',
     ],
+    extras_require={
+        'msgpack': ['msgpack>=1.0.0'],
+    },
 
     entry_points={
         'console_scripts': [
@@ -26,6 +26,11 @@ def cli(args=None) -> int:
         help='Display a list of available steps (equivalent to Behave\'s --steps parameter')
     parser.add_argument('--debug-on-error', action='store_true', default=False,
                         help='Drop in a debugger in case of step failure (ipdb if available)')
+    parser.add_argument('--jobs', metavar='jobs', type=int, default=1,
+                        help='Number of processes used to execute the features (default: 1)')
+    parser.add_argument('--cache-given-steps', action='store_true', default=False,
+                        help='Restore the state reached after the leading "given" steps of a '
+                             'scenario for later scenarios with the same steps')
 
     args, parameters = parser.parse_known_args(args)
     if args.show_steps:
@@ -43,7 +48,9 @@ def cli(args=None) -> int:
         step_filepaths=args.steps,
         property_statecharts=property_statecharts,
         debug_on_error=args.debug_on_error,
-        behave_parameters=parameters
+        behave_parameters=parameters,
+        jobs=args.jobs,
+        cache_given_steps=args.cache_given_steps,
     )
 
 
@@ -1,4 +1,18 @@
+import copy
+
 from sismic.helpers import log_trace
+from sismic.testing import TraceIndex
+
+
+# Modules defining the predefined steps (and the ones of map_action), the only ones that are
+# cached, as other steps may affect Behave's context
+_STEPS_MODULES = ('sismic.bdd.steps', 'sismic.bdd.wrappers')
+
+
+def before_all(context):
+    # Cache of interpreters (and their trace) after the leading "given" steps of a scenario
+    if context.config.userdata.get('cache_given_steps'):
+        context._given_cache = {}
 
 
 def before_scenario(context, scenario):
@@ -11,14 +25,39 @@ def before_scenario(context, scenario):
     context.trace = log_trace(context.interpreter)
     context._monitoring = False
     context.monitored_trace = None
+    context._monitored_index = None
 
     # Bind property statecharts
     for property_statechart in context.config.userdata.get('property_statecharts'):
         context.interpreter.bind_property_statechart(
             property_statechart, interpreter_klass=interpreter_klass)
 
+    # Restore the longest cached prefix of leading "given" steps
+    context._cached_steps = []
+    context._skipped_step = False
+    context._cacheable = bool(context.config.userdata.get('cache_given_steps'))
+    if context.config.userdata.get('cache_given_steps'):
+        steps = _given_steps(context, scenario)
+        context._given_steps = steps
+        for i in range(len(steps), 0, -1):
+            cached = context._given_cache.get(_given_key(scenario, steps[:i]))
+            if cached is not None:
+                interpreter, trace = cached
+                context.interpreter = _copy_interpreter(context, interpreter)
+                context.trace = log_trace(context.interpreter)
+                context.trace.extend(trace)
+                context._cached_steps = steps[:i]
+                break
+
 
 def before_step(context, step):
+    # Steps whose effects were restored from the cache are skipped
+    context._skipped_step = any(step is cached for cached in context._cached_steps)
+
+    # Do not cache steps that (directly or not) execute steps defined by the user
+    if context._cacheable and not _is_predefined(context, step):
+        context._cacheable = False
+
     # "Then" steps must at least follow one "when" step
     if step.step_type == 'then':
         # Stop monitoring
@@ -30,10 +69,22 @@ def before_step(context, step):
 
 
 def after_step(context, step):
+    if context._skipped_step:
+        context._skipped_step = False
+        return
+
     # "Given" triggers execution
     if step.step_type == 'given':
         context.interpreter.execute()
 
+        # Cache the interpreter after the last leading "given" step
+        steps = getattr(context, '_given_steps', None)
+        if steps and step is steps[-1] and step.status == 'passed' and context._cacheable:
+            key = _given_key(context.scenario, steps)
+            if key not in context._given_cache:
+                context._given_cache[key] = (
+                    _copy_interpreter(context, context.interpreter), list(context.trace))
+
     # "When" triggers monitored execution
     if step.step_type == 'when':
         macrosteps = context.interpreter.execute()
@@ -41,8 +92,11 @@ def after_step(context, step):
         if not context._monitoring:
             context._monitoring = True
             context.monitored_trace = []
+            context._monitored_index = TraceIndex(context.monitored_trace)
 
+        # Index the monitored trace as it grows, for the predefined "then" steps
         context.monitored_trace.extend(macrosteps)
+        context._monitored_index.update()
 
     # Hook to enable debugging
     if step.step_type == 'then' and step.status == 'failed' and context.config.userdata.get(
@@ -61,3 +115,59 @@ def after_step(context, step):
         print('--------------------------------------------------------------')
 
         pdb.post_mortem(step.exc_traceback)
+
+
+def _is_predefined(context, step):
+    """
+    Return True if given step is implemented by a predefined step of sismic, or by a step
+    defined with *map_action*.
+    """
+    definition = context._runner.step_registry.find_step_definition(step)
+    return definition is not None and getattr(definition.func, '__module__', None) in _STEPS_MODULES
+
+
+def _given_steps(context, scenario):
+    """
+    Return the leading "given" steps of given scenario, including the ones of its background,
+    that are implemented by predefined steps (see *_is_predefined*).
+    """
+    steps = []
+    for step in scenario.all_steps:
+        if step.step_type != 'given' or not _is_predefined(context, step):
+            break
+        steps.append(step)
+    return steps
+
+
+def _given_key(scenario, steps):
+    """
+    Return a hashable key for given steps. Steps of distinct features are never shared,
+    as they may refer to their feature (e.g., 'I reproduce "..."').
+    """
+    key = [scenario.feature.filename]
+    for step in steps:
+        table = None
+        if step.table is not None:
+            table = (tuple(step.table.headings), tuple(tuple(row.cells) for row in step.table))
+        key.append((step.name, step.text, table))
+    return tuple(key)
+
+
+def _copy_interpreter(context, interpreter):
+    """
+    Return a deep copy of given interpreter, that shares its statechart and property
+    statecharts, and whose execute_once is not logged anymore.
+    """
+    memo = {}
+    statecharts = [context.config.userdata.get('statechart')]
+    statecharts.extend(context.config.userdata.get('property_statecharts'))
+    for statechart in statecharts:
+        memo[id(statechart)] = statechart
+
+    # Remove the wrapper set by log_trace, if any
+    logger = vars(interpreter).pop('execute_once', None)
+    try:
+        return copy.deepcopy(interpreter, memo)
+    finally:
+        if logger is not None:
+            interpreter.execute_once = logger
@@ -2,6 +2,14 @@ from behave import given, when, then  # type: ignore
 from .. import testing
 
 
+def _skipped(context):
+    """
+    Return True if the current "given" step must be skipped, as its effects were restored
+    from the cache (see *cache_given_steps* in *sismic.bdd.execute_bdd*).
+    """
+    return getattr(context, '_skipped_step', False)
+
+
 @given('I do nothing')
 @when('I do nothing')
 def do_nothing(context):
@@ -10,6 +18,9 @@ def do_nothing(context):
 
 @given('I reproduce "{scenario}"')
 def reproduce_scenario(context, scenario, *, keyword='Given'):
+    if _skipped(context):
+        return
+
     current_feature = context.feature
     for included_scenario in current_feature.scenarios:
         if included_scenario.name == scenario:
@@ -27,6 +38,9 @@ def _reproduce_scenario(context, scenario):
 
 @given('I repeat "{step}" {repeat:d} times')
 def repeat_step(context, step, repeat, *, keyword='Given'):
+    if _skipped(context):
+        return
+
     for _ in range(repeat):
         context.execute_steps('{} {}'.format(keyword, step))
 
@@ -41,6 +55,9 @@ def _repeat_step(context, step, repeat):
 @when('I send event {name}')
 @when('I send event {name} with {parameter}={value}')
 def send_event(context, name, parameter=None, value=None):
+    if _skipped(context):
+        return
+
     parameters = {}
     if context.table:
         for row in context.table:
@@ -57,6 +74,9 @@ def send_event(context, name, parameter=None, value=None):
 @when('I wait {seconds:g} seconds')
 @when('I wait {seconds:g} second')
 def wait(context, seconds):
+    if _skipped(context):
+        return
+
     context.interpreter.clock.time += seconds
 
 
@@ -65,7 +85,7 @@ def state_is_entered(context, name):
     # Check that state exists
     context.interpreter.statechart.state_for(name)
 
-    test = testing.state_is_entered(context.monitored_trace, name)
+    test = _monitored_index(context).state_is_entered(name)
     assert test, 'State {} is not entered'.format(name)
 
 
@@ -74,7 +94,7 @@ def state_is_not_entered(context, name):
     # Check that state exists
     context.interpreter.statechart.state_for(name)
 
-    test = not testing.state_is_entered(context.monitored_trace, name)
+    test = not _monitored_index(context).state_is_entered(name)
     assert test, 'State {} is entered'.format(name)
 
 
@@ -83,7 +103,7 @@ def state_is_exited(context, name):
     # Check that state exists
     context.interpreter.statechart.state_for(name)
 
-    test = testing.state_is_exited(context.monitored_trace, name)
+    test = _monitored_index(context).state_is_exited(name)
     assert test, 'State {} is not exited'.format(name)
 
 
@@ -92,7 +112,7 @@ def state_is_not_exited(context, name):
     # Check that state exists
     context.interpreter.statechart.state_for(name)
 
-    test = not testing.state_is_exited(context.monitored_trace, name)
+    test = not _monitored_index(context).state_is_exited(name)
     assert test, 'State {} is exited'.format(name)
 
 
@@ -123,7 +143,7 @@ def event_is_fired(context, name, parameter=None, value=None):
     if parameter and value:
         parameters[parameter.strip()] = eval(value.strip(), {}, {})
 
-    test = testing.event_is_fired(context.monitored_trace, name, parameters)
+    test = _monitored_index(context).event_is_fired(name, parameters)
 
     if len(parameters) == 0:
         assert test, 'Event {} is not fired'.format(name)
@@ -133,19 +153,17 @@ def event_is_fired(context, name, parameter=None, value=None):
 
 @then('event {name} is not fired')
 def event_is_not_fired(context, name):
-    test = not testing.event_is_fired(context.monitored_trace, name)
+    test = not _monitored_index(context).event_is_fired(name)
     assert test, 'Event {} is fired'.format(name)
 
 
 @then('no event is fired')
 def no_event_is_fired(context):
-    for macrostep in context.monitored_trace:
-        if len(macrostep.sent_events) > 0:
-            if len(macrostep.sent_events) > 1:
-                assert False, 'Events {} are fired'.format(
-                    ', '.join([e.name for e in macrostep.sent_events]))
-            else:
-                assert False, 'Event {} is fired'.format(macrostep.sent_events[0].name)
+    sent_events = _monitored_index(context).first_sent_events
+    if len(sent_events) > 1:
+        assert False, 'Events {} are fired'.format(', '.join([e.name for e in sent_events]))
+    elif len(sent_events) == 1:
+        assert False, 'Event {} is fired'.format(sent_events[0].name)
 
 
 @then('variable {variable} equals {value}')
@@ -189,3 +207,14 @@ def final_configuration(context):
 def not_final_configuration(context):
     assert not context.interpreter.final, 'Statechart is in a final configuration: {}'.format(
         ', '.join(context.interpreter.configuration))
+
+
+def _monitored_index(context) -> testing.TraceIndex:
+    """
+    Return the index of the monitored trace maintained by the environment, or a new one
+    if the monitored trace was set otherwise.
+    """
+    index = getattr(context, '_monitored_index', None)
+    if not isinstance(index, testing.TraceIndex) or index.trace is not context.monitored_trace:
+        index = testing.TraceIndex(context.monitored_trace)
+    return index
@@ -1,8 +1,13 @@
+import contextlib
+import io
 import os
+import re
 import shutil
+import sys
 import tempfile
 
-from typing import Union, List, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Union
 from behave import given, when, then
 from behave.__main__ import run_behave
 from behave.configuration import Configuration
@@ -34,7 +39,9 @@ def map_action(step_text: str, existing_step_or_steps: Union[str, List[str]]) ->
 
     @given(step_text)
     def _(context, **kwargs):
-        context.execute_steps('Given ' + existing_step_or_steps.format(**kwargs))
+        # Skipped if its effects were restored from the cache (see execute_bdd)
+        if not getattr(context, '_skipped_step', False):
+            context.execute_steps('Given ' + existing_step_or_steps.format(**kwargs))
 
     @when(step_text)
     def _(context, **kwargs):
@@ -68,10 +75,25 @@ def execute_bdd(statechart: Statechart,
                 property_statecharts: List[Statechart] = None,
                 interpreter_klass: Callable[[Statechart], Interpreter] = Interpreter,
                 debug_on_error: bool = False,
-                behave_parameters: List[str] = None) -> int:
+                behave_parameters: List[str] = None,
+                jobs: int = 1,
+                cache_given_steps: bool = False) -> int:
     """
     Execute BDD tests for a statechart.
 
+    If *jobs* is greater than 1, feature files are distributed among (at most) *jobs* worker
+    processes, balancing their size. Each worker loads the statechart once and executes its
+    feature files with Behave. Their outputs are displayed in turn once they are all done,
+    followed by the merged summary of their results. This is not supported with
+    *debug_on_error*, in which case a single process is used.
+
+    If *cache_given_steps* is True, the interpreter is copied after the leading "given" steps
+    of a scenario (including the ones of its background). Later scenarios of the same feature
+    that start with the same steps restore this copy instead, and these steps are skipped.
+    Only the predefined steps and the ones defined with *map_action* are cached, as other
+    steps may affect Behave's context: the cached steps end before the first other step, and
+    are not cached if they execute other steps (e.g., using 'I reproduce "..."').
+
     :param statechart: statechart to test
     :param feature_filepaths: list of filepaths to feature files.
     :param step_filepaths: list of filepaths to step definitions.
@@ -81,13 +103,28 @@ def execute_bdd(statechart: Statechart,
     :param debug_on_error: set to True to drop to (i)pdb in case of error.
     :param behave_parameters: additional CLI parameters used by Behave
         (see http://behave.readthedocs.io/en/latest/behave.html#command-line-arguments)
-    :return: exit code of behave CLI.
+    :param jobs: number of worker processes used to execute the feature files.
+    :param cache_given_steps: set to True to restore the interpreter from a cache for
+        scenarios starting with the same "given" steps.
+    :return: exit code of behave CLI (the highest one if several processes are used).
     """
     # Default values
     step_filepaths = step_filepaths if step_filepaths else []
     property_statecharts = property_statecharts if property_statecharts else []
     behave_parameters = behave_parameters if behave_parameters else []
 
+    if jobs > 1 and not debug_on_error:
+        groups = _partition(_feature_files(feature_filepaths), jobs)
+        if len(groups) > 1:
+            return _execute_bdd_jobs(groups, dict(
+                statechart=statechart,
+                step_filepaths=step_filepaths,
+                property_statecharts=property_statecharts,
+                interpreter_klass=interpreter_klass,
+                behave_parameters=behave_parameters,
+                cache_given_steps=cache_given_steps,
+            ))
+
     # If debug_on_error, disable captured stdout, otherwise it hangs
     if debug_on_error and '--capture' not in behave_parameters:
         behave_parameters.append('--no-capture')
@@ -126,7 +163,87 @@ def execute_bdd(statechart: Statechart,
             'interpreter_klass': interpreter_klass,
             'property_statecharts': property_statecharts,
             'debug_on_error': debug_on_error,
+            'cache_given_steps': cache_given_steps,
         })
 
         # Run behave
         return run_behave(config)
+
+
+def _feature_files(filepaths: List[str]) -> List[str]:
+    """
+    Return given paths, where directories are replaced by the feature files they contain.
+    """
+    files = []
+    for filepath in filepaths:
+        if os.path.isdir(filepath):
+            for dirpath, _, filenames in sorted(os.walk(filepath)):
+                files.extend(os.path.join(dirpath, filename) for filename in sorted(filenames)
+                             if filename.endswith('.feature'))
+        else:
+            files.append(filepath)
+    return files
+
+
+def _partition(filepaths: List[str], jobs: int) -> List[List[str]]:
+    """
+    Distribute given feature files among at most *jobs* groups, balancing the total size of
+    the files of each group. The order of the files is kept in each group.
+    """
+    def size(filepath):
+        # Behave accepts "path:line" to select scenarios
+        return os.path.getsize(filepath) if os.path.isfile(filepath) else 0
+
+    groups = [[] for _ in range(min(jobs, len(filepaths)))]  # type: List[List[int]]
+    loads = [0] * len(groups)
+    for index in sorted(range(len(filepaths)), key=lambda i: -size(filepaths[i])):
+        smallest = loads.index(min(loads))
+        groups[smallest].append(index)
+        loads[smallest] += size(filepaths[index])
+    return [[filepaths[index] for index in sorted(group)] for group in groups if group]
+
+
+def _execute_bdd_job(args: Tuple[List[str], Mapping[str, Any]]) -> Tuple[int, str]:
+    """
+    Execute given feature files, and return the exit code and the output of Behave.
+    This is the task executed by worker processes.
+    """
+    feature_filepaths, kwargs = args
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        code = execute_bdd(feature_filepaths=feature_filepaths, **kwargs)
+    return code, output.getvalue()
+
+
+# Summary lines of Behave, e.g. "2 scenarios passed, 1 failed, 0 skipped"
+_SUMMARY_LINE = re.compile(r'^(\d+) (feature|scenario|step)s? passed((?:, \d+ \w+)*)$')
+
+
+def _execute_bdd_jobs(groups: List[List[str]], kwargs: Mapping[str, Any]) -> int:
+    """
+    Execute each group of feature files in a worker process, display their outputs and the
+    merged summary of their results, and return the highest exit code.
+    """
+    with ProcessPoolExecutor(len(groups)) as executor:
+        results = list(executor.map(_execute_bdd_job, [(group, kwargs) for group in groups]))
+
+    # Sum the counters of the summaries, by kind (feature, scenario, step) and by status
+    summary = {}  # type: Dict[str, Dict[str, int]]
+    for _, output in results:
+        sys.stdout.write(output)
+        for line in output.splitlines():
+            match = _SUMMARY_LINE.match(line.strip())
+            if match:
+                counters = summary.setdefault(match.group(2), {})
+                counters['passed'] = counters.get('passed', 0) + int(match.group(1))
+                for count, status in re.findall(r'(\d+) (\w+)', match.group(3)):
+                    counters[status] = counters.get(status, 0) + int(count)
+
+    print('\nMerged results of {} jobs:'.format(len(groups)))
+    for kind, counters in summary.items():
+        passed = counters.pop('passed')
+        print('{} {}{} passed{}'.format(
+            passed, kind, '' if passed == 1 else 's',
+            ''.join(', {} {}'.format(count, status) for status, count in counters.items())))
+
+    return max(code for code, _ in results)
@@ -1,5 +1,6 @@
 from .evaluator import Evaluator
 from .dummy import DummyEvaluator
 from .python import PythonEvaluator
+from .profiling import Profiler, ProfilingEvaluator
 
-__all__ = ['Evaluator', 'DummyEvaluator', 'PythonEvaluator']
+__all__ = ['Evaluator', 'DummyEvaluator', 'PythonEvaluator', 'Profiler', 'ProfilingEvaluator']
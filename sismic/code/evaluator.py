@@ -86,6 +86,27 @@ class Evaluator(metaclass=abc.ABCMeta):
             return self._evaluate_code(transition.guard, additional_context={'event': event})
         return None
 
+    def track_deadlines(self) -> None:
+        """
+        Notify that *next_deadline* will be called after the next evaluations of eventless
+        guards. This method is called by *Interpreter.run_until* before executing the
+        statechart, so that the work needed to predict deadlines is only done if they are
+        needed. By default, it does nothing.
+        """
+
+    def next_deadline(self, transitions: Iterable[Transition]) -> Optional[float]:
+        """
+        Return the earliest time at which the guard of one of given eventless transitions could
+        become true only because time elapsed, if it can be predicted.
+        This method is used by *Interpreter.run_until* to advance a simulated clock.
+
+        By default, None is returned.
+
+        :param transitions: eventless transitions whose guards were evaluated during the last step
+        :return: a time value or None
+        """
+        return None
+
     def execute_action(self, transition: Transition, event: Optional[Event] = None) -> List[Event]:
         """
         Execute the action for given transition.
@@ -0,0 +1,227 @@
+import marshal
+
+from time import perf_counter
+from types import CodeType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .python import PythonEvaluator, _compile
+from ..model import Event, Statechart, StateMixin, Transition
+
+__all__ = ['Profiler', 'ProfilingEvaluator']
+
+
+class Profiler:
+    """
+    Collect the time spent in each piece of code of a statechart (guards, actions, on entry,
+    on exit, contracts and preamble), the number of times it was executed or evaluated, and the
+    number of times it raised an exception.
+
+    Pieces of code are identified by a label describing the element they belong to,
+    e.g. *state s1: on entry* or *transition s1 -> s2 [x > 1]: guard*.
+    A profiler is populated by *ProfilingEvaluator* instances, and can be shared by several
+    of them to aggregate their measures.
+    """
+
+    def __init__(self) -> None:
+        self._stats = {}  # type: Dict[str, List[Any]]
+
+    def record(self, label: str, duration: float, exception: bool = False) -> None:
+        """
+        Record an execution or an evaluation of the piece of code identified by given label.
+
+        :param label: label of the piece of code
+        :param duration: time spent, in seconds
+        :param exception: True if an exception was raised
+        """
+        stats = self._stats.get(label, None)
+        if stats is None:
+            stats = self._stats[label] = [0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += duration
+        if exception:
+            stats[2] += 1
+
+    @property
+    def stats(self) -> Mapping[str, Tuple[int, float, int]]:
+        """
+        A mapping between labels and triples (calls, time, exceptions), where *calls* is
+        the number of executions or evaluations, *time* is the total time spent (in seconds)
+        and *exceptions* is the number of raised exceptions.
+        """
+        return {label: (s[0], s[1], s[2]) for label, s in self._stats.items()}
+
+    def reset(self) -> None:
+        """
+        Discard all the measures.
+        """
+        self._stats.clear()
+
+    def ranking(self) -> List[Tuple[str, int, float, int]]:
+        """
+        Return a list of (label, calls, time, exceptions), ordered by decreasing time.
+        """
+        return sorted(
+            ((label, s[0], s[1], s[2]) for label, s in self._stats.items()),
+            key=lambda e: (-e[2], e[0])
+        )
+
+    def report(self, limit: int = None) -> str:
+        """
+        Return a textual report of the measures, ranked by decreasing time.
+
+        :param limit: maximal number of pieces of code to include, if provided.
+        :return: a textual report
+        """
+        lines = ['{:>12} {:>8} {:>12} {:>8}  {}'.format(
+            'time (ms)', 'calls', 'per call', 'errors', 'element')]
+        for label, calls, time, exceptions in self.ranking()[:limit]:
+            lines.append('{:>12.3f} {:>8} {:>12.3f} {:>8}  {}'.format(
+                time * 1000, calls, time * 1000 / calls, exceptions, label))
+        return '\n'.join(lines)
+
+    def dump_stats(self, filepath: str) -> None:
+        """
+        Save the measures in a file that can be loaded by *pstats.Stats*.
+        Each piece of code is reported as a function whose file name is its label.
+
+        :param filepath: path to the file
+        """
+        stats = {}
+        for label, calls, time, _ in self.ranking():
+            stats[(label, 1, '<code>')] = (calls, calls, time, time, {})
+        with open(filepath, 'wb') as f:
+            marshal.dump(stats, f)
+
+
+def _element_label(element: Any) -> str:
+    """
+    Return a label identifying given state or transition.
+    """
+    if isinstance(element, Transition):
+        if element.internal:
+            label = 'transition {} (internal)'.format(element.source)
+        else:
+            label = 'transition {} -> {}'.format(element.source, element.target)
+        if element.event:
+            label += ' on {}'.format(element.event)
+        if element.guard:
+            label += ' [{}]'.format(element.guard)
+        return label
+    elif isinstance(element, Statechart):
+        return 'statechart {}'.format(element.name)
+    else:
+        return 'state {}'.format(element.name)
+
+
+class ProfilingEvaluator(PythonEvaluator):
+    """
+    A *PythonEvaluator* that measures the time spent in each piece of code of the statechart.
+
+    Measures are collected by a *Profiler*. Code is compiled with a file name that identifies the
+    element it belongs to, so that tracebacks and profilers (e.g., *cProfile*) report these
+    elements instead of *<string>*.
+
+    Use *functools.partial* to provide a profiler to an *Interpreter*, e.g.:
+    *Interpreter(statechart, evaluator_klass=partial(ProfilingEvaluator, profiler=profiler))*.
+
+    :param interpreter: the interpreter that will use this evaluator,
+        is expected to be an *Interpreter* instance
+    :param initial_context: a dictionary that will be used as *__locals__*
+    :param profiler: the *Profiler* instance to populate. A new one is created if not provided.
+    :param kwargs: additional parameters for *PythonEvaluator*.
+    """
+
+    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any] = None,
+                 profiler: Profiler = None, **kwargs) -> None:
+        self.profiler = Profiler() if profiler is None else profiler
+        self._label = '<string>'  # Label of the code being executed or evaluated
+        self._contract_prefix = None  # type: Optional[str]
+        super().__init__(interpreter, initial_context=initial_context, **kwargs)
+
+    def _compile_code(self, code: str, mode: str) -> CodeType:
+        return _compile(code, mode, self._label)
+
+    def _measured(self, label: str, func, *args, **kwargs):
+        """
+        Call *func* with given arguments, and record its duration with given label.
+        """
+        previous, self._label = self._label, label
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.profiler.record(label, perf_counter() - start, True)
+            raise
+        else:
+            self.profiler.record(label, perf_counter() - start)
+            return result
+        finally:
+            self._label = previous
+
+    def _measured_conditions(self, element: Any, kind: str,
+                             conditions: Iterable[str]) -> Iterator[str]:
+        """
+        Lazily iterate over the unsatisfied conditions returned by an evaluate_* method,
+        and measure the evaluation of each condition.
+        """
+        iterator = iter(conditions)
+        prefix = '{}: {} '.format(_element_label(element), kind)
+        while True:
+            previous, self._contract_prefix = self._contract_prefix, prefix
+            try:
+                condition = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._contract_prefix = previous
+            yield condition
+
+    def _evaluate_code(self, code: Optional[str], *,
+                       additional_context: Mapping[str, Any] = None) -> bool:
+        prefix = self._contract_prefix
+        if prefix is None or code is None:
+            return super()._evaluate_code(code, additional_context=additional_context)
+
+        # Conditions of a contract
+        return self._measured(prefix + code, super()._evaluate_code, code,
+                              additional_context=additional_context)
+
+    def execute_statechart(self, statechart: Statechart):
+        label = '{}: preamble'.format(_element_label(statechart))
+        return self._measured(label, super().execute_statechart, statechart)
+
+    def evaluate_guard(self, transition: Transition, event: Optional[Event] = None) -> bool:
+        if not transition.guard:
+            return super().evaluate_guard(transition, event)
+        label = '{}: guard'.format(_element_label(transition))
+        return self._measured(label, super().evaluate_guard, transition, event)
+
+    def execute_action(self, transition: Transition, event: Optional[Event] = None) -> List[Event]:
+        if not transition.action:
+            return super().execute_action(transition, event)
+        label = '{}: action'.format(_element_label(transition))
+        return self._measured(label, super().execute_action, transition, event)
+
+    def execute_on_entry(self, state: StateMixin) -> List[Event]:
+        if not getattr(state, 'on_entry', None):
+            return super().execute_on_entry(state)
+        label = '{}: on entry'.format(_element_label(state))
+        return self._measured(label, super().execute_on_entry, state)
+
+    def execute_on_exit(self, state: StateMixin) -> List[Event]:
+        if not getattr(state, 'on_exit', None):
+            return super().execute_on_exit(state)
+        label = '{}: on exit'.format(_element_label(state))
+        return self._measured(label, super().execute_on_exit, state)
+
+    def evaluate_preconditions(self, obj, event: Optional[Event] = None) -> Iterator[str]:
+        return self._measured_conditions(
+            obj, 'precondition', super().evaluate_preconditions(obj, event))
+
+    def evaluate_invariants(self, obj, event: Optional[Event] = None) -> Iterator[str]:
+        return self._measured_conditions(
+            obj, 'invariant', super().evaluate_invariants(obj, event))
+
+    def evaluate_postconditions(self, obj, event: Optional[Event] = None) -> Iterator[str]:
+        return self._measured_conditions(
+            obj, 'postcondition', super().evaluate_postconditions(obj, event))
@@ -1,17 +1,186 @@
 import collections
 import copy
+import math
+import threading
 
 from types import CodeType
-from typing import Any, Dict, List, Optional, Mapping, Iterator
+from typing import (Any, Dict, FrozenSet, Iterable, List, Optional, Mapping, Iterator, Tuple,
+                    cast)
 
 from . import Evaluator
 from ..exceptions import CodeEvaluationError
-from ..model import Event, InternalEvent, MetaEvent, Transition
+from ..model import Event, InternalEvent, MetaEvent, Statechart, StateMixin, Transition
 
 
 __all__ = ['PythonEvaluator']
 
 
+class _LRUCache:
+    """
+    A thread-safe mapping that holds at most *maxsize* items, and that evicts the least
+    recently used ones when it is full.
+
+    :param maxsize: maximal number of items
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()  # type: collections.OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            value = self._items.get(key, default)
+            if value is not default:
+                self._items.move_to_end(key)
+            return value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            value = self._items.setdefault(key, default)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Precompiled code, shared by all evaluators and indexed by (code, mode), or by
+# (code, mode, filename) if the code is not compiled with the default filename.
+# The cache is bounded, as long-running processes may compile many distinct fragments.
+_compiled_code = _LRUCache(16384)
+
+
+def _compile(code: str, mode: str, filename: str = '<string>') -> CodeType:
+    """
+    Return the compiled version of given code, compiling it if needed.
+
+    :param code: code to compile
+    :param mode: either "eval" or "exec"
+    :param filename: filename of the code object, as it appears in tracebacks and profiles
+    :return: a code object
+    """
+    key = (code, mode) if filename == '<string>' else (code, mode, filename)
+    compiled_code = _compiled_code.get(key, None)
+    if compiled_code is None:
+        compiled_code = _compiled_code.setdefault(key, compile(code, filename, mode))
+    return compiled_code
+
+
+def _code_fragments(statechart: Statechart) -> Iterator[Tuple[str, str]]:
+    """
+    Iterate over the (code, mode) pairs of the code fragments of given statechart
+    that are compiled by a *PythonEvaluator*.
+
+    :param statechart: a statechart
+    :return: an iterator over (code, mode) pairs
+    """
+    if statechart.preamble:
+        yield statechart.preamble, 'exec'
+
+    elements = [statechart.state_for(name) for name in statechart.states]  # type: List[Any]
+    elements.extend(statechart.transitions)
+
+    for element in elements:
+        for attribute in ['on_entry', 'on_exit', 'action']:
+            code = getattr(element, attribute, None)
+            if code:
+                yield code, 'exec'
+        if getattr(element, 'guard', None):
+            yield element.guard, 'eval'
+        for attribute in ['preconditions', 'postconditions', 'invariants']:
+            for condition in getattr(element, attribute, []):
+                yield condition, 'eval'
+
+
+# Names referenced by precompiled code, indexed by code object
+_referenced_names = _LRUCache(16384)
+
+
+def _names(compiled_code: CodeType) -> FrozenSet[str]:
+    """
+    Return the names that are referenced by given code object, including the names that
+    are referenced by nested code objects (e.g. lambdas and comprehensions).
+
+    :param compiled_code: a code object
+    :return: a set of names
+    """
+    names = _referenced_names.get(compiled_code, None)
+    if names is None:
+        collected = set(compiled_code.co_names)
+        for const in compiled_code.co_consts:
+            if isinstance(const, CodeType):
+                collected.update(_names(const))
+        names = _referenced_names.setdefault(compiled_code, frozenset(collected))
+    return names
+
+
+class TrackedContext(dict):
+    """
+    A context that keeps track of its writes. Each time a variable is assigned or deleted,
+    a counter of writes is incremented and stored as the version of this variable.
+    Variables can also be explicitly marked as written, using *touch*.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+        self.versions = {}  # type: Dict[str, int]
+
+    def touch(self, names: Iterable[str]) -> None:
+        """
+        Mark given variables as written.
+
+        :param names: names of the variables
+        """
+        self.writes += 1
+        for name in names:
+            self.versions[name] = self.writes
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.touch([key])
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.touch([key])
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *args):
+        value = super().pop(key, *args)
+        self.touch([key])
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.touch([key])
+        return key, value
+
+    def clear(self):
+        self.touch(list(self.keys()))
+        super().clear()
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),), self.__dict__
+
+
 class FrozenContext(collections.abc.Mapping):
     """
     A shallow copy of a context. The keys of the underlying context are
@@ -56,10 +225,12 @@ class PythonEvaluator(Evaluator):
           if and only if this state is currently active, ie. it is in the active configuration of
           the ``Interpreter`` instance that makes use of this evaluator.
     - On code execution:
-        - A *send(name: str, **kwargs) -> None* function that takes an event name and additional
+        - A *send(name: str, **kwargs) -> Event* function that takes an event name and additional
           keyword parameters and raises an internal event with it. Raised events are propagated to
           bound statecharts as external events and to the current statechart as internal event.
-          If delay is provided, a delayed event is created.
+          If delay is provided, a delayed event is created. The sent event is returned.
+        - A *cancel(event: Event) -> None* function that cancels an event that was sent by *send*
+          (e.g., a delayed event), so that it will not be processed.
         - A *notify(name: str, **kwargs) -> None* function that takes an event name and additional
           keyword parameters and raises a meta-event with it. Meta-events are only sent to bound
           property statecharts.
@@ -91,25 +262,44 @@ class PythonEvaluator(Evaluator):
     If an exception occurred while executing or evaluating a piece of code, it is propagated by the
     evaluator.
 
+    If *reactive_guards* is set, the guards of eventless transitions are only evaluated again if
+    something they depend on changed since their last evaluation: a variable they refer to, the
+    current time (if they refer to *time*, *after* or *idle*) or the active configuration (if they
+    refer to *active*, *after* or *idle*). A variable is considered as changed when it is assigned
+    or deleted, or when it is referred to by an action (as the action could modify its value).
+    Values that are modified in any other way (e.g., through an alias, or by a code that is
+    external to the statechart) are not detected, and guards are expected not to depend on anything
+    else (e.g., they should not call a function whose result changes over time). Use
+    *functools.partial* to provide this parameter to an *Interpreter*.
+
     :param interpreter: the interpreter that will use this evaluator,
         is expected to be an *Interpreter* instance
     :param initial_context: a dictionary that will be used as *__locals__*
+    :param reactive_guards: set to *True* to avoid evaluating again the guards of eventless
+        transitions if nothing they depend on has changed.
     """
 
-    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any] = None) -> None:
+    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any] = None,
+                 reactive_guards: bool = False) -> None:
         super().__init__(interpreter, initial_context=initial_context)
 
-        self._context = {}  # type: Dict[str, Any]
+        self._reactive_guards = reactive_guards
+        self._context = TrackedContext() if reactive_guards else {}  # type: Dict[str, Any]
         self._context.update(initial_context if initial_context else {})
         self._interpreter = interpreter
 
-        # Precompiled code
-        self._evaluable_code = {}  # type: Dict[str, CodeType]
-        self._executable_code = {}  # type: Dict[str, CodeType]
-
         # Frozen context for __old__
         self._memory = {}  # type: Dict[int, FrozenContext]
 
+        # Last result of eventless guards, and the versions it depends on
+        self._configuration_version = 0
+        self._guards = {}  # type: Dict[Transition, Tuple[int, int, Any, Tuple[int, ...], bool]]
+
+        # Earliest time at which the guard of an eventless transition could become true,
+        # only recorded once track_deadlines was called
+        self._track_deadlines = False
+        self._deadlines = {}  # type: Dict[Transition, float]
+
     @property
     def context(self) -> Mapping:
         return self._context
@@ -124,6 +314,16 @@ class PythonEvaluator(Evaluator):
         """
         return self._context.setdefault(name, value)
 
+    def _compile_code(self, code: str, mode: str) -> CodeType:
+        """
+        Return the compiled version of given code.
+
+        :param code: code to compile
+        :param mode: either "eval" or "exec"
+        :return: a code object
+        """
+        return _compile(code, mode)
+
     def _evaluate_code(
             self, code: Optional[str],
             *, additional_context: Mapping[str, Any] = None) -> bool:
@@ -137,9 +337,7 @@ class PythonEvaluator(Evaluator):
         if code is None:
             return True
 
-        compiled_code = self._evaluable_code.get(code, None)
-        if compiled_code is None:
-            compiled_code = self._evaluable_code.setdefault(code, compile(code, '<string>', 'eval'))
+        compiled_code = self._compile_code(code, 'eval')
 
         exposed_context = {
             'active': lambda s: s in self._interpreter.configuration,
@@ -165,17 +363,28 @@ class PythonEvaluator(Evaluator):
         if code is None:
             return []
 
-        compiled_code = self._executable_code.get(code, None)
-        if compiled_code is None:
-            compiled_code = self._executable_code.setdefault(
-                code, compile(code, '<string>', 'exec'))
+        compiled_code = self._compile_code(code, 'exec')
 
         sent_events = []  # type: List[Event]
 
+        def send(name: str, **kwargs) -> Event:
+            event = InternalEvent(name, **kwargs)
+            sent_events.append(event)
+            return event
+
+        def cancel(event: Event) -> None:
+            # Events sent by this code are not yet queued
+            for i, sent_event in enumerate(sent_events):
+                if sent_event is event:
+                    del sent_events[i]
+                    return
+            self._interpreter.cancel(event)
+
         exposed_context = {
             'active': lambda name: name in self._interpreter.configuration,
             'time': self._interpreter.time,
-            'send': lambda name, **kwargs: sent_events.append(InternalEvent(name, **kwargs)),
+            'send': send,
+            'cancel': cancel,
             'notify': lambda name, **kwargs: sent_events.append(MetaEvent(name, **kwargs)),
             'setdefault': self._setdefault,
         }
@@ -186,6 +395,10 @@ class PythonEvaluator(Evaluator):
             return sent_events
         except Exception as e:
             raise CodeEvaluationError('"{}" occurred while executing "{}"'.format(e, code)) from e
+        finally:
+            if self._reactive_guards:
+                # Referred values could have been modified in place
+                self._context.touch(_names(compiled_code))  # type: ignore
 
     def evaluate_guard(self, transition: Transition, event: Optional[Event] = None) -> bool:
         """
@@ -195,21 +408,156 @@ class PythonEvaluator(Evaluator):
         :param event: instance of *Event* if any
         :return: truth value of *code*
         """
-        additional_context = {
-            'after': (
-                lambda seconds: self._interpreter.time - seconds
-                >= self._interpreter._entry_time[transition.source]
-            ),
-            'idle': (
-                lambda seconds: self._interpreter.time - seconds
-                >= self._interpreter._idle_time[transition.source]
-            ),
-            'event': event,
-        }
+        if self._reactive_guards and event is None and transition.guard:
+            return self._evaluate_eventless_guard(transition)
+
+        additional_context = self._time_functions(
+            transition, record=self._track_deadlines and event is None)
+        additional_context['event'] = event
         return self._evaluate_code(
             getattr(transition, 'guard', None),
             additional_context=additional_context)
 
+    def _time_functions(self, transition: Transition, *, record: bool) -> Dict[str, Any]:
+        """
+        Return the *after* and *idle* functions to expose to the guard of given transition.
+
+        If *record* is set, the earliest time at which a call to one of these functions could
+        return True is stored for this transition, and is used by *next_deadline*.
+
+        :param transition: the considered transition
+        :param record: True to record the deadline of the calls that return False
+        :return: a dictionary with *after* and *idle* keys
+        """
+        interpreter = self._interpreter
+
+        if not record:
+            return {
+                'after': (
+                    lambda seconds: interpreter.time - seconds
+                    >= interpreter._entry_time[transition.source]
+                ),
+                'idle': (
+                    lambda seconds: interpreter.time - seconds
+                    >= interpreter._idle_time[transition.source]
+                ),
+            }
+
+        deadlines = self._deadlines
+        deadlines.pop(transition, None)
+
+        def timer(reference_times: Mapping[str, float]):
+            def elapsed(seconds: float) -> bool:
+                reference = reference_times[transition.source]
+                if interpreter.time - seconds >= reference:
+                    return True
+
+                # Ensure the deadline satisfies the above check, despite rounding errors
+                deadline = reference + seconds
+                while deadline - seconds < reference:
+                    deadline = math.nextafter(deadline, math.inf)
+                deadlines[transition] = min(deadlines.get(transition, deadline), deadline)
+                return False
+            return elapsed
+
+        return {
+            'after': timer(interpreter._entry_time),
+            'idle': timer(interpreter._idle_time),
+        }
+
+    def track_deadlines(self) -> None:
+        """
+        Start recording the deadlines of the calls to *after* and *idle* in eventless guards,
+        for *next_deadline*. Cached values of eventless guards are discarded, so that these
+        guards are evaluated (and their deadlines recorded) again.
+        """
+        if not self._track_deadlines:
+            self._track_deadlines = True
+            self._guards.clear()
+
+    def next_deadline(self, transitions: Iterable[Transition]) -> Optional[float]:
+        """
+        Return the earliest time at which the guard of one of given eventless transitions could
+        become true only because time elapsed, based on the calls to *after* and *idle* that
+        returned False during the last evaluation of these guards (see *track_deadlines*).
+
+        Guards that depend on time in another way (e.g., that refer to *time*) are not
+        considered.
+
+        :param transitions: eventless transitions whose guards were evaluated during the last step
+        :return: a time value or None
+        """
+        deadlines = self._deadlines
+        return min((deadlines[t] for t in transitions if t in deadlines), default=None)
+
+    def _evaluate_eventless_guard(self, transition: Transition) -> bool:
+        """
+        Evaluate the guard of given transition without event, unless nothing it depends on
+        changed since its last evaluation.
+
+        :param transition: the considered transition
+        :return: truth value of its guard
+        """
+        context = cast(TrackedContext, self._context)
+        names = _names(_compile(transition.guard, 'eval'))
+
+        configuration_version = (
+            self._configuration_version if names & {'active', 'after', 'idle'} else -1)
+        time = self._interpreter.time if names & {'time', 'after', 'idle'} else None
+
+        cached = self._guards.get(transition, None)
+        if cached is not None:
+            writes, c_version, c_time, versions, value = cached
+            if c_version == configuration_version and c_time == time:
+                if writes == context.writes:
+                    return value
+                new_versions = tuple(context.versions.get(name, 0) for name in names)
+                if new_versions == versions:
+                    self._guards[transition] = (
+                        context.writes, c_version, c_time, versions, value)
+                    return value
+
+        versions = tuple(context.versions.get(name, 0) for name in names)
+        additional_context = self._time_functions(transition, record=self._track_deadlines)
+        additional_context['event'] = None
+        value = self._evaluate_code(transition.guard, additional_context=additional_context)
+        self._guards[transition] = (context.writes, configuration_version, time, versions, value)
+        return value
+
+    def execute_action(self, transition: Transition, event: Optional[Event] = None) -> List[Event]:
+        """
+        Execute the action for given transition.
+        This method is called for every transition that is processed, even those with no *action*.
+
+        :param transition: the considered transition
+        :param event: instance of *Event* if any
+        :return: a list of sent events
+        """
+        self._configuration_version += 1
+        return super().execute_action(transition, event)
+
+    def execute_on_entry(self, state: StateMixin) -> List[Event]:
+        """
+        Execute the on entry action for given state.
+        This method is called for every state that is entered, even those with no *on_entry*.
+
+        :param state: the considered state
+        :return: a list of sent events
+        """
+        self._configuration_version += 1
+        return super().execute_on_entry(state)
+
+    def execute_on_exit(self, state: StateMixin) -> List[Event]:
+        """
+        Execute the on exit action for given state.
+        This method is called for every state that is exited, even those with no *on_exit*.
+
+        :param state: the considered state
+        :return: a list of sent events
+        """
+        self._configuration_version += 1
+        return super().execute_on_exit(state)
+
     def evaluate_preconditions(self, obj, event: Optional[Event] = None) -> Iterator[str]:
         """
         Evaluate the preconditions for given object (either a *StateMixin* or a
@@ -307,9 +655,3 @@ class PythonEvaluator(Evaluator):
             lambda c: not self._evaluate_code(c, additional_context=additional_context),
             getattr(obj, 'postconditions', [])
         )
-
-    def __getstate__(self):
-        attributes = self.__dict__.copy()
-        attributes['_executable_code'] = dict()  # Code fragment cannot be pickled
-        attributes['_evaluable_code'] = dict()  # Code fragment cannot be pickled
-        return attributes
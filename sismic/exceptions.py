@@ -37,6 +37,13 @@ class NonDeterminismError(ExecutionError):
     pass
 
 
+class QueueFullError(ExecutionError):
+    """
+    When an event is queued while the (bounded) external event queue is full.
+    """
+    pass
+
+
 class PropertyStatechartError(SismicError):
     """
     Raised when a property statechart reaches a final state.
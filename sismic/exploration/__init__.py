@@ -0,0 +1,2 @@
+from .explorer import *
+from .fuzzer import *
@@ -0,0 +1,358 @@
+import hashlib
+import pickle
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import (Any, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Set, Tuple,
+                    Union)
+
+from ..exceptions import ContractError, PropertyStatechartError, SismicError
+from ..interpreter import Interpreter
+from ..interpreter.listener import PropertyStatechartListener
+from ..model import Event, Statechart
+
+__all__ = ['Violation', 'ExplorationReport', 'events_from_alphabet', 'fingerprint', 'explore']
+
+
+Alphabet = Iterable[Union[str, Event, Tuple[str, Mapping[str, Iterable[Any]]]]]
+
+
+def events_from_alphabet(alphabet: Alphabet) -> List[Event]:
+    """
+    Return the list of events described by given alphabet.
+
+    Each item of the alphabet is either an event name, an *Event* instance, or a pair
+    (name, domains) where *domains* maps parameter names to an iterable of possible values.
+    In the latter case, an event is created for each combination of these values.
+
+    :param alphabet: an iterable of event names, events or (name, domains) pairs
+    :return: a list of *Event* instances
+    """
+    events = []  # type: List[Event]
+    for item in alphabet:
+        if isinstance(item, str):
+            events.append(Event(item))
+        elif isinstance(item, Event):
+            events.append(item)
+        else:
+            name, domains = item
+            names = list(domains.keys())
+            for values in product(*(list(domains[key]) for key in names)):
+                events.append(Event(name, **dict(zip(names, values))))
+    return events
+
+
+def fingerprint(interpreter: Interpreter) -> str:
+    """
+    Return a fingerprint of the state of given interpreter, based on its active configuration,
+    the memory of its history states, its context, the events that are still queued (and
+    their remaining delay), and the state of its bound property statecharts.
+
+    Values of the context are compared using their *repr*, so that values whose *repr* differs
+    between two equivalent states (e.g., objects with the default *repr*) prevent these states
+    from being identified.
+
+    :param interpreter: an *Interpreter* instance
+    :return: a hexadecimal digest
+    """
+    queued = []
+    for queue in (interpreter._internal_queue, interpreter._external_queue):
+        for time, event in queue:
+            if interpreter._cancelled.get(id(event), None) is not event:
+                queued.append((time - interpreter.time, event.name, sorted(event.data.items())))
+
+    key = (
+        sorted(interpreter._configuration),
+        sorted(interpreter._memory.items()),
+        sorted(interpreter.context.items()),
+        queued,
+        [fingerprint(listener._interpreter) for listener in interpreter._listeners
+         if isinstance(listener, PropertyStatechartListener)],
+    )
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class Violation:
+    """
+    An error that was raised during the exploration of a statechart.
+
+    :param trace: the sequence of events that leads to the error
+    :param error: the class of the error (a subclass of *SismicError*)
+    :param message: the message of the error
+    """
+
+    def __init__(self, trace: List[Event], error: type, message: str) -> None:
+        self.trace = trace
+        self.error = error
+        self.message = message
+
+    def __repr__(self):
+        return '{}({}, trace={!r})'.format(self.__class__.__name__, self.error.__name__, self.trace)
+
+
+class ExplorationReport:
+    """
+    Result of *explore* for a statechart.
+
+    :param statechart: explored statechart
+    :param explored: number of distinct explored states
+    :param reachable_states: names of the states that were entered during the exploration
+    :param deadlocks: list of pairs (trace, configuration) for the deadlocks
+    :param violations: list of *Violation* instances
+    :param complete: True if the exploration was not stopped by a bound
+    """
+
+    def __init__(self, statechart: Statechart, explored: int, reachable_states: Iterable[str],
+                 deadlocks: List[Tuple[List[Event], List[str]]], violations: List[Violation],
+                 complete: bool) -> None:
+        self._statechart = statechart
+        self._explored = explored
+        self._reachable_states = set(reachable_states)
+        self._deadlocks = deadlocks
+        self._violations = violations
+        self._complete = complete
+
+    @property
+    def statechart(self) -> Statechart:
+        """
+        Explored statechart
+        """
+        return self._statechart
+
+    @property
+    def explored(self) -> int:
+        """
+        Number of distinct states (see *fingerprint*) that were explored
+        """
+        return self._explored
+
+    @property
+    def reachable_states(self) -> List[str]:
+        """
+        Names of the states of the statechart that were entered during the exploration
+        """
+        return sorted(self._reachable_states)
+
+    @property
+    def unreachable_states(self) -> List[str]:
+        """
+        Names of the states of the statechart that were never entered during the exploration.
+        If the exploration is not complete, some of them could still be reachable.
+        """
+        return sorted(set(self._statechart.states) - self._reachable_states)
+
+    @property
+    def deadlocks(self) -> List[Tuple[List[Event], List[str]]]:
+        """
+        List of pairs (trace, configuration) where *trace* is a shortest sequence of events
+        that leads to a non-final *configuration* in which no event of the alphabet can
+        trigger a transition.
+        """
+        return list(self._deadlocks)
+
+    @property
+    def violations(self) -> List[Violation]:
+        """
+        List of errors that were raised (e.g., contract or property violations), with a
+        shortest sequence of events that raises them. Errors are reported once per failing
+        condition (for contracts), per property statechart, or per message.
+        """
+        return list(self._violations)
+
+    @property
+    def complete(self) -> bool:
+        """
+        Boolean indicating whether all the reachable states were explored, i.e., whether the
+        exploration was not stopped by *max_depth* or *max_states*.
+        """
+        return self._complete
+
+    def __str__(self):
+        lines = ['Exploration of {}: {} state(s), {}'.format(
+            self._statechart.name, self._explored, 'complete' if self._complete else 'bounded')]
+        if self.unreachable_states:
+            lines.append('Unreachable states: {}'.format(', '.join(self.unreachable_states)))
+        for trace, configuration in self._deadlocks:
+            lines.append(' - Deadlock in {} after {}'.format(
+                configuration, [event.name for event in trace]))
+        for violation in self._violations:
+            lines.append(' - {} after {}'.format(
+                violation.error.__name__, [event.name for event in violation.trace]))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return '{}({!r}, explored={}, deadlocks={}, violations={})'.format(
+            self.__class__.__name__, self._statechart, self._explored, len(self._deadlocks),
+            len(self._violations))
+
+
+# Result of sending an event in a state, as (processed, entered states, error, key, snapshot,
+# configuration). The error is a (signature, class, message) triple, and the snapshot is None
+# if an error was raised or if the state is final.
+_Outcome = Tuple[bool, Set[str], Optional[Tuple[Tuple, type, str]], Optional[str],
+                 Optional[bytes], List[str]]
+
+
+def _signature(error: SismicError) -> Tuple:
+    """
+    Return a value that identifies given error, regardless of the context in which it occurred.
+    """
+    if isinstance(error, ContractError):
+        return type(error), str(error.obj), error.condition
+    elif isinstance(error, PropertyStatechartError):
+        return type(error), error.property_statechart.statechart.name
+    return type(error), str(error)
+
+
+def _expand(snapshot: bytes, events: List[Event]) -> List[_Outcome]:
+    """
+    Restore the interpreter of given snapshot for each given event, queue the event and
+    execute the interpreter.
+
+    :param snapshot: a pickled interpreter
+    :param events: events to send
+    :return: a list containing the outcome of each event
+    """
+    outcomes = []  # type: List[_Outcome]
+    for event in events:
+        interpreter = pickle.loads(snapshot)  # type: Interpreter
+        entered = set()  # type: Set[str]
+        try:
+            steps = interpreter.queue(event).execute()
+        except SismicError as e:
+            outcomes.append((True, entered, (_signature(e), type(e), str(e)), None, None, []))
+            continue
+
+        processed = False
+        for step in steps:
+            processed = processed or len(step.transitions) > 0
+            entered.update(step.entered_states)
+        outcomes.append((processed, entered, None, fingerprint(interpreter),
+                         None if interpreter.final else pickle.dumps(interpreter),
+                         interpreter.configuration))
+    return outcomes
+
+
+def _expand_all(args: Tuple[List[bytes], List[Event]]) -> List[List[_Outcome]]:
+    """
+    Call *_expand* for each given snapshot. This is the task executed by worker processes.
+    """
+    snapshots, events = args
+    return [_expand(snapshot, events) for snapshot in snapshots]
+
+
+def explore(statechart: Statechart, alphabet: Alphabet, *, max_depth: int = 10,
+            max_states: int = None, strategy: str = 'bfs', processes: int = 1,
+            properties: Iterable[Statechart] = (),
+            interpreter_klass: Callable[..., Interpreter] = Interpreter,
+            initial_context: Mapping[str, Any] = None) -> ExplorationReport:
+    """
+    Exhaustively explore the states of given statechart that are reachable by sending
+    sequences of events from given alphabet (see *events_from_alphabet*), up to a bound.
+
+    Starting from the initial state of an interpreter, each event of the alphabet is sent
+    to a copy of the interpreter, that is executed until no more step can be done. Copies
+    are made by pickling interpreters (so the context must be picklable), and the states
+    they reach are identified using *fingerprint*. Time does not elapse during the
+    exploration.
+
+    The exploration reports the states of the statechart that are never entered, the
+    deadlocks (non-final configurations in which no event of the alphabet triggers a
+    transition) and the errors that are raised (e.g., *ContractError*, *ExecutionError*, or
+    *PropertyStatechartError* for the given property statecharts), with a sequence of events
+    that leads to them. These sequences are the shortest ones if *strategy* is *bfs*.
+
+    If *processes* is greater than 1, states are explored in batches by a pool of worker
+    processes (see *concurrent.futures.ProcessPoolExecutor*), and the statechart and its
+    code must be importable by these processes.
+
+    :param statechart: statechart to explore
+    :param alphabet: an iterable of event names, events or (name, domains) pairs
+    :param max_depth: maximal number of events in a sequence
+    :param max_states: maximal number of distinct states to explore. No limit by default.
+    :param strategy: either *bfs* (breadth-first, default) or *dfs* (depth-first)
+    :param processes: number of worker processes, 1 (default) to explore in current process
+    :param properties: property statecharts to bind to the interpreters
+    :param interpreter_klass: a callable that accepts a statechart and an *initial_context*
+        parameter, and returns an *Interpreter* instance. Default to *Interpreter*.
+    :param initial_context: an optional initial context for the interpreters
+    :return: an *ExplorationReport* instance
+    :raise ValueError: if *strategy* is unknown
+    """
+    if strategy not in ('bfs', 'dfs'):
+        raise ValueError('Unknown exploration strategy: {}'.format(strategy))
+    events = events_from_alphabet(alphabet)
+
+    reachable = set()  # type: Set[str]
+    deadlocks = []  # type: List[Tuple[List[Event], List[str]]]
+    violations = {}  # type: Dict[Tuple, Violation]
+    complete = True
+
+    # Initial state
+    interpreter = interpreter_klass(statechart, initial_context=initial_context)
+    for property_statechart in properties:
+        interpreter.bind_property_statechart(property_statechart)
+    try:
+        for step in interpreter.execute():
+            reachable.update(step.entered_states)
+    except SismicError as e:
+        violations[_signature(e)] = Violation([], type(e), str(e))
+        return ExplorationReport(statechart, 0, reachable, deadlocks,
+                                 list(violations.values()), complete)
+
+    visited = {fingerprint(interpreter)}
+    frontier = deque()  # type: Deque[Tuple[bytes, Tuple[Event, ...], List[str]]]
+    if not interpreter.final:
+        frontier.append((pickle.dumps(interpreter), (), interpreter.configuration))
+
+    batch_size = max(1, processes) * 8
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    try:
+        while frontier:
+            batch = []
+            while frontier and len(batch) < batch_size:
+                batch.append(frontier.popleft() if strategy == 'bfs' else frontier.pop())
+
+            # Nodes at maximal depth are not expanded
+            expanded = [node for node in batch if len(node[1]) < max_depth]
+            complete = complete and len(expanded) == len(batch)
+
+            snapshots = [snapshot for snapshot, _, _ in expanded]
+            if executor is None:
+                results = _expand_all((snapshots, events))
+            else:
+                chunks = [snapshots[i::processes] for i in range(processes)]
+                chunk_results = list(executor.map(_expand_all, [(c, events) for c in chunks]))
+                results = [chunk_results[i % processes][i // processes]
+                           for i in range(len(snapshots))]
+
+            children = []
+            for (_, trace, configuration), outcomes in zip(expanded, results):
+                deadlock = True
+                for event, (processed, entered, error, key, snapshot, state) in zip(
+                        events, outcomes):
+                    deadlock = deadlock and not processed
+                    reachable.update(entered)
+                    if error is not None:
+                        signature, klass, message = error
+                        violations.setdefault(
+                            signature, Violation(list(trace + (event,)), klass, message))
+                    elif key not in visited:
+                        if max_states is not None and len(visited) >= max_states:
+                            complete = False
+                            continue
+                        visited.add(key)
+                        if snapshot is not None:
+                            children.append((snapshot, trace + (event,), state))
+                if deadlock:
+                    deadlocks.append((list(trace), configuration))
+
+            # Depth-first exploration considers the first event first
+            frontier.extend(children if strategy == 'bfs' else reversed(children))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return ExplorationReport(statechart, len(visited), reachable, deadlocks,
+                             list(violations.values()), complete)
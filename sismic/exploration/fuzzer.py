@@ -0,0 +1,291 @@
+import random
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .explorer import Alphabet, Violation, _signature, events_from_alphabet
+from ..exceptions import SismicError
+from ..helpers import coverage_from_trace
+from ..interpreter import Interpreter
+from ..model import Event, MacroStep, Statechart, Transition
+
+__all__ = ['FuzzingReport', 'fuzz', 'minimize']
+
+
+class FuzzingReport:
+    """
+    Result of *fuzz* for a statechart.
+
+    :param statechart: fuzzed statechart
+    :param runs: number of executed sequences of events
+    :param coverage: a mapping similar to the one returned by *coverage_from_trace*,
+        for all the executed sequences
+    :param failures: list of *Violation* instances
+    """
+
+    def __init__(self, statechart: Statechart, runs: int, coverage: Mapping[str, Counter],
+                 failures: List[Violation]) -> None:
+        self._statechart = statechart
+        self._runs = runs
+        self._coverage = coverage
+        self._failures = failures
+
+    @property
+    def statechart(self) -> Statechart:
+        """
+        Fuzzed statechart
+        """
+        return self._statechart
+
+    @property
+    def runs(self) -> int:
+        """
+        Number of executed sequences of events
+        """
+        return self._runs
+
+    @property
+    def coverage(self) -> Mapping[str, Counter]:
+        """
+        A dict whose keys are "entered states", "exited states" and "processed transitions"
+        and whose values are *Counter* objects, for all the executed sequences
+        (see *coverage_from_trace*).
+        """
+        return self._coverage
+
+    @property
+    def uncovered_states(self) -> List[str]:
+        """
+        Names of the states that were never entered
+        """
+        entered = self._coverage['entered states']
+        return [name for name in self._statechart.states if entered[name] == 0]
+
+    @property
+    def uncovered_transitions(self) -> List[Transition]:
+        """
+        Transitions that were never processed
+        """
+        processed = self._coverage['processed transitions']
+        return [t for t in self._statechart.transitions if processed[t] == 0]
+
+    @property
+    def failures(self) -> List[Violation]:
+        """
+        List of errors that were raised, with a (minimized) sequence of events that raises
+        them. Errors are reported once per failing condition (for contracts), per property
+        statechart, or per message.
+        """
+        return list(self._failures)
+
+    def __str__(self):
+        transitions = self._statechart.transitions
+        lines = ['Fuzzing of {}: {} run(s), {}/{} transition(s) covered'.format(
+            self._statechart.name, self._runs,
+            len(transitions) - len(self.uncovered_transitions), len(transitions))]
+        for failure in self._failures:
+            lines.append(' - {} after {}'.format(
+                failure.error.__name__, [event.name for event in failure.trace]))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return '{}({!r}, runs={}, failures={})'.format(
+            self.__class__.__name__, self._statechart, self._runs, len(self._failures))
+
+
+# Everything that is needed to create an interpreter, as (statechart, properties,
+# interpreter_klass, initial_context).
+_Setup = Tuple[Statechart, List[Statechart], Callable[..., Interpreter], Optional[Mapping]]
+
+
+def _create_interpreter(setup: _Setup) -> Interpreter:
+    statechart, properties, interpreter_klass, initial_context = setup
+    interpreter = interpreter_klass(statechart, initial_context=initial_context)
+    for property_statechart in properties:
+        interpreter.bind_property_statechart(property_statechart)
+    return interpreter
+
+
+def _replay(setup: _Setup, sequence: List[Event]) -> Optional[SismicError]:
+    """
+    Send given events one at a time to a new interpreter, and return the error that is
+    raised, if any.
+    """
+    interpreter = _create_interpreter(setup)
+    try:
+        interpreter.execute()
+        for event in sequence:
+            interpreter.queue(event).execute()
+    except SismicError as e:
+        return e
+    return None
+
+
+def _fuzz_batch(args: Tuple[_Setup, List[Event], Counter, List[int], int]) -> Tuple[
+        Mapping[str, Counter], List[Tuple[Tuple, type, str, List[Event]]]]:
+    """
+    Execute a random sequence of events for each given seed, and return the coverage of these
+    executions and the errors they raised. This is the task executed by worker processes.
+
+    Events are randomly chosen among the ones that trigger a transition of an active state,
+    with a weight that decreases with the number of times these transitions were processed.
+    """
+    setup, events, processed, seeds, length = args
+    statechart = setup[0]
+    processed = Counter(processed)
+
+    coverage = {
+        'entered states': Counter(),
+        'exited states': Counter(),
+        'processed transitions': Counter(),
+    }  # type: Dict[str, Counter]
+    failures = []  # type: List[Tuple[Tuple, type, str, List[Event]]]
+
+    for seed in seeds:
+        rng = random.Random(seed)
+        interpreter = _create_interpreter(setup)
+        sequence = []  # type: List[Event]
+        trace = []  # type: List[MacroStep]
+        try:
+            trace.extend(interpreter.execute())
+            while len(sequence) < length and not interpreter.final:
+                weights = {}  # type: Dict[str, float]
+                for transition in statechart.transitions:
+                    name = transition.event
+                    if name is not None and transition.source in interpreter._configuration:
+                        weights[name] = weights.get(name, 0) + 1 / (1 + processed[transition])
+
+                candidates = [event for event in events if event.name in weights]
+                if not candidates:
+                    break
+                event = rng.choices(candidates, [weights[e.name] for e in candidates])[0]
+                sequence.append(event)
+
+                steps = interpreter.queue(event).execute()
+                trace.extend(steps)
+                processed.update(t for step in steps for t in step.transitions)
+        except SismicError as e:
+            failures.append((_signature(e), type(e), str(e), sequence))
+
+        for key, counter in coverage_from_trace(trace).items():
+            coverage[key].update(counter)
+
+    return coverage, failures
+
+
+def minimize(sequence: List[Event], fails: Callable[[List[Event]], bool]) -> List[Event]:
+    """
+    Return a subsequence of given sequence that still fails, using the delta debugging
+    algorithm (*ddmin*). The result is 1-minimal: removing any of its events makes it pass.
+
+    :param sequence: a failing sequence of events
+    :param fails: a callable that returns True if a given sequence of events fails
+    :return: a minimized sequence of events
+    """
+    granularity = 2
+    while len(sequence) >= 2:
+        size = -(-len(sequence) // granularity)
+        subsets = [sequence[i:i + size] for i in range(0, len(sequence), size)]
+
+        for i, subset in enumerate(subsets):
+            complement = [e for j, other in enumerate(subsets) if j != i for e in other]
+            if fails(subset):
+                sequence, granularity = subset, 2
+                break
+            if len(subsets) > 2 and fails(complement):
+                sequence, granularity = complement, max(granularity - 1, 2)
+                break
+        else:
+            if granularity >= len(sequence):
+                break
+            granularity = min(len(sequence), granularity * 2)
+
+    return sequence
+
+
+def fuzz(statechart: Statechart, alphabet: Alphabet = None, *, runs: int = 100,
+         length: int = 20, seed: int = None, processes: int = 1,
+         properties: Iterable[Statechart] = (),
+         interpreter_klass: Callable[..., Interpreter] = Interpreter,
+         initial_context: Mapping[str, Any] = None, minimized: bool = True) -> FuzzingReport:
+    """
+    Execute given statechart with random sequences of events, to look for errors (e.g.,
+    *ContractError*, *ExecutionError*, or *PropertyStatechartError* for the given property
+    statecharts).
+
+    Each sequence is executed on a new interpreter, by sending its events one at a time.
+    Events are chosen among the ones of the alphabet (see *events_from_alphabet*) that trigger
+    a transition of an active state (see *Statechart.events_for*), with a preference for the
+    events whose transitions were processed the least often. This coverage is shared between
+    the sequences, so that the generation is biased towards the transitions that are not
+    yet covered.
+
+    The failing sequences are minimized (see *minimize*), by replaying them without some of
+    their events until none of them can be removed.
+
+    If *processes* is greater than 1, sequences are executed in batches by a pool of worker
+    processes (see *concurrent.futures.ProcessPoolExecutor*), and the statechart and its
+    code must be importable by these processes. Coverage is shared after each batch.
+
+    :param statechart: statechart to fuzz
+    :param alphabet: an iterable of event names, events or (name, domains) pairs. By default,
+        the events of the statechart, without parameter.
+    :param runs: number of sequences to execute
+    :param length: maximal number of events in a sequence
+    :param seed: an optional seed for the random generator, to reproduce the sequences
+    :param processes: number of worker processes, 1 (default) to execute in current process
+    :param properties: property statecharts to bind to the interpreters
+    :param interpreter_klass: a callable that accepts a statechart and an *initial_context*
+        parameter, and returns an *Interpreter* instance. Default to *Interpreter*.
+    :param initial_context: an optional initial context for the interpreters
+    :param minimized: set to False to report the failing sequences without minimizing them
+    :return: a *FuzzingReport* instance
+    """
+    events = events_from_alphabet(statechart.events_for() if alphabet is None else alphabet)
+    setup = (statechart, list(properties), interpreter_klass, initial_context)  # type: _Setup
+    rng = random.Random(seed)
+
+    coverage = {
+        'entered states': Counter(),
+        'exited states': Counter(),
+        'processed transitions': Counter(),
+    }  # type: Dict[str, Counter]
+    failures = {}  # type: Dict[Tuple, Tuple[type, str, List[Event]]]
+
+    batch_size = max(1, processes) * 8
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    try:
+        done = 0
+        while done < runs:
+            seeds = [rng.getrandbits(64) for _ in range(min(batch_size, runs - done))]
+            done += len(seeds)
+            processed = coverage['processed transitions']
+
+            if executor is None:
+                results = [_fuzz_batch((setup, events, processed, seeds, length))]
+            else:
+                results = list(executor.map(_fuzz_batch, [
+                    (setup, events, processed, seeds[i::processes], length)
+                    for i in range(processes)]))
+
+            for batch_coverage, batch_failures in results:
+                for key, counter in batch_coverage.items():
+                    coverage[key].update(counter)
+                for signature, klass, message, sequence in batch_failures:
+                    if signature not in failures or len(sequence) < len(failures[signature][2]):
+                        failures[signature] = (klass, message, sequence)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    violations = []
+    for signature, (klass, message, sequence) in failures.items():
+        if minimized:
+            def fails(candidate: List[Event]) -> bool:
+                error = _replay(setup, candidate)
+                return error is not None and _signature(error) == signature
+            sequence = minimize(sequence, fails)
+        violations.append(Violation(sequence, klass, message))
+
+    return FuzzingReport(statechart, runs, coverage, violations)
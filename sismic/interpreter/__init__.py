@@ -1,4 +1,8 @@
 from .default import Interpreter
+from .analysis import DeterminismReport, check_determinism
+from .instrumentation import PhaseTimer
+from .queue import QueuePolicy
 from ..model.events import Event, InternalEvent, MetaEvent
 
-__all__ = ['Interpreter', 'Event', 'InternalEvent', 'MetaEvent']
+__all__ = ['Interpreter', 'DeterminismReport', 'check_determinism', 'PhaseTimer',
+           'QueuePolicy', 'Event', 'InternalEvent', 'MetaEvent']
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple, cast
+
+from ..exceptions import ConflictingTransitionsError, NonDeterminismError
+from ..model import OrthogonalState, Statechart, Transition
+
+__all__ = ['DeterminismReport', 'check_determinism', 'transitions_conflict']
+
+
+def transitions_conflict(statechart: Statechart, t1: Transition, t2: Transition) -> Optional[type]:
+    """
+    Check whether given transitions can be processed during the same step, i.e. (1) they are
+    from separate regions and (2) none of them leaves the orthogonal state that contains both
+    of them.
+
+    This is the check that is done by *Interpreter._sort_transitions* when several transitions
+    are selected. It only depends on the source and the target of the transitions.
+
+    :param statechart: statechart containing both transitions
+    :param t1: a *Transition* instance
+    :param t2: a *Transition* instance
+    :return: *NonDeterminismError* if (1) does not hold, *ConflictingTransitionsError* if
+        (2) does not hold, or *None*.
+    """
+    # Check (1)
+    lca = cast(str, statechart.least_common_ancestor(t1.source, t2.source))
+    lca_state = statechart.state_for(lca)
+
+    # Their LCA must be an orthogonal state!
+    if not isinstance(lca_state, OrthogonalState):
+        return NonDeterminismError
+
+    # Check (2)
+    # This check must be done wrt. to LCA, as the combination of from_states could
+    # come from nested parallel regions!
+    for transition in [t1, t2]:
+        last_before_lca = transition.source
+        for state in statechart.ancestors_for(transition.source):
+            if state == lca:
+                break
+            last_before_lca = state
+        # Target must be a descendant (or self) of this state
+        if (transition.target and (transition.target not in [
+                last_before_lca] + statechart.descendants_for(last_before_lca))):
+            return ConflictingTransitionsError
+
+    return None
+
+
+def _can_be_selected_together(statechart: Statechart, t1: Transition, t2: Transition) -> bool:
+    """
+    Return False if given transitions can never be selected during the same step by an
+    *Interpreter*. Guards are not considered, and are assumed to hold simultaneously.
+    """
+    # Eventless transitions are selected first, and a single event is considered at a time
+    if t1.event != t2.event:
+        return False
+
+    # Only transitions of the same priority class are selected for a given source state
+    if t1.source == t2.source:
+        return t1.priority == t2.priority
+
+    # Inner-first/source state semantics ignores ancestors (or descendants) of selected sources
+    if (t1.source in statechart.ancestors_for(t2.source)
+            or t2.source in statechart.ancestors_for(t1.source)):
+        return False
+
+    # Unless they are in parallel regions, source states are never active at the same time
+    lca = cast(str, statechart.least_common_ancestor(t1.source, t2.source))
+    return isinstance(statechart.state_for(lca), OrthogonalState)
+
+
+class DeterminismReport:
+    """
+    Result of *check_determinism* for a statechart.
+
+    :param statechart: analyzed statechart
+    :param unproven: list of triples (t1, t2, error) where t1 and t2 are transitions that
+        could raise *error* (a subclass of *ExecutionError*) if they are selected together.
+    """
+
+    def __init__(self, statechart: Statechart,
+                 unproven: List[Tuple[Transition, Transition, type]]) -> None:
+        self._statechart = statechart
+        self._unproven = unproven
+        self._involved = {id(t) for t1, t2, _ in unproven for t in (t1, t2)}  # type: Set[int]
+
+    @property
+    def statechart(self) -> Statechart:
+        """
+        Analyzed statechart
+        """
+        return self._statechart
+
+    @property
+    def unproven(self) -> List[Tuple[Transition, Transition, type]]:
+        """
+        List of triples (t1, t2, error) for the pairs of transitions that could raise *error*
+        if they are selected together, typically because they depend on the guards.
+        """
+        return list(self._unproven)
+
+    @property
+    def deterministic(self) -> bool:
+        """
+        Boolean indicating whether the absence of non-determinism and of conflicting transitions
+        is proven for the whole statechart.
+        """
+        return len(self._unproven) == 0
+
+    def proven(self, transitions: Iterable[Transition]) -> bool:
+        """
+        Return True if given transitions are not involved in any unproven pair, i.e., if
+        they can be processed together without checking them.
+
+        :param transitions: a list of *Transition* instances
+        :return: True if the check is not needed for these transitions
+        """
+        return not any(id(transition) in self._involved for transition in transitions)
+
+    def __str__(self):
+        if self.deterministic:
+            return 'Statechart {} is deterministic'.format(self._statechart.name)
+
+        lines = ['Statechart {} could raise an error for {} pair(s) of transitions:'.format(
+            self._statechart.name, len(self._unproven))]
+        for t1, t2, error in self._unproven:
+            lines.append(' - {}: {} and {}'.format(error.__name__, t1, t2))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return '{}({!r}, unproven={})'.format(
+            self.__class__.__name__, self._statechart, len(self._unproven))
+
+
+def check_determinism(statechart: Statechart) -> DeterminismReport:
+    """
+    Statically check that no two transitions of given statechart can raise a
+    *NonDeterminismError* or a *ConflictingTransitionsError* when they are selected together.
+
+    Two transitions are proven safe if they can never be selected during the same step (e.g.,
+    they have different events, their source states are not in parallel regions, or they have
+    the same source and different priorities), or if they pass the checks that an
+    *Interpreter* does at runtime. Guards are conservatively assumed to hold simultaneously,
+    so the pairs that only rely on their guards to be deterministic are reported as unproven.
+
+    The report is stored in the statechart until its structure (or the event, guard or
+    priority of a transition) is modified. Meanwhile, interpreters for this statechart skip
+    the runtime checks for the selected transitions that are all proven safe.
+
+    :param statechart: statechart to analyze
+    :return: a *DeterminismReport* instance
+    """
+    report = statechart._cache.get('determinism')
+    if report is not None:
+        return report
+
+    # Transitions with distinct events are never selected together
+    transitions_per_event = defaultdict(list)  # type: Dict[Optional[str], List[Transition]]
+    for transition in statechart.transitions:
+        transitions_per_event[transition.event].append(transition)
+
+    unproven = []  # type: List[Tuple[Transition, Transition, type]]
+    for transitions in transitions_per_event.values():
+        for t1, t2 in combinations(transitions, 2):
+            if _can_be_selected_together(statechart, t1, t2):
+                error = transitions_conflict(statechart, t1, t2)
+                if error is not None:
+                    unproven.append((t1, t2, error))
+
+    report = DeterminismReport(statechart, unproven)
+    statechart._cache['determinism'] = report
+    return report
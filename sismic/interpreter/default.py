@@ -1,17 +1,24 @@
 import bisect
+import heapq
+import threading
 import warnings
 
+from collections import deque
 from itertools import combinations
-from typing import (Any, Callable, Dict, Iterable, List, Mapping, Optional,
-                    Set, Tuple, Union, cast)
+from operator import itemgetter
+from time import perf_counter
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Set, Tuple, Union, cast)
 
+from .analysis import transitions_conflict
 from .listener import InternalEventListener, PropertyStatechartListener
+from .queue import QueuePolicy
 from ..utilities import sorted_groupby
 from ..clock import Clock, SimulatedClock, SynchronizedClock
 from ..code import Evaluator, PythonEvaluator
 from ..exceptions import (ConflictingTransitionsError, InvariantError,
                           NonDeterminismError, PostconditionError,
-                          PreconditionError)
+                          PreconditionError, QueueFullError)
 from ..model import (CompoundState, DeepHistoryState, Event,
                      FinalState, InternalEvent, MacroStep, MetaEvent,
                      MicroStep, OrthogonalState, ShallowHistoryState,
@@ -46,15 +53,19 @@ class Interpreter:
     :param clock: A BaseClock instance that will be used to set this interpreter internal time.
         By default, a SimulatedClock is used.
     :param ignore_contract: set to True to ignore contract checking during the execution.
+    :param queue_policy: An optional *QueuePolicy* instance to bound the size of the external
+        event queue, and to coalesce queued events.
     """
 
     def __init__(self, statechart: Statechart, *,
                  evaluator_klass: Callable[..., Evaluator] = PythonEvaluator,
                  initial_context: Mapping[str, Any] = None,
                  clock: Clock = None,
-                 ignore_contract: bool = False) -> None:
+                 ignore_contract: bool = False,
+                 queue_policy: QueuePolicy = None) -> None:
         # Internal variables
         self._ignore_contract = ignore_contract
+        self._queue_policy = queue_policy
         self._statechart = statechart
 
         self._initialized = False
@@ -80,6 +91,18 @@ class Interpreter:
         self._internal_queue = []  # type: List[Tuple[float, InternalEvent]]
         self._external_queue = []  # type: List[Tuple[float, Event]]
 
+        # Events queued by other threads, not yet moved to the external queue
+        self._inbound = deque()  # type: deque
+
+        # Cancelled events that are still queued, indexed by their id
+        self._cancelled = {}  # type: Dict[int, Event]
+
+        # Identifier of the thread that executes (or last executed) this interpreter
+        self._executing_thread = None  # type: Optional[int]
+
+        # Whether applied steps are returned (see *run*)
+        self._trace_steps = True
+
         # Bound listeners
         self._listeners = []  # type: List[Callable[[MetaEvent], Any]]
 
@@ -260,29 +283,206 @@ class Interpreter:
             self._queue_event(event)
         return self
 
-    def execute(self, max_steps: int = -1) -> List[MacroStep]:
+    def queue_threadsafe(self, event_or_name: Union[str, Event],
+                         *event_or_names: Union[str, Event],
+                         **parameters) -> 'Interpreter':
+        """
+        Create and queue given events to the external event queue, from any thread.
+
+        This method has the same parameters than *queue*, but can be called by other threads
+        while the interpreter is executed (e.g., by an *AsyncRunner*), without any lock.
+        Events are appended to an inbound buffer, and are moved to the external queue by the
+        next call to *execute_once*, right before the macro step is computed. Their delay
+        (if any) is relative to the time of the latest execution at that moment. If the
+        external queue is full (see *QueuePolicy*), the events that cannot be queued are kept
+        in the buffer until a next call, instead of raising an exception.
+
+        With a *block* queue policy, this method waits until the external queue and the
+        buffer have room for the events (see *QueuePolicy.buffer*). This is the only
+        method that waits for another thread to consume events.
+
+        :param event_or_name: name of the event or Event instance
+        :param event_or_names: additional events
+        :param parameters: event parameters.
+        :return: *self* so it can be chained.
+        :raise QueueFullError: if the timeout of a *block* queue policy expires.
+        """
+        events = [
+            Event(event, **parameters) if isinstance(event, str) else event
+            for event in [event_or_name] + list(event_or_names)
+        ]
+        if self._queue_policy is not None:
+            self._queue_policy.buffer(self, events)
+        else:
+            # A single call to extend, so that the events of this call are kept together
+            self._inbound.extend(events)
+        return self
+
+    def _drain_inbound(self) -> None:
+        """
+        Move the events that were queued by *queue_threadsafe* to the external queue.
+        """
+        inbound = self._inbound
+        if self._queues_in_batch():
+            events = []  # type: List[Event]
+            try:
+                while True:
+                    events.append(inbound.popleft())
+            except IndexError:
+                pass
+            self.queue_many(events)
+            return
+
+        # One at a time, so that the events that cannot be queued yet are kept
+        while inbound:
+            event = inbound.popleft()
+            try:
+                self._queue_event(event)
+            except QueueFullError:
+                # Queued by a next step, once the external queue is no longer full
+                inbound.appendleft(event)
+                return
+
+    def cancel(self, event: Event) -> 'Interpreter':
+        """
+        Cancel given queued event (e.g., a delayed event), so that it will not be processed.
+
+        The event must be the instance that was queued, either an *Event* instance provided to
+        *queue* or *queue_many*, or an internal event sent by the statechart (*send* returns it).
+        Cancelled events are lazily removed from the queues, when they would be selected.
+        An event sent by the statechart can also be cancelled during the macro step that sends
+        it, before it is queued.
+
+        :param event: the event to cancel.
+        :return: *self* so it can be chained.
+        """
+        self._cancelled[id(event)] = event
+        return self
+
+    def _forget_cancelled(self) -> None:
+        """
+        Forget the cancelled events that are no longer queued (e.g., events that were
+        cancelled after being consumed). This method is called at the beginning of a macro
+        step, when every event sent by the statechart during previous steps has been queued.
+        """
+        queued = {id(e) for _, e in self._internal_queue}
+        queued.update(id(e) for _, e in self._external_queue)
+        queued.update(id(e) for e in list(self._inbound))  # Events that do not fit in the queue
+        self._cancelled = {k: e for k, e in self._cancelled.items() if k in queued}
+
+    def queue_many(self, events: Iterable[Union[str, Event, Tuple]], *,
+                   parameters: Iterable[Mapping[str, Any]] = None) -> 'Interpreter':
+        """
+        Create and queue a batch of events to the external event queue.
+
+        Events are the same (and are processed in the same order) than if they were queued
+        one by one using *queue*, but they are sorted once and merged with the queue, instead
+        of being inserted one at a time.
+
+        Each item of *events* can be an Event instance, an event name, a pair (name, parameters)
+        or a triple (name, parameters, delay), where parameters is a mapping.
+
+        Alternatively, a batch can be provided as two parallel iterables, *events* containing
+        event names and *parameters* containing mappings. In that case, these mappings are
+        directly used (without being copied) as the data of the created events, and should
+        not be modified afterwards.
+
+        :param events: an iterable of events, names, pairs or triples.
+        :param parameters: an optional iterable of event parameters, one per event name.
+        :return: *self* so it can be chained.
+        """
+        if parameters is not None:
+            batch = []  # type: List[Event]
+            for name, data in zip(events, parameters):
+                event = Event(name)
+                event.data = data  # type: ignore
+                batch.append(event)
+        else:
+            batch = []
+            for item in events:
+                if isinstance(item, str):
+                    event = Event(item)
+                elif isinstance(item, Event):
+                    event = item
+                elif len(item) == 3:
+                    event = Event(item[0], **item[1], delay=item[2])
+                else:
+                    event = Event(item[0], **item[1])
+                batch.append(event)
+
+        if not self._queues_in_batch():
+            for event in batch:
+                self._queue_event(event)
+            return self
+
+        items = []  # type: List[Tuple[float, Event]]
+        for event in batch:
+            if isinstance(event, InternalEvent):
+                self._queue_event(event)
+            else:
+                items.append((self.time + event.data.get('delay', 0), event))
+        items.sort(key=itemgetter(0))  # Stable
+
+        # Queued events come first for a given time, as with bisect_right in _queue_event
+        queue = self._external_queue
+        if len(queue) == 0 or (len(items) > 0 and items[0][0] >= queue[-1][0]):
+            queue.extend(items)
+        else:
+            queue[:] = heapq.merge(queue, items, key=itemgetter(0))
+        return self
+
+    def _queues_in_batch(self) -> bool:
+        """
+        Return True if external events can be merged with the external queue in a batch,
+        instead of being queued one at a time by *_queue_event*.
+        """
+        # Overridden or wrapped (e.g., by a TraceWriter) _queue_event must see every event
+        return (self._queue_policy is None and '_queue_event' not in vars(self)
+                and type(self)._queue_event is Interpreter._queue_event)
+
+    def execute(self, max_steps: int = -1, time_budget: float = None) -> List[MacroStep]:
         """
         Repeatedly calls *execute_once* and return a list containing
         the returned values of *execute_once*.
 
         Notice that this does NOT return an iterator but computes the whole list first
-        before returning it.
+        before returning it. Use *iterate* to get the macro steps as soon as they are computed.
 
         :param max_steps: An upper bound on the number steps that are computed and returned.
             Default is -1, no limit. Set to a positive integer to avoid infinite loops
             in the statechart execution.
+        :param time_budget: An optional upper bound on the (wall-clock) time spent, in seconds.
+            The execution stops as soon as this budget is exceeded, remaining events
+            will be processed by subsequent calls. At least one step is computed.
         :return: A list of *MacroStep* instances
         """
-        returned_steps = []
+        return list(self.iterate(max_steps, time_budget))
+
+    def iterate(self, max_steps: int = -1, time_budget: float = None) -> Iterator[MacroStep]:
+        """
+        Repeatedly calls *execute_once* and yield its returned values until it returns None.
+
+        Macro steps are computed lazily: *execute_once* is called each time a new macro
+        step is requested.
+
+        :param max_steps: An upper bound on the number steps that are computed and yielded.
+            Default is -1, no limit.
+        :param time_budget: An optional upper bound on the (wall-clock) time spent, in seconds,
+            including the time spent by the consumer of the macro steps. At least one step
+            is computed.
+        :return: An iterator over *MacroStep* instances
+        """
+        deadline = None if time_budget is None else perf_counter() + time_budget
         i = 0
         macro_step = self.execute_once()
         while macro_step:
-            returned_steps.append(macro_step)
+            yield macro_step
             i += 1
             if 0 < max_steps == i:
                 break
+            if deadline is not None and perf_counter() >= deadline:
+                break
             macro_step = self.execute_once()
-        return returned_steps
 
     def execute_once(self) -> Optional[MacroStep]:
         """
@@ -293,6 +493,62 @@ class Interpreter:
 
         :return: a macro step or *None* if nothing happened
         """
+        return cast(Optional[MacroStep], self._execute_once(trace=True))
+
+    def run(self, max_steps: int = -1, time_budget: float = None) -> int:
+        """
+        Repeatedly execute macro steps, as *execute* does, but do not return them.
+
+        The semantics of the execution is the same, but neither the macro steps nor the
+        micro steps returned by *_apply_step* and *_stabilize* are built, unless contracts are
+        checked (a contract violation reports the step in which it occurred). This is the
+        fastest way to execute an interpreter when its trace is not needed.
+
+        If *execute_once* is overridden (or wrapped, e.g., by *sismic.helpers.log_trace*),
+        it is called instead, so that the macro steps are still observed.
+
+        :param max_steps: An upper bound on the number steps that are executed.
+            Default is -1, no limit.
+        :param time_budget: An optional upper bound on the (wall-clock) time spent, in seconds.
+            At least one step is executed.
+        :return: The number of executed macro steps
+        """
+        if 'execute_once' in vars(self) or type(self).execute_once is not Interpreter.execute_once:
+            execute_once = self.execute_once  # type: Callable[[], Any]
+        else:
+            def execute_once():
+                return self._execute_once(trace=False)
+
+        deadline = None if time_budget is None else perf_counter() + time_budget
+        i = 0
+        while execute_once():
+            i += 1
+            if 0 < max_steps == i:
+                break
+            if deadline is not None and perf_counter() >= deadline:
+                break
+        return i
+
+    def _execute_once(self, trace: bool) -> Union[MacroStep, bool, None]:
+        """
+        Execute a macro step, see *execute_once*.
+
+        :param trace: set to False to avoid building the macro step and its micro steps.
+        :return: a macro step or *None* if nothing happened. If *trace* is False and
+            contracts are not checked, True is returned instead of a macro step.
+        """
+        # Events queued by this thread cannot wait for the queue to be consumed
+        self._executing_thread = threading.get_ident()
+
+        # Events queued by other threads
+        if self._inbound:
+            self._drain_inbound()
+
+        # Cancelled events are lazily removed, unless they were already consumed
+        if len(self._cancelled) > 2 * (len(self._internal_queue) + len(self._external_queue)
+                                       + len(self._inbound)):
+            self._forget_cancelled()
+
         # Store time to have a consistent time value during this step
         self._time = self.clock.time
 
@@ -305,6 +561,11 @@ class Interpreter:
         # Compute steps
         computed_steps = self._compute_steps()
 
+        # Contracts are checked unless they are ignored (and not overridden)
+        check_contract = (not self._ignore_contract
+                          or type(self)._evaluate_contract_conditions
+                          is not Interpreter._evaluate_contract_conditions)
+
         if len(computed_steps) > 0:
 
             # Consume event if it triggered a transition
@@ -320,26 +581,135 @@ class Interpreter:
                               DeprecationWarning)
                 self._evaluator.on_step_starts(event)
 
-            executed_steps = []
-            for step in computed_steps:
-                executed_steps.append(self._apply_step(step))
-                executed_steps.extend(self._stabilize())
+            macro_step = True  # type: Union[MacroStep, bool, None]
+            if trace or check_contract:
+                executed_steps = []
+                for step in computed_steps:
+                    executed_steps.append(self._apply_step(step))
+                    executed_steps.extend(self._stabilize(executed_steps[-1].entered_states))
 
-            # type: Optional[MacroStep]
-            macro_step = MacroStep(time=self.time, steps=executed_steps)
+                macro_step = MacroStep(time=self.time, steps=executed_steps)
+            else:
+                self._trace_steps = False
+                try:
+                    for step in computed_steps:
+                        self._stabilize(self._apply_step(step).entered_states)
+                finally:
+                    self._trace_steps = True
         else:  # No step
             macro_step = None
 
         # Check state invariants
-        configuration = self.configuration  # Use self.configuration to benefit from the sorting
-        for name in configuration:
-            state = self._statechart.state_for(name)
-            self._evaluate_contract_conditions(state, 'invariants', macro_step)
+        if check_contract:
+            # Use self.configuration to benefit from the sorting
+            for name in self.configuration:
+                state = self._statechart.state_for(name)
+                self._evaluate_contract_conditions(
+                    state, 'invariants', cast(Optional[MacroStep], macro_step))
 
         self._raise_event(MetaEvent('step ended'))
 
         return macro_step
 
+    def run_until(self, time: float) -> int:
+        """
+        Execute the statechart until given time is reached, by advancing its *SimulatedClock*
+        directly from one relevant instant to the next one, instead of advancing it by small
+        increments.
+
+        Relevant instants are the times at which a delayed event is to be processed, and the
+        times at which the *after* or *idle* functions used in the guard of an eventless
+        transition of an active state will be satisfied. Macro steps are executed (see *run*)
+        at each of these instants, and the clock is finally set to given time.
+
+        The clock should not be started (see *SimulatedClock.start*), and guards that depend
+        on time in another way (e.g., that refer to *time*) are only evaluated at these
+        instants. Evaluators that do not provide *next_deadline* are only considered for
+        delayed events.
+
+        :param time: time to reach
+        :return: The number of executed macro steps
+        :raise ValueError: if the clock of this interpreter is not a *SimulatedClock*, or
+            if given time is lower than the current time of the clock.
+        """
+        if not isinstance(self.clock, SimulatedClock):
+            raise ValueError('run_until requires a SimulatedClock, not {}'.format(self.clock))
+        if time < self.clock.time:
+            raise ValueError('Time must be monotonic, cannot run from {} until {}'.format(
+                self.clock.time, time))
+
+        self._evaluator.track_deadlines()
+        steps = self.run()
+        instant = self._next_instant()
+        while instant is not None and instant <= time:
+            self.clock.time = instant
+            steps += self.run()
+            instant = self._next_instant()
+
+        if self.clock.time < time:
+            self.clock.time = time
+            steps += self.run()
+        return steps
+
+    def run_until_quiescent(self, max_time: float = None) -> int:
+        """
+        Execute the statechart, as *run_until* does, until there is no relevant instant left,
+        that is, until no delayed event is queued and no eventless transition of an active
+        state waits for time to elapse. The clock is left at the time of the last
+        relevant instant, or at *max_time* if it was reached.
+
+        :param max_time: An optional upper bound on the time to reach. This prevents infinite
+            executions with statecharts that periodically wait (e.g., a transition guarded by
+            *after* that loops on its source state).
+        :return: The number of executed macro steps
+        :raise ValueError: if the clock of this interpreter is not a *SimulatedClock*.
+        """
+        if not isinstance(self.clock, SimulatedClock):
+            raise ValueError(
+                'run_until_quiescent requires a SimulatedClock, not {}'.format(self.clock))
+
+        self._evaluator.track_deadlines()
+        steps = self.run()
+        instant = self._next_instant()
+        while instant is not None and (max_time is None or instant <= max_time):
+            self.clock.time = instant
+            steps += self.run()
+            instant = self._next_instant()
+
+        if instant is not None and self.clock.time < max_time:
+            self.clock.time = max_time
+            steps += self.run()
+        return steps
+
+    def _next_instant(self) -> Optional[float]:
+        """
+        Return the next time (strictly after current time) at which something could happen
+        without any new event being queued: a delayed event is to be processed, or the guard
+        of an eventless transition of an active state could be satisfied (see
+        *Evaluator.next_deadline*).
+
+        :return: a time value or None
+        """
+        instants = []
+
+        for queue in cast(
+                Tuple[List[Tuple[float, Event]]],
+                (self._internal_queue, self._external_queue)):
+            for time, event in queue:
+                if self._cancelled.get(id(event), None) is not event:
+                    instants.append(time)
+                    break
+
+        transitions = [t for t in self._statechart.transitions
+                       if t.event is None and t.guard and t.source in self._configuration]
+        if transitions:
+            deadline = self._evaluator.next_deadline(transitions)
+            if deadline is not None:
+                instants.append(deadline)
+
+        instants = [instant for instant in instants if instant > self.time]
+        return min(instants, default=None)
+
     def _queue_event(self, event: Event):
         """
         Convenient helper to queue events wrt. to internal/external and their (optional) delay.
@@ -352,6 +722,10 @@ class Interpreter:
             queue = self._external_queue
 
         time = self.time + getattr(event, 'delay', 0)
+        if queue is self._external_queue and self._queue_policy is not None:
+            if not self._queue_policy.admit(self, time, event):
+                return
+
         position = bisect.bisect_right(  # type: ignore
             _KeyifyList(queue, lambda t: (t[0], not isinstance(t[1], InternalEvent))),
             (time, not isinstance(event, InternalEvent))
@@ -391,11 +765,23 @@ class Interpreter:
         for queue in cast(
                 Tuple[List[Tuple[float, Event]]],
                 (self._internal_queue, self._external_queue)):
+            # Lazily remove cancelled events
+            while self._cancelled and len(queue) > 0:
+                event = queue[0][1]
+                if self._cancelled.get(id(event), None) is not event:
+                    break
+                del self._cancelled[id(event)]
+                queue.pop(0)
+                if queue is self._external_queue and self._queue_policy is not None:
+                    self._queue_policy.consumed()
+
             if len(queue) > 0:
                 time, event = queue[0]
                 if time <= self.time:
                     if consume:
                         queue.pop(0)
+                        if queue is self._external_queue and self._queue_policy is not None:
+                            self._queue_policy.consumed()
                     return event
         return None
 
@@ -501,44 +887,66 @@ class Interpreter:
         """
         if len(transitions) > 1:
             # If more than one transition, we check (1) they are from separate regions and (2) they
-            # do not conflict. Two transitions conflict if one of them leaves the parallel state
-            for t1, t2 in combinations(transitions, 2):
-                # Check (1)
-                lca = cast(str, self._statechart.least_common_ancestor(t1.source, t2.source))
-                lca_state = self._statechart.state_for(lca)
-
-                # Their LCA must be an orthogonal state!
-                if not isinstance(lca_state, OrthogonalState):
+            # do not conflict. Two transitions conflict if one of them leaves the parallel state.
+            # These checks are not needed if they were statically proven (see check_determinism).
+            report = self._statechart._cache.get('determinism')
+            if (report is not None and report.proven(transitions)
+                    and type(self)._select_transitions is Interpreter._select_transitions):
+                pairs = []  # type: Iterable[Tuple[Transition, Transition]]
+            else:
+                pairs = combinations(transitions, 2)
+
+            for t1, t2 in pairs:
+                error = self._transitions_conflict(t1, t2)
+                if error is NonDeterminismError:
                     raise NonDeterminismError(
                         'Non-determinist choice between transitions {t1} and {t2}'
                         '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
                         .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
                     )
-
-                # Check (2)
-                # This check must be done wrt. to LCA, as the combination of from_states could
-                # come from nested parallel regions!
-                for transition in [t1, t2]:
-                    last_before_lca = transition.source
-                    for state in self._statechart.ancestors_for(transition.source):
-                        if state == lca:
-                            break
-                        last_before_lca = state
-                    # Target must be a descendant (or self) of this state
-                    if (transition.target and (transition.target not in [
-                            last_before_lca] + self._statechart.descendants_for(last_before_lca))):
-                        raise ConflictingTransitionsError(
-                            'Conflicting transitions: {t1} and {t2}'
-                            '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
-                            .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
-                        )
+                elif error is ConflictingTransitionsError:
+                    raise ConflictingTransitionsError(
+                        'Conflicting transitions: {t1} and {t2}'
+                        '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
+                        .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
+                    )
 
             # Define an arbitrary order based on the depth and the name of source states.
-            transitions = sorted(
-                transitions, key=lambda t: (-self._statechart.depth_for(t.source), t.source))
+            keys = self._statechart._cache.setdefault('transition order', {})
+            for transition in transitions:
+                if transition.source not in keys:
+                    keys[transition.source] = (
+                        -self._statechart.depth_for(transition.source), transition.source)
+            transitions = sorted(transitions, key=lambda t: keys[t.source])
 
         return transitions
 
+    def _transitions_conflict(self, t1: Transition, t2: Transition) -> Optional[type]:
+        """
+        Check whether given transitions can be processed during the same step, i.e. (1) they are
+        from separate regions and (2) none of them leaves the orthogonal state that contains both
+        of them.
+
+        As this only depends on the source and the target of the transitions, the result of
+        *sismic.interpreter.analysis.transitions_conflict* is computed once per statechart for
+        each pair of sources and targets.
+
+        :param t1: a *Transition* instance
+        :param t2: a *Transition* instance
+        :return: *NonDeterminismError* if (1) does not hold, *ConflictingTransitionsError* if
+            (2) does not hold, or *None*.
+        """
+        verdicts = self._statechart._cache.setdefault('transition conflicts', {})
+        key = (t1.source, t1.target, t2.source, t2.target)
+        try:
+            return verdicts[key]
+        except KeyError:
+            pass
+
+        verdict = transitions_conflict(self._statechart, t1, t2)
+        verdicts[key] = verdict
+        return verdict
+
     def _compute_steps(self) -> List[MicroStep]:
         """
         Compute and returns the next steps based on current configuration
@@ -638,6 +1046,10 @@ class Interpreter:
          - Enter the children of an orthogonal state with no active child
          - Empty active configuration if root's child is a final state
 
+        By default, stabilization only considers the states that were entered by the previous
+        steps (see *_stabilize*). If this method is overridden, it is called with the whole active
+        configuration after each step.
+
         :param names: List of states to consider (usually, the active configuration)
         :return: A *MicroStep* instance or *None* if this statechart can not be more stabilized
         """
@@ -647,18 +1059,31 @@ class Interpreter:
                         key=lambda s: (-self._statechart.depth_for(s.name), s.name))
 
         for leaf in leaves:
-            if isinstance(
-                    leaf, FinalState) and self._statechart.parent_for(
-                    leaf.name) == self._statechart.root:
-                return MicroStep(exited_states=[leaf.name, cast(str, self._statechart.root)])
-            if isinstance(leaf, (ShallowHistoryState, DeepHistoryState)):
-                states_to_enter = cast(List[str], self._memory.get(leaf.name, [leaf.memory]))
-                states_to_enter.sort(key=lambda x: (self._statechart.depth_for(x), x))
-                return MicroStep(entered_states=states_to_enter, exited_states=[leaf.name])
-            elif isinstance(leaf, OrthogonalState) and self._statechart.children_for(leaf.name):
-                return MicroStep(entered_states=sorted(self._statechart.children_for(leaf.name)))
-            elif isinstance(leaf, CompoundState) and leaf.initial:
-                return MicroStep(entered_states=[leaf.initial])
+            step = self._stabilization_step_for(leaf)
+            if step is not None:
+                return step
+
+        return None
+
+    def _stabilization_step_for(self, leaf: StateMixin) -> Optional[MicroStep]:
+        """
+        Return the stabilization step for given leaf of the active configuration.
+
+        :param leaf: an active state that has no active child
+        :return: A *MicroStep* instance or *None* if this state is stable
+        """
+        if isinstance(
+                leaf, FinalState) and self._statechart.parent_for(
+                leaf.name) == self._statechart.root:
+            return MicroStep(exited_states=[leaf.name, cast(str, self._statechart.root)])
+        if isinstance(leaf, (ShallowHistoryState, DeepHistoryState)):
+            states_to_enter = cast(List[str], self._memory.get(leaf.name, [leaf.memory]))
+            states_to_enter.sort(key=lambda x: (self._statechart.depth_for(x), x))
+            return MicroStep(entered_states=states_to_enter, exited_states=[leaf.name])
+        elif isinstance(leaf, OrthogonalState) and self._statechart.children_for(leaf.name):
+            return MicroStep(entered_states=sorted(self._statechart.children_for(leaf.name)))
+        elif isinstance(leaf, CompoundState) and leaf.initial:
+            return MicroStep(entered_states=[leaf.initial])
 
         return None
 
@@ -667,12 +1092,14 @@ class Interpreter:
         Apply given *MicroStep* on this statechart
 
         :param step: *MicroStep* instance
-        :return: a new MicroStep, completed with sent events
+        :return: a new MicroStep, completed with sent events. Given step is returned
+            instead when steps are not traced (see *run*).
         """
         entered_states = list(map(self._statechart.state_for, step.entered_states))
         exited_states = list(map(self._statechart.state_for, step.exited_states))
 
-        active_configuration = set(self._configuration)  # Copy
+        # Copy, to remember the configuration before exiting states
+        active_configuration = set(self._configuration) if exited_states else self._configuration
 
         sent_events = []  # type: List[Event]
 
@@ -752,24 +1179,112 @@ class Interpreter:
             self._raise_event(event)
             self._sent_events.append(event)
 
+        if not self._trace_steps:
+            return step
+
         return MicroStep(event=step.event, transition=step.transition,
                          entered_states=step.entered_states, exited_states=step.exited_states,
                          sent_events=sent_events)
 
-    def _stabilize(self) -> List[MicroStep]:
+    def _stabilize(self, names: Iterable[str] = None) -> List[MicroStep]:
         """
         Compute, apply and return stabilization steps.
 
+        Only the given states, and the states that are entered during stabilization, can be
+        unstable. They are kept in a worklist, so that the cost of each stabilization step
+        does not depend on the size of the active configuration. As for
+        *_create_stabilization_step*, the deepest unstable leaf (ties are broken according to
+        the lexicographic order on the state name) is stabilized first.
+
+        If *_create_stabilization_step* is overridden, it is called with the whole active
+        configuration instead.
+
+        :param names: names of the states that could be unstable (e.g. the states entered
+            by the previous step). By default, the whole active configuration is considered.
         :return: A list of applied  *MicroStep* instances,
         """
-        # Stabilization
         steps = []
-        step = self._create_stabilization_step(self._configuration)
-        while step is not None:
-            steps.append(self._apply_step(step))
+
+        if type(self)._create_stabilization_step is not Interpreter._create_stabilization_step:
             step = self._create_stabilization_step(self._configuration)
+            while step is not None:
+                steps.append(self._apply_step(step))
+                step = self._create_stabilization_step(self._configuration)
+            return steps
+
+        worklist = []  # type: List[Tuple[int, str]]
+        for name in self._configuration if names is None else names:
+            heapq.heappush(worklist, (-self._statechart.depth_for(name), name))
+
+        while worklist:
+            _, name = heapq.heappop(worklist)
+
+            # Skip exited states and states that are not leaves
+            if name not in self._configuration:
+                continue
+            if any(child in self._configuration for child in self._statechart.children_for(name)):
+                continue
+
+            # Statically known stabilization steps can be applied at once
+            plan = self._default_entry_plan(name)
+            if plan is not None:
+                for entered_states in plan:
+                    steps.append(self._apply_step(MicroStep(entered_states=entered_states)))
+                continue
+
+            step = self._stabilization_step_for(self._statechart.state_for(name))
+            if step is not None:
+                step = self._apply_step(step)
+                steps.append(step)
+                for entered in step.entered_states:
+                    heapq.heappush(worklist, (-self._statechart.depth_for(entered), entered))
+
         return steps
 
+    def _default_entry_plan(self, name: str) -> Optional[List[List[str]]]:
+        """
+        Return the states that are successively entered by the stabilization steps of given
+        state, when it is a leaf of the active configuration.
+
+        This sequence is static, and is computed once per statechart, unless a history state or
+        a final state that is a child of the root state is reached. The order of the steps is the
+        one of *_stabilize*: the deepest leaf is stabilized first.
+
+        :param name: name of a state
+        :return: a (possibly empty) list of lists of states to enter, or *None* if the
+            stabilization of this state depends on the execution.
+        """
+        plans = self._statechart._cache.setdefault('default entry plans', {})
+        try:
+            return plans[name]
+        except KeyError:
+            pass
+
+        plan = []  # type: Optional[List[List[str]]]
+        worklist = [(-self._statechart.depth_for(name), name)]
+        while worklist:
+            _, leaf_name = heapq.heappop(worklist)
+            leaf = self._statechart.state_for(leaf_name)
+
+            if isinstance(leaf, (ShallowHistoryState, DeepHistoryState)) or (
+                    isinstance(leaf, FinalState)
+                    and self._statechart.parent_for(leaf_name) == self._statechart.root):
+                plan = None
+                break
+            elif isinstance(leaf, OrthogonalState) and self._statechart.children_for(leaf_name):
+                entered_states = sorted(self._statechart.children_for(leaf_name))
+            elif isinstance(leaf, CompoundState) and leaf.initial:
+                entered_states = [leaf.initial]
+            else:
+                continue
+
+            plan.append(entered_states)
+            for entered in entered_states:
+                heapq.heappush(worklist, (-self._statechart.depth_for(entered), entered))
+
+        plans[name] = plan
+        return plan
+
     def _evaluate_contract_conditions(self, obj: Union[Transition, StateMixin],
                                       cond_type: str,
                                       step: Optional[Union[MacroStep, MicroStep]] = None) -> None:
@@ -795,5 +1310,12 @@ class Interpreter:
             raise exception_klass(configuration=self.configuration, step=step, obj=obj,
                                   assertion=condition, context=self.context)
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Ids of unpickled (or copied) events have changed
+        cancelled = state.get('_cancelled', {})
+        self._cancelled = {id(event): event for event in cancelled.values()}
+        self._executing_thread = None
+
     def __repr__(self):
         return '{}({!r})'.format(self.__class__.__name__, self._statechart)
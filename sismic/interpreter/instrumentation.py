@@ -0,0 +1,230 @@
+import json
+import os
+
+from functools import wraps
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from ..model import MetaEvent
+
+__all__ = ['PhaseTimer']
+
+
+# Phases that are measured, as (attribute name, phase name) for the interpreter and its evaluator
+_INTERPRETER_PHASES = [
+    ('_select_event', 'event selection'),
+    ('_select_transitions', 'transition selection'),
+    ('_sort_transitions', 'transition sorting'),
+    ('_create_steps', 'step creation'),
+    ('_apply_step', 'step application'),
+    ('_stabilize', 'stabilization'),
+]
+_EVALUATOR_PHASES = [
+    ('execute_on_exit', 'on exit'),
+    ('execute_action', 'action'),
+    ('execute_on_entry', 'on entry'),
+]
+
+
+class PhaseTimer:
+    """
+    Measure how each call to *execute_once* of an interpreter splits its time between the
+    phases of the execution:
+
+     - *event selection*: calls to *_select_event*;
+     - *transition selection*: calls to *_select_transitions*;
+     - *transition sorting*: calls to *_sort_transitions*;
+     - *step creation*: calls to *_create_steps*;
+     - *step application*: calls to *_apply_step*, including the *on exit*, *action* and
+       *on entry* phases, that correspond to the execution of the code of the statechart;
+     - *stabilization*: calls to *_stabilize*;
+     - *preconditions*, *postconditions* and *invariants*: contract checking;
+     - *listeners*: dispatch of meta-events to the attached listeners.
+
+    Similarly to *sismic.helpers.log_trace*, a timer wraps these methods on the given
+    interpreter (and on its evaluator) instance, so that an interpreter that is not
+    instrumented is not slowed down at all. Method *detach* restores the original methods.
+    A timer can also be used as a context manager, in which case it is detached on exit.
+
+    Phases are nested (e.g., *stabilization* contains *step application*), and the time of
+    a phase includes the time of its nested phases.
+
+    :param interpreter: an *Interpreter* instance to instrument
+    """
+
+    def __init__(self, interpreter) -> None:
+        self._interpreter = interpreter
+        self._origin = perf_counter()
+        self._step = -1
+        self._spans = []  # type: List[Tuple[int, str, float, float]]
+        self._patched = []  # type: List[Tuple[Any, str, Any]]
+
+        for attribute, phase in _INTERPRETER_PHASES:
+            self._wrap(interpreter, attribute, phase)
+        for attribute, phase in _EVALUATOR_PHASES:
+            self._wrap(interpreter._evaluator, attribute, phase)
+        self._wrap_execute_once()
+        self._wrap_contract_conditions()
+        self._wrap_raise_event()
+
+    def _patch(self, obj: Any, attribute: str, func) -> None:
+        """
+        Replace given attribute of given object, and remember how to restore it.
+        """
+        self._patched.append((obj, attribute, vars(obj).get(attribute, None)))
+        setattr(obj, attribute, func)
+
+    def _wrap(self, obj: Any, attribute: str, phase: str) -> None:
+        """
+        Wrap given method of given object so that each call is recorded as a span of given phase.
+        """
+        func = getattr(obj, attribute)
+        spans = self._spans
+
+        @wraps(func)
+        def new_func(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                spans.append((self._step, phase, start, perf_counter()))
+
+        self._patch(obj, attribute, new_func)
+
+    def _wrap_execute_once(self) -> None:
+        func = self._interpreter.execute_once
+        spans = self._spans
+
+        @wraps(func)
+        def new_func():
+            self._step += 1
+            start = perf_counter()
+            try:
+                return func()
+            finally:
+                spans.append((self._step, 'execute_once', start, perf_counter()))
+
+        self._patch(self._interpreter, 'execute_once', new_func)
+
+    def _wrap_contract_conditions(self) -> None:
+        func = self._interpreter._evaluate_contract_conditions
+        spans = self._spans
+
+        @wraps(func)
+        def new_func(obj, cond_type, step=None):
+            start = perf_counter()
+            try:
+                return func(obj, cond_type, step)
+            finally:
+                spans.append((self._step, cond_type, start, perf_counter()))
+
+        self._patch(self._interpreter, '_evaluate_contract_conditions', new_func)
+
+    def _wrap_raise_event(self) -> None:
+        func = self._interpreter._raise_event
+        spans = self._spans
+
+        @wraps(func)
+        def new_func(event):
+            # Internal events are queued, and then raise meta-events
+            if not isinstance(event, MetaEvent):
+                return func(event)
+            start = perf_counter()
+            try:
+                return func(event)
+            finally:
+                spans.append((self._step, 'listeners', start, perf_counter()))
+
+        self._patch(self._interpreter, '_raise_event', new_func)
+
+    def detach(self) -> None:
+        """
+        Restore the methods of the interpreter and of its evaluator. Measures are kept.
+        """
+        while self._patched:
+            obj, attribute, previous = self._patched.pop()
+            if previous is None:
+                delattr(obj, attribute)
+            else:
+                setattr(obj, attribute, previous)
+
+    def reset(self) -> None:
+        """
+        Discard all the measures.
+        """
+        self._spans.clear()
+        self._step = -1
+        self._origin = perf_counter()
+
+    @property
+    def spans(self) -> List[Tuple[int, str, float, float]]:
+        """
+        List of measured spans, as (step, phase, start, end) tuples, where *step* is the
+        index of the corresponding call to *execute_once* (starting at 0), and *start* and *end*
+        are the values of *time.perf_counter* (in seconds) at the beginning and at the end of the
+        phase. Spans are ordered by their end.
+        """
+        return list(self._spans)
+
+    @property
+    def steps(self) -> List[Mapping[str, float]]:
+        """
+        Time spent in each phase (in seconds) for each call to *execute_once*, as a list of
+        mappings between phase names and durations. The *execute_once* key corresponds to
+        the whole call.
+        """
+        steps = [dict() for _ in range(self._step + 1)]  # type: List[Dict[str, float]]
+        for step, phase, start, end in self._spans:
+            if step >= 0:
+                steps[step][phase] = steps[step].get(phase, 0) + (end - start)
+        return steps
+
+    def totals(self) -> Mapping[str, float]:
+        """
+        Return the total time spent in each phase (in seconds), for all the calls to
+        *execute_once*.
+        """
+        totals = {}  # type: Dict[str, float]
+        for _, phase, start, end in self._spans:
+            totals[phase] = totals.get(phase, 0) + (end - start)
+        return totals
+
+    def export_chrome_trace(self, filepath: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Export the measured spans using the trace event format of Chrome, that can be loaded
+        in *chrome://tracing* or in Perfetto (https://ui.perfetto.dev) to inspect the
+        timeline of the execution.
+
+        :param filepath: if provided, path to the JSON file where the trace is written.
+        :return: the trace, as a JSON-serializable dictionary.
+        """
+        pid = os.getpid()
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': 'sismic: {}'.format(self._interpreter.statechart.name)},
+        }]  # type: List[Dict[str, Any]]
+
+        # Outer spans are ended after their nested spans, but must be listed first
+        for step, phase, start, end in sorted(self._spans, key=lambda s: (s[2], -s[3])):
+            events.append({
+                'name': phase,
+                'cat': 'sismic',
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': pid,
+                'tid': 0,
+                'args': {'step': step},
+            })
+
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if filepath is not None:
+            with open(filepath, 'w') as f:
+                json.dump(trace, f)
+        return trace
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.detach()
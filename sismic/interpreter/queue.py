@@ -0,0 +1,214 @@
+import threading
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..exceptions import QueueFullError
+from ..model import Event
+
+__all__ = ['QueuePolicy']
+
+
+class QueuePolicy:
+    """
+    A policy that is applied to the external events that are queued in an interpreter,
+    to bound the size of its external queue and to coalesce events.
+
+    When an event is queued while the queue contains *max_size* events, *overflow* determines
+    what happens:
+
+     - *raise*: a *QueueFullError* is raised, and the event is not queued.
+     - *drop-newest*: the event is dropped.
+     - *drop-oldest*: the first event of the queue is dropped, and the event is queued.
+     - *block*: *Interpreter.queue_threadsafe* waits until an event is consumed by the thread
+       that executes the interpreter (e.g., an *AsyncRunner*), for at most *timeout* seconds.
+       A *QueueFullError* is raised if the timeout expires. Events that are buffered by
+       *queue_threadsafe* are counted in the size of the queue. It does not wait if the calling
+       thread is the one that executes (or last executed) the interpreter, or if the interpreter
+       was never executed, as no other thread would consume an event. The other methods (e.g.,
+       *Interpreter.queue*) are not thread-safe: they must be called by the thread that
+       executes the interpreter, and raise a *QueueFullError* instead of waiting.
+
+    If *coalesce* is set, an event is coalesced with the event having the same name that is
+    still in the queue, if any. This event keeps its position in the queue, but it is replaced
+    by the new one (*latest*), or by an event whose parameters are the ones of the queued event
+    updated by the ones of the new event (*merge*).
+
+    The number of dropped and coalesced events are available through the *dropped* and
+    *coalesced* attributes. Cancelled events that are not yet removed from the queue are
+    counted in its size.
+
+    A policy holds data that are specific to an interpreter, and must not be shared by
+    several interpreters.
+
+    :param max_size: maximal number of events in the external queue. No limit by default.
+    :param overflow: either *raise* (default), *drop-newest*, *drop-oldest* or *block*.
+    :param coalesce: either *None* (default), *latest* or *merge*.
+    :param timeout: maximal time to wait (in seconds) for the *block* policy. No limit by default.
+    """
+
+    OVERFLOWS = ('raise', 'drop-newest', 'drop-oldest', 'block')
+    COALESCES = (None, 'latest', 'merge')
+
+    def __init__(self, max_size: int = None, overflow: str = 'raise', coalesce: str = None,
+                 timeout: float = None) -> None:
+        if overflow not in self.OVERFLOWS:
+            raise ValueError('Unknown overflow policy: {}'.format(overflow))
+        if coalesce not in self.COALESCES:
+            raise ValueError('Unknown coalescing policy: {}'.format(coalesce))
+        if max_size is not None and max_size < 1:
+            raise ValueError('max_size must be a positive integer, not {}'.format(max_size))
+
+        self.max_size = max_size
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.timeout = timeout
+
+        self.dropped = 0
+        self.coalesced = 0
+
+        # Latest queued event per name, with its time
+        self._latest = {}  # type: Dict[str, Tuple[float, Event]]
+        self._condition = threading.Condition()
+
+    def reset(self) -> None:
+        """
+        Reset the counters of dropped and coalesced events.
+        """
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _position(self, interpreter, entry: Tuple[float, Event]) -> Optional[int]:
+        """
+        Return the position of given entry in the external queue of given interpreter, or
+        None if it is no longer queued (or if it is cancelled).
+        """
+        time, event = entry
+        if interpreter._cancelled.get(id(event), None) is event:
+            return None
+
+        queue = interpreter._external_queue  # type: List[Tuple[float, Event]]
+        position = _bisect_left(queue, time)
+        while position < len(queue) and queue[position][0] == time:
+            if queue[position][1] is event:
+                return position
+            position += 1
+        return None
+
+    def admit(self, interpreter, time: float, event: Event) -> bool:
+        """
+        Apply this policy on given event, that is about to be queued with given time in the
+        external queue of given interpreter. This method is called by the interpreter.
+
+        :param interpreter: an *Interpreter* instance
+        :param time: time at which the event should be processed
+        :param event: event to queue
+        :return: True if the event has to be queued, False if it was dropped or coalesced.
+        :raise QueueFullError: if the queue is full, depending on the overflow policy.
+        """
+        queue = interpreter._external_queue  # type: List[Tuple[float, Event]]
+
+        if self.coalesce is not None:
+            entry = self._latest.get(event.name, None)
+            position = None if entry is None else self._position(interpreter, entry)
+            if position is not None:
+                queued_time, queued_event = queue[position]
+                if self.coalesce == 'merge':
+                    data = dict(queued_event.data)
+                    data.update(event.data)
+                    event = Event(event.name, **data)
+                queue[position] = (queued_time, event)
+                self._latest[event.name] = (queued_time, event)
+                self.coalesced += 1
+                return False
+
+        if self.max_size is not None and len(queue) >= self.max_size:
+            if self.overflow == 'raise':
+                raise QueueFullError('External queue is full ({} events), cannot queue {}'.format(
+                    len(queue), event))
+            elif self.overflow == 'drop-newest':
+                self.dropped += 1
+                return False
+            elif self.overflow == 'drop-oldest':
+                queue.pop(0)
+                self.dropped += 1
+            else:
+                # Only queue_threadsafe can wait for another thread to consume an event
+                raise QueueFullError(
+                    'External queue is full ({} events), cannot queue {} without waiting '
+                    '(see queue_threadsafe)'.format(len(queue), event))
+
+        if self.coalesce is not None:
+            self._latest[event.name] = (time, event)
+        return True
+
+    def buffer(self, interpreter, events: List[Event]) -> None:
+        """
+        Append given events to the inbound buffer of given interpreter (see
+        *Interpreter.queue_threadsafe*). This method is called by the interpreter, from any
+        thread, and does not modify the external queue.
+
+        With the *block* policy, each event waits until the external queue and the inbound
+        buffer have room for it, unless the calling thread is the one that executes (or last
+        executed) the interpreter, or the interpreter was never executed. Other policies are
+        applied when the buffered events are moved to the external queue.
+
+        :param interpreter: an *Interpreter* instance
+        :param events: events to buffer
+        :raise QueueFullError: if the timeout of the *block* policy expires. The events that
+            precede the one that could not be buffered are kept in the buffer.
+        """
+        inbound = interpreter._inbound
+        if (self.overflow != 'block' or self.max_size is None
+                or interpreter._executing_thread in (None, threading.get_ident())):
+            inbound.extend(events)
+            return
+
+        def has_room():
+            return len(interpreter._external_queue) + len(inbound) < self.max_size
+
+        # Producers are serialized, so that they cannot exceed max_size together
+        with self._condition:
+            for event in events:
+                if not self._condition.wait_for(has_room, self.timeout):
+                    raise QueueFullError(
+                        'External queue is still full ({} events) after {} seconds, '
+                        'cannot queue {}'.format(
+                            len(interpreter._external_queue) + len(inbound), self.timeout,
+                            event))
+                inbound.append(event)
+
+    def consumed(self) -> None:
+        """
+        Notify that an event was consumed from the external queue. This method is called by
+        the interpreter, and wakes up the calls that are blocked by the *block* policy.
+        """
+        if self.overflow == 'block':
+            with self._condition:
+                self._condition.notify_all()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_condition']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return '{}(max_size={!r}, overflow={!r}, coalesce={!r})'.format(
+            self.__class__.__name__, self.max_size, self.overflow, self.coalesce)
+
+
+def _bisect_left(queue: List[Tuple[float, Any]], time: float) -> int:
+    """
+    Return the leftmost position of given time in given (sorted) queue.
+    """
+    low, high = 0, len(queue)
+    while low < high:
+        middle = (low + high) // 2
+        if queue[middle][0] < time:
+            low = middle + 1
+        else:
+            high = middle
+    return low
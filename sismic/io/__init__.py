@@ -1,7 +1,13 @@
 from .yaml import import_from_yaml, export_to_yaml
+from .json import import_from_json, export_to_json
+from .msgpack import import_from_msgpack, export_to_msgpack
 from .plantuml import export_to_plantuml
+from .trace import TraceWriter, read_trace, replay_trace
 
 __all__ = [
     'import_from_yaml', 'export_to_yaml',
+    'import_from_json', 'export_to_json',
+    'import_from_msgpack', 'export_to_msgpack',
     'export_to_plantuml',
+    'TraceWriter', 'read_trace', 'replay_trace',
 ]
@@ -0,0 +1,88 @@
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+
+from typing import Any, Optional
+
+from .. import __version__
+from ..code.python import _code_fragments, _compile, _compiled_code
+from ..model import Statechart
+
+__all__ = ['cache_key', 'load_from_cache', 'save_to_cache']
+
+
+def cache_key(text: str, *options: Any) -> str:
+    """
+    Return a key that identifies a statechart loaded from given source text with given options.
+    The key also depends on the versions of Sismic and of Python, as the cached statechart
+    contains marshaled code objects.
+
+    :param text: source text of the statechart
+    :param options: any additional value that could affect the loaded statechart
+    :return: a hexadecimal key
+    """
+    digest = hashlib.sha256()
+    digest.update(text.encode('utf-8'))
+    digest.update(repr((__version__, sys.version, sys.implementation.cache_tag) + options)
+                  .encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_from_cache(cache_dir: str, key: str) -> Optional[Statechart]:
+    """
+    Load the statechart stored with given key in given cache directory, and register its
+    precompiled code fragments so that they are not compiled again by *PythonEvaluator*.
+
+    Cache files are unpickled, so the cache directory must be trusted.
+
+    :param cache_dir: path to the cache directory
+    :param key: a key, as returned by *cache_key*
+    :return: the cached statechart, or None if there is no (usable) cached statechart.
+    """
+    try:
+        with open(os.path.join(cache_dir, key + '.pickle'), 'rb') as f:
+            data = pickle.load(f)
+        statechart = data['statechart']
+        code = {
+            fragment: marshal.loads(compiled_code)
+            for fragment, compiled_code in data['code'].items()
+        }
+    except Exception:
+        # Missing, outdated or corrupted cache file
+        return None
+
+    for fragment, compiled_code in code.items():
+        _compiled_code.setdefault(fragment, compiled_code)
+    return statechart
+
+
+def save_to_cache(cache_dir: str, key: str, statechart: Statechart) -> None:
+    """
+    Store given statechart and its compiled code fragments with given key in given
+    cache directory. The cache file is atomically replaced.
+
+    :param cache_dir: path to the cache directory, created if needed.
+    :param key: a key, as returned by *cache_key*
+    :param statechart: statechart to store
+    """
+    code = {}
+    for fragment in _code_fragments(statechart):
+        try:
+            code[fragment] = marshal.dumps(_compile(*fragment))
+        except SyntaxError:
+            # Will be reported when the fragment is executed or evaluated
+            pass
+    data = pickle.dumps({'statechart': statechart, 'code': code}, pickle.HIGHEST_PROTOCOL)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(cache_dir, key + '.pickle'))
+    except BaseException:
+        os.remove(temp_path)
+        raise
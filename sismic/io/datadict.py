@@ -6,7 +6,120 @@ from ..model import (ActionStateMixin, BasicState, CompositeStateMixin,
                      OrthogonalState, ShallowHistoryState, Statechart,
                      StateMixin, Transition, TransitionStateMixin)
 
-__all__ = ['import_from_dict', 'export_to_dict']
+__all__ = ['import_from_dict', 'export_to_dict', 'validate_dict']
+
+
+def validate_dict(data: Any) -> Mapping[str, Any]:
+    """
+    Validate the structure of given data and return a copy of it in which scalar values
+    are converted to their expected type, following *sismic.io.yaml.SCHEMA*.
+
+    This function is equivalent to (but much faster than) validating *data* against
+    *SCHEMA* with the *schema* library.
+
+    :param data: data to validate, e.g. as loaded from a YAML or JSON file.
+    :return: the validated data.
+    :raise ValueError: if the structure of given data is not valid.
+    """
+    _check_keys(data, 'data', ('statechart', ), ())
+    statechart_d = data['statechart']
+    _check_keys(statechart_d, 'statechart', ('name', 'root state'), ('description', 'preamble'))
+
+    validated = {}  # type: MutableMapping[str, Any]
+    for key, value in statechart_d.items():
+        if key == 'root state':
+            validated[key] = _validate_state_dict(value, 'root state')
+        else:
+            validated[key] = str(value)
+    return {'statechart': validated}
+
+
+_STATE_KEYS = (
+    'type', 'on entry', 'on exit', 'transitions', 'contract', 'initial', 'parallel states',
+    'states', 'memory',
+)
+_STATE_TYPES = ('final', 'shallow history', 'deep history')
+_TRANSITION_KEYS = ('target', 'event', 'guard', 'action', 'contract', 'priority')
+_CONTRACT_KEYS = ('before', 'after', 'always')
+
+
+def _check_keys(data: Any, path: str, required: Tuple[str, ...], optional: Tuple[str, ...]):
+    """
+    Check that given data is a dict that contains all the required keys, and no other key
+    than the required and optional ones.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('{} should be a mapping, not {!r}'.format(path, data))
+    for key in data:
+        if key not in required and key not in optional:
+            raise ValueError('Wrong key {!r} in {}'.format(key, path))
+    for key in required:
+        if key not in data:
+            raise ValueError('Missing key {!r} in {}'.format(key, path))
+
+
+def _check_list(data: Any, path: str) -> None:
+    if not isinstance(data, list):
+        raise ValueError('{} should be a list, not {!r}'.format(path, data))
+
+
+def _validate_contract_dict(data: Any, path: str) -> Mapping[str, Any]:
+    _check_keys(data, path, (), _CONTRACT_KEYS)
+    if len(data) == 0:
+        raise ValueError('Missing key in {}, expecting one of {}'.format(path, _CONTRACT_KEYS))
+    return {key: str(value) for key, value in data.items()}
+
+
+def _validate_contracts(data: Any, path: str) -> List[Mapping[str, Any]]:
+    _check_list(data, path)
+    return [_validate_contract_dict(d, '{}[{}]'.format(path, i)) for i, d in enumerate(data)]
+
+
+def _validate_transition_dict(data: Any, path: str) -> Mapping[str, Any]:
+    _check_keys(data, path, (), _TRANSITION_KEYS)
+
+    validated = {}  # type: MutableMapping[str, Any]
+    for key, value in data.items():
+        if key == 'contract':
+            validated[key] = _validate_contracts(value, '{} > contract'.format(path))
+        elif key == 'priority':
+            try:
+                validated[key] = int(value)
+            except Exception:
+                if value not in ('high', 'low'):
+                    raise ValueError('Invalid priority {!r} in {}'.format(value, path))
+                validated[key] = value
+        else:
+            validated[key] = str(value)
+    return validated
+
+
+def _validate_state_dict(data: Any, path: str) -> Mapping[str, Any]:
+    _check_keys(data, path, ('name', ), _STATE_KEYS)
+
+    validated = {}  # type: MutableMapping[str, Any]
+    for key, value in data.items():
+        if key == 'type':
+            if value not in _STATE_TYPES:
+                raise ValueError('Invalid type {!r} in {}'.format(value, path))
+            validated[key] = value
+        elif key == 'transitions':
+            _check_list(value, '{} > transitions'.format(path))
+            validated[key] = [
+                _validate_transition_dict(d, '{} > transitions[{}]'.format(path, i))
+                for i, d in enumerate(value)
+            ]
+        elif key == 'contract':
+            validated[key] = _validate_contracts(value, '{} > contract'.format(path))
+        elif key in ('states', 'parallel states'):
+            _check_list(value, '{} > {}'.format(path, key))
+            validated[key] = [
+                _validate_state_dict(d, '{} > {}[{}]'.format(path, key, i))
+                for i, d in enumerate(value)
+            ]
+        else:
+            validated[key] = str(value)
+    return validated
 
 
 def import_from_dict(data: Mapping[str, Any]) -> Statechart:
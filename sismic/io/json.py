@@ -0,0 +1,69 @@
+import json
+
+from ..exceptions import StatechartError
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict, validate_dict
+
+__all__ = ['import_from_json', 'export_to_json']
+
+
+def import_from_json(text: str = None, filepath: str = None, *, ignore_schema: bool = False,
+                     ignore_validation: bool = False) -> Statechart:
+    """
+    Import a statechart from a JSON representation (first argument) or a JSON file (filepath
+    argument).
+
+    The JSON document has the same structure than the YAML one (see *import_from_yaml*), and
+    is validated in the same way. JSON is much faster to parse than YAML, and is well-suited
+    to statecharts that are generated by other tools.
+
+    :param text: A JSON text. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a JSON file.
+    :param ignore_schema: set to *True* to disable structure validation.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :return: a *Statechart* instance
+    """
+    if not text and not filepath:
+        raise TypeError(
+            'A JSON must be provided, either using first argument or filepath argument.')
+    elif text and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'r') as f:
+            text = f.read()
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise StatechartError('JSON parsing failed') from e
+
+    if not ignore_schema:
+        try:
+            data = validate_dict(data)
+        except ValueError as e:
+            raise StatechartError('JSON validation failed') from e
+
+    sc = import_from_dict(data)
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def export_to_json(statechart: Statechart, filepath: str = None, *, indent: int = None) -> str:
+    """
+    Export given *Statechart* instance to JSON. Its JSON representation is returned by
+    this function. Automatically save the output to filepath, if provided.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :param indent: if provided, pretty-print the output with given indentation level
+    :return: A textual JSON representation
+    """
+    output = json.dumps(export_to_dict(statechart), indent=indent)
+
+    if filepath:
+        with open(filepath, 'w') as f:
+            f.write(output)
+
+    return output
@@ -0,0 +1,80 @@
+from ..exceptions import StatechartError
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict, validate_dict
+
+__all__ = ['import_from_msgpack', 'export_to_msgpack']
+
+
+def _msgpack():
+    """
+    Return the *msgpack* module, or raise an ImportError with a meaningful message.
+    """
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError(
+            'MessagePack support requires the msgpack package (pip install msgpack).') from e
+    return msgpack
+
+
+def import_from_msgpack(data: bytes = None, filepath: str = None, *,
+                        ignore_schema: bool = False,
+                        ignore_validation: bool = False) -> Statechart:
+    """
+    Import a statechart from a MessagePack representation (first argument) or a MessagePack
+    file (filepath argument).
+
+    MessagePack is a compact binary format that is even faster to load than JSON. It requires
+    the optional *msgpack* package. The structure is validated as for *import_from_yaml*.
+
+    :param data: MessagePack bytes. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a MessagePack file.
+    :param ignore_schema: set to *True* to disable structure validation.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :return: a *Statechart* instance
+    """
+    msgpack = _msgpack()
+
+    if not data and not filepath:
+        raise TypeError(
+            'MessagePack data must be provided, either using first argument or filepath argument.')
+    elif data and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+
+    try:
+        content = msgpack.unpackb(data, raw=False)
+    except Exception as e:
+        raise StatechartError('MessagePack parsing failed') from e
+
+    if not ignore_schema:
+        try:
+            content = validate_dict(content)
+        except ValueError as e:
+            raise StatechartError('MessagePack validation failed') from e
+
+    sc = import_from_dict(content)
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def export_to_msgpack(statechart: Statechart, filepath: str = None) -> bytes:
+    """
+    Export given *Statechart* instance to MessagePack. Its binary representation is returned
+    by this function. Automatically save the output to filepath, if provided.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :return: MessagePack bytes
+    """
+    output = _msgpack().packb(export_to_dict(statechart), use_bin_type=True)
+
+    if filepath:
+        with open(filepath, 'wb') as f:
+            f.write(output)
+
+    return output
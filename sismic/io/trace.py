@@ -0,0 +1,269 @@
+import json
+
+from functools import wraps
+from typing import Any, Callable, Dict, IO, Iterator, List, Mapping, Optional, Tuple
+
+from .. import __version__
+from ..clock import SimulatedClock
+from ..code import Evaluator, PythonEvaluator
+from ..exceptions import ExecutionError
+from ..interpreter import Interpreter, QueuePolicy
+from ..model import Event, InternalEvent, MacroStep, Statechart
+
+__all__ = ['TraceWriter', 'read_trace', 'replay_trace']
+
+
+def _export_event(event: Optional[Event]) -> Optional[List[Any]]:
+    """
+    Return a JSON-friendly representation of given event.
+    """
+    if event is None:
+        return None
+    return [event.name, event.data]
+
+
+def _export_step(step: Optional[MacroStep]) -> Optional[Mapping[str, Any]]:
+    """
+    Return a JSON-friendly summary of given macro step, used to compare a replayed
+    step with a recorded one.
+    """
+    if step is None:
+        return None
+    return {
+        'event': _export_event(step.event),
+        'transitions': [str(transition) for transition in step.transitions],
+        'entered states': step.entered_states,
+        'exited states': step.exited_states,
+        'sent events': [_export_event(event) for event in step.sent_events],
+    }
+
+
+def _normalize(data: Any) -> Any:
+    """
+    Round-trip given data through JSON, so that it can be compared with data read from a trace.
+    """
+    return json.loads(json.dumps(data, default=repr))
+
+
+class TraceWriter:
+    """
+    Record the external events received by an interpreter and the calls to its *execute_once*
+    method in an append-only, line-delimited JSON file.
+
+    Each line of the file is a JSON object with a *type* key:
+
+     - *header*: the first line of a trace, identifying the statechart and the version of Sismic,
+       with the *queue policy* of the interpreter (see *QueuePolicy*), if any.
+     - *event*: an external event was queued, with its *name* and its *parameters*
+       (including its *delay*, if any). Events are recorded once they are admitted by the queue
+       policy: an event that is rejected (with a *QueueFullError*) is not recorded.
+     - *cancel*: a queued external event was cancelled. The *event* key is the position of
+       this event among the *event* records of the recording (starting at 0).
+     - *execute*: *execute_once* was called at *time* (the value of the interpreter clock),
+       and resulted in given *step* (a summary of the macro step, or *null*).
+
+    Event parameters are expected to be JSON-serializable. Values that are not are stored
+    using their *repr*, and will be replayed as strings.
+
+    The cancellations of the recorded events (see *Interpreter.cancel*) are recorded, unless
+    they occur during a macro step while the event is no longer queued (e.g., when the
+    statechart cancels the event it is consuming), as they have no effect.
+
+    The trace is written as soon as something happens, and each line is flushed, so that
+    a trace remains usable even if the process is killed.
+
+    :param filepath: path to the trace file. Existing traces are appended.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self._file = open(filepath, 'a')  # type: IO[str]
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        """
+        Append given record to the trace.
+
+        :param record: a JSON-serializable mapping
+        """
+        self._file.write(json.dumps(record, default=repr) + '\n')
+        self._file.flush()
+
+    def record(self, interpreter: Interpreter) -> 'TraceWriter':
+        """
+        Start recording the external events and the steps of given interpreter.
+
+        Similarly to *sismic.helpers.log_trace*, this method wraps the *execute_once* method
+        of given interpreter, and also its *cancel* method and the method that is used to
+        queue its events.
+
+        :param interpreter: an *Interpreter* instance
+        :return: *self* so it can be chained.
+        """
+        policy = interpreter._queue_policy
+        self.write({
+            'type': 'header',
+            'statechart': interpreter.statechart.name,
+            'version': __version__,
+            'queue policy': None if policy is None else {
+                'max_size': policy.max_size,
+                'overflow': policy.overflow,
+                'coalesce': policy.coalesce,
+            },
+        })
+
+        queue_event = interpreter._queue_event
+        execute_once = interpreter.execute_once
+        cancel = interpreter.cancel
+
+        # Position of the recorded events that could still be queued, indexed by their id
+        positions = {}  # type: Dict[int, Tuple[Event, int]]
+        recorded = 0  # Number of recorded events
+        executing = False
+
+        def write_cancel(event):
+            entry = positions.get(id(event), None)
+            if entry is not None and entry[0] is event:
+                self.write({'type': 'cancel', 'event': entry[1]})
+
+        @wraps(queue_event)
+        def new_queue_event(event):
+            nonlocal recorded
+            result = queue_event(event)  # Not recorded if the queue policy raises an exception
+            if not isinstance(event, InternalEvent):
+                self.write({'type': 'event', 'name': event.name, 'parameters': event.data})
+                positions[id(event)] = (event, recorded)
+                recorded += 1
+                # Cancelled before it was queued (e.g., in the inbound buffer)
+                if interpreter._cancelled.get(id(event), None) is event:
+                    write_cancel(event)
+            return result
+
+        @wraps(cancel)
+        def new_cancel(event):
+            if not executing or any(e is event for _, e in interpreter._external_queue):
+                write_cancel(event)
+            return cancel(event)
+
+        @wraps(execute_once)
+        def new_execute_once():
+            nonlocal executing
+            executing = True
+            try:
+                step = execute_once()
+            finally:
+                executing = False
+            self.write({
+                'type': 'execute',
+                'time': interpreter.time,
+                'step': _export_step(step),
+            })
+
+            # Forget the events that are no longer queued
+            if len(positions) > 2 * len(interpreter._external_queue):
+                queued = {id(e) for _, e in interpreter._external_queue}
+                for key in [key for key in positions if key not in queued]:
+                    del positions[key]
+            return step
+
+        interpreter._queue_event = new_queue_event  # type: ignore
+        interpreter.cancel = new_cancel  # type: ignore
+        interpreter.execute_once = new_execute_once  # type: ignore
+        return self
+
+    def close(self) -> None:
+        """
+        Close the underlying file.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_trace(filepath: str) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the records of a trace written by a *TraceWriter*.
+
+    :param filepath: path to the trace file.
+    :return: an iterator over the records of the trace.
+    """
+    with open(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def replay_trace(statechart: Statechart, filepath: str, *,
+                 evaluator_klass: Callable[..., Evaluator] = PythonEvaluator,
+                 initial_context: Mapping[str, Any] = None,
+                 interpreter_klass: Callable[..., Interpreter] = Interpreter,
+                 verify: bool = True) -> List[MacroStep]:
+    """
+    Replay a trace written by a *TraceWriter* on a new interpreter for given statechart.
+
+    The interpreter is driven by a *SimulatedClock* that is directly set to the recorded time
+    of each call to *execute_once*, so the trace is replayed as fast as possible, without
+    any waiting. If the recorded interpreter had a queue policy, an equivalent *QueuePolicy* is
+    provided to the interpreter, so that the recorded events are dropped or coalesced again.
+
+    If the trace contains several headers (because it was appended by several recordings),
+    only the first recording is replayed.
+
+    :param statechart: statechart to execute.
+    :param filepath: path to the trace file.
+    :param evaluator_klass: evaluator to use, see *Interpreter*.
+    :param initial_context: initial context to use, see *Interpreter*.
+    :param interpreter_klass: a callable that accepts a statechart and the same named parameters
+        as *Interpreter*. Default to *Interpreter*.
+    :param verify: check that each replayed macro step corresponds to the recorded one.
+    :return: the list of replayed macro steps.
+    :raise ExecutionError: if *verify* is set and a replayed macro step differs from the
+        recorded one.
+    """
+    parameters = {}  # type: Dict[str, Any]
+    policy = next(read_trace(filepath), {}).get('queue policy', None)
+    if policy is not None:
+        parameters['queue_policy'] = QueuePolicy(**policy)
+
+    clock = SimulatedClock()
+    interpreter = interpreter_klass(statechart, evaluator_klass=evaluator_klass,
+                                    initial_context=initial_context, clock=clock, **parameters)
+
+    steps = []  # type: List[MacroStep]
+    events = []  # type: List[Event]
+    headers = 0
+
+    for record in read_trace(filepath):
+        kind = record['type']
+        if kind == 'header':
+            headers += 1
+            if headers > 1:
+                break
+        elif kind == 'event':
+            events.append(Event(record['name'], **record['parameters']))
+            interpreter.queue(events[-1])
+        elif kind == 'cancel':
+            interpreter.cancel(events[record['event']])
+        elif kind == 'execute':
+            if record['time'] > clock.time:
+                clock.time = record['time']
+
+            step = interpreter.execute_once()
+            if step is not None:
+                steps.append(step)
+
+            if verify:
+                replayed = _normalize(_export_step(step))
+                if replayed != record['step']:
+                    raise ExecutionError(
+                        'Replayed step differs from recorded step at time {t}'
+                        '\nRecorded step is {r}\nReplayed step is {s}'.format(
+                            t=record['time'], r=record['step'], s=replayed)
+                    )
+        else:
+            raise ValueError('Unknown record type {} in trace {}'.format(kind, filepath))
+
+    return steps
@@ -2,16 +2,25 @@ import ruamel.yaml as yaml
 import schema
 
 from io import StringIO
+from time import perf_counter
+from typing import MutableMapping
 
 from ..exceptions import StatechartError
 from ..model import Statechart
 
-from .datadict import export_to_dict, import_from_dict
+from .cache import cache_key, load_from_cache, save_to_cache
+from .datadict import export_to_dict, import_from_dict, validate_dict
 
 __all__ = ['import_from_yaml', 'export_to_yaml']
 
 
 class SCHEMA:
+    """
+    Schema of a YAML statechart, for the *schema* library.
+
+    For performance reasons, *import_from_yaml* relies on the equivalent (but much faster)
+    *sismic.io.datadict.validate_dict*.
+    """
     contract = {schema.Or('before', 'after', 'always'): schema.Use(str)}
 
     transition = {
@@ -49,19 +58,38 @@ class SCHEMA:
 
 def import_from_yaml(
         text: str = None, filepath: str = None, *, ignore_schema: bool = False,
-        ignore_validation: bool = False) -> Statechart:
+        ignore_validation: bool = False, pure: bool = True,
+        timings: MutableMapping[str, float] = None, cache_dir: str = None) -> Statechart:
     """
     Import a statechart from a YAML representation (first argument) or a YAML file (filepath
     argument).
 
     Unless specified, the structure contained in the YAML is validated against a predefined
     schema (see *sismic.io.SCHEMA*), and the resulting statechart is validated using its
-    *validate()* method.
+    *validate()* method. Files that are trusted (e.g. generated by a tool) can be loaded
+    faster by disabling these validations.
+
+    By default, YAML is parsed using a pure Python parser. If *pure* is set to *False*,
+    the C-based parser of *ruamel.yaml* is used if it is available. This parser is much faster,
+    but does not strictly follow YAML 1.2 (e.g., *yes* and *no* could be loaded as booleans).
+
+    If *cache_dir* is provided, the resulting statechart is stored in this directory, together
+    with the compiled code of its guards, actions and contracts. The next imports of the same
+    YAML (with the same versions of Sismic and Python) load the statechart from this cache,
+    and the code is not compiled again. Cached files are unpickled: the cache directory must be
+    trusted.
 
     :param text: A YAML text. If not provided, filepath argument has to be provided.
     :param filepath: A path to a YAML file.
     :param ignore_schema: set to *True* to disable yaml validation.
     :param ignore_validation: set to *True* to disable statechart validation.
+    :param pure: set to *False* to use the C-based YAML parser, if available.
+    :param timings: if a dict is provided, it is populated with the time (in seconds) that was
+        spent to parse the YAML ("parsing"), to validate its structure ("validation"), to build
+        the statechart ("import") and to validate the statechart ("statechart validation").
+        If the statechart is loaded from the cache, only the time spent to load it ("cache")
+        is reported.
+    :param cache_dir: path to a directory used to cache imported statecharts.
     :return: a *Statechart* instance
     """
     if not text and not filepath:
@@ -73,19 +101,44 @@ def import_from_yaml(
         with open(filepath, 'r') as f:
             text = f.read()
 
-    yml = yaml.YAML(typ='safe', pure=True)
+    timings = {} if timings is None else timings
+
+    if cache_dir is not None:
+        start = perf_counter()
+        if not isinstance(text, str):
+            # File-like object
+            text = text.read()
+        key = cache_key(text, ignore_schema, ignore_validation, pure)
+        sc = load_from_cache(cache_dir, key)
+        if sc is not None:
+            timings['cache'] = perf_counter() - start
+            return sc
+
+    start = perf_counter()
+    yml = yaml.YAML(typ='safe', pure=pure)
     data = yml.load(text)
+    timings['parsing'] = perf_counter() - start
 
+    start = perf_counter()
     if not ignore_schema:
         try:
-            data = schema.Schema(SCHEMA.statechart).validate(data)
-        except schema.SchemaError as e:
+            data = validate_dict(data)
+        except ValueError as e:
             raise StatechartError('YAML validation failed') from e
+    timings['validation'] = perf_counter() - start
 
+    start = perf_counter()
     sc = import_from_dict(data)
+    timings['import'] = perf_counter() - start
 
+    start = perf_counter()
     if not ignore_validation:
         sc.validate()
+    timings['statechart validation'] = perf_counter() - start
+
+    if cache_dir is not None:
+        save_to_cache(cache_dir, key, sc)
+
     return sc
 
 
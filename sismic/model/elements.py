@@ -1,11 +1,33 @@
 from abc import ABCMeta
-from typing import List
+from typing import List, Tuple
 
 __all__ = ['ContractMixin', 'StateMixin', 'ActionStateMixin', 'TransitionStateMixin',
            'CompositeStateMixin', 'HistoryStateMixin', 'BasicState', 'CompoundState',
            'OrthogonalState', 'ShallowHistoryState', 'DeepHistoryState', 'FinalState', 'Transition']
 
 
+class _TrackedAttributesMixin(metaclass=ABCMeta):
+    """
+    Mixin that counts the changes of the attributes listed in *_tracked_attributes*. These
+    attributes are the ones data derived from the structure of a statechart can depend on,
+    so that statecharts can discard their derived data when they change
+    (see *Statechart._cache*). Initial assignments are not counted.
+
+    As states and transitions do not know the statechart they belong to, any change discards
+    the derived data of every statechart.
+    """
+
+    _tracked_attributes = ()  # type: Tuple[str, ...]
+
+    # Number of changes, shared by all the states and transitions
+    changes = 0
+
+    def __setattr__(self, name, value):
+        if name in self._tracked_attributes and name in self.__dict__:
+            _TrackedAttributesMixin.changes += 1
+        super().__setattr__(name, value)
+
+
 class ContractMixin(metaclass=ABCMeta):
     """
     Mixin with a contract: preconditions, postconditions and invariants.
@@ -136,7 +158,8 @@ class BasicState(ContractMixin, StateMixin, ActionStateMixin, TransitionStateMix
 
 
 class CompoundState(
-        ContractMixin, StateMixin, ActionStateMixin, TransitionStateMixin, CompositeStateMixin):
+        ContractMixin, StateMixin, ActionStateMixin, TransitionStateMixin, CompositeStateMixin,
+        _TrackedAttributesMixin):
     """
     Compound states must have children states.
 
@@ -146,6 +169,8 @@ class CompoundState(
     :param on_exit: code to execute when state is exited
     """
 
+    _tracked_attributes = ('initial',)
+
     def __init__(self, name: str, initial: str = None,
                  on_entry: str = None, on_exit: str = None) -> None:
         ContractMixin.__init__(self)
@@ -283,7 +308,7 @@ class FinalState(ContractMixin, StateMixin, ActionStateMixin):
             return NotImplemented
 
 
-class Transition(ContractMixin):
+class Transition(ContractMixin, _TrackedAttributesMixin):
     """
     Represent a transition from a source state to a target state.
 
@@ -302,6 +327,8 @@ class Transition(ContractMixin):
     DEFAULT_PRIORITY = 0
     HIGH_PRIORITY = 1
 
+    _tracked_attributes = ('event', 'guard', 'priority')
+
     def __init__(self, source: str, target: str = None, event: str = None, guard: str = None,
                  action: str = None, priority=None) -> None:
         ContractMixin.__init__(self)
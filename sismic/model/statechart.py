@@ -1,10 +1,10 @@
 from copy import deepcopy
-from typing import Callable, Dict, Iterable, List, Optional, Union, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union, cast
 
 from ..exceptions import StatechartError
 
 from .elements import (CompositeStateMixin, CompoundState, HistoryStateMixin,
-                       StateMixin, Transition, TransitionStateMixin)
+                       StateMixin, Transition, TransitionStateMixin, _TrackedAttributesMixin)
 
 __all__ = ['Statechart']
 
@@ -30,6 +30,35 @@ class Statechart:
 
         self._children[None] = []  # Root state
 
+        # Data derived from the structure of this statechart (e.g. by interpreters), see _cache
+        self._cached_data = {}  # type: Dict[Any, Any]
+        self._cached_changes = _TrackedAttributesMixin.changes
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cached_data'] = {}
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        state.pop('_cache', None)
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_cached_data', {})
+        self._cached_changes = _TrackedAttributesMixin.changes
+
+    @property
+    def _cache(self) -> Dict[Any, Any]:
+        """
+        Data derived from the structure of this statechart (e.g. by interpreters).
+
+        It is cleared by the methods that change this structure, and when the event, guard or
+        priority of a transition, or the initial state of a compound state, is changed.
+        """
+        if self._cached_changes != _TrackedAttributesMixin.changes:
+            self._cached_changes = _TrackedAttributesMixin.changes
+            self._cached_data.clear()
+        return self._cached_data
+
     @property
     def root(self) -> Optional[str]:
         """
@@ -179,17 +208,19 @@ class Statechart:
         :return: the names of the leaves in *names*
         :raise StatechartError: if a state does not exist
         """
-        leaves = []  # type: List[str]
         names = set(names)  # Lookups in set are more efficient
+        non_leaves = set()  # type: Set[str]
 
+        # Each ancestor of a name is not a leaf. As soon as an already visited
+        # ancestor is found, its own ancestors were already visited too.
         for name in names:
-            # Raise a StatechartError if it does not exist!
-            for descendant in self.descendants_for(name):
-                if descendant in names:
-                    break
-            else:  # no break occurs
-                leaves.append(name)
-        return leaves
+            self.state_for(name)  # Raise StatechartError if state does not exist
+            ancestor = self._parent[name]
+            while ancestor is not None and ancestor not in non_leaves:
+                non_leaves.add(ancestor)
+                ancestor = self._parent[ancestor]
+
+        return [name for name in names if name not in non_leaves]
 
     # ######### TRANSITIONS ##########
 
@@ -207,6 +238,8 @@ class Statechart:
         :param transition: transition to add
         :raise StatechartError:
         """
+        self._cache.clear()
+
         # Check that source state is known
         try:
             from_state = self.state_for(transition.source)
@@ -230,6 +263,8 @@ class Statechart:
         :param transition: a *Transition* instance
         :raise StatechartError: if transition is not registered
         """
+        self._cache.clear()
+
         try:
             self._transitions.remove(transition)
         except ValueError:
@@ -248,6 +283,8 @@ class Statechart:
         :param new_target: a state name or None
         :raise StatechartError: if given transition or a given state does not exist.
         """
+        self._cache.clear()
+
         # Check that either new_source or new_target is set
         if new_source == new_target == '':
             raise ValueError('You must at least specify the new source or new target')
@@ -359,6 +396,8 @@ class Statechart:
         :param parent: name of its parent, or None
         :raise StatechartError:
         """
+        self._cache.clear()
+
         # Check state has a name
         if state.name is None:
             raise StatechartError('State {} must have a name'.format(state))
@@ -406,6 +445,8 @@ class Statechart:
         :param name: name of a state
         :raise StatechartError:
         """
+        self._cache.clear()
+
         state = self.state_for(name)
 
         # Remove children
@@ -438,6 +479,8 @@ class Statechart:
         :param old_name: old name of the state
         :param new_name: new name of the state
         """
+        self._cache.clear()
+
         if old_name == new_name:
             return
         if new_name in self._states:
@@ -492,6 +535,8 @@ class Statechart:
         :param name: name of the state to move
         :param new_parent: name of the new parent
         """
+        self._cache.clear()
+
         # Check that both states exist
         state = self.state_for(name)
         self.state_for(new_parent)
@@ -545,6 +590,8 @@ class Statechart:
         :param replace: Name of the target state. Should refer to a StateMixin with no child.
         :param renaming_func: Optional callable to resolve conflicting names.
         """
+        self._cache.clear()
+
         if len(self.children_for(replace)) > 0:
             raise StatechartError(
                 'State {} cannot be replaced while it has children.'.format(replace))
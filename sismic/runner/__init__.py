@@ -1 +1,2 @@
 from .runner import *
+from .metrics import *
@@ -0,0 +1,309 @@
+import os
+import tempfile
+
+from functools import wraps
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from ..interpreter import Interpreter
+from ..model import Event, MetaEvent
+
+
+__all__ = ['Metrics']
+
+
+# Name, type and description of the exported metrics
+_METRICS = [
+    ('uptime_seconds', 'gauge', 'Time since the metrics were (re)set.'),
+    ('steps_total', 'counter', 'Number of executed macro steps.'),
+    ('steps_per_second', 'gauge', 'Average number of executed macro steps per second.'),
+    ('events_consumed_total', 'counter', 'Number of consumed events.'),
+    ('events_consumed_per_second', 'gauge', 'Average number of consumed events per second.'),
+    ('internal_queue_depth', 'gauge', 'Number of events in the internal queue.'),
+    ('external_queue_depth', 'gauge', 'Number of events in the external queue.'),
+    ('inbound_queue_depth', 'gauge', 'Number of events queued by queue_threadsafe that are not '
+                                     'yet in the external queue.'),
+    ('events_dropped_total', 'counter', 'Number of events dropped by the queue policy.'),
+    ('events_coalesced_total', 'counter', 'Number of events coalesced by the queue policy.'),
+    ('event_latency_seconds', 'summary', 'Time between the queuing and the consumption of events.'),
+    ('event_latency_max_seconds', 'gauge', 'Maximal time between the queuing and the consumption '
+                                           'of an event.'),
+    ('cycles_total', 'counter', 'Number of calls to execute by a runner.'),
+    ('interval_overruns_total', 'counter', 'Number of calls to execute that took longer than the '
+                                           'interval of the runner.'),
+    ('listener_seconds_total', 'counter', 'Time spent in the listeners of meta-events.'),
+]
+
+
+def _escape(value: str) -> str:
+    """
+    Escape given value to be used as a label value in the Prometheus text format.
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """
+    Collect runtime metrics about the execution of an interpreter, and of the runner that
+    executes it, if any.
+
+    The following metrics are available, by name:
+
+     - *uptime_seconds*: time since the metrics were created or reset;
+     - *steps_total* and *steps_per_second*: number of macro steps, and their average rate;
+     - *events_consumed_total* and *events_consumed_per_second*: number of consumed events,
+       and their average rate;
+     - *internal_queue_depth* and *external_queue_depth*: current number of queued events;
+     - *inbound_queue_depth*: current number of events that were queued by
+       *queue_threadsafe*, but that are not yet moved to the external queue;
+     - *events_dropped_total* and *events_coalesced_total*: number of events that were
+       dropped or coalesced by the *QueuePolicy* of the interpreter, if any;
+     - *event_latency_seconds_count*, *event_latency_seconds_sum* and
+       *event_latency_max_seconds*: time between the queuing of an event and its consumption
+       (including its delay, if any, and the time spent in the inbound buffer for the events
+       queued by *queue_threadsafe*);
+     - *cycles_total* and *interval_overruns_total*: number of calls to the *execute* method
+       of a runner, and number of these calls that took longer than the runner's *interval*;
+     - *listener_seconds_total*: time spent in the listeners of meta-events.
+
+    Durations are measured using the wall clock (*time.perf_counter*), regardless of the
+    clock of the interpreter.
+
+    Similarly to *sismic.helpers.log_trace*, metrics wrap the methods of an observed
+    interpreter instance, so that interpreters that are not observed are not slowed down.
+    Measures are updated by simple increments, and are read by *snapshot*, so that metrics
+    can be updated by a runner thread while another thread reads them.
+
+    :param interpreter: if provided, the interpreter to observe (see *observe*).
+    """
+
+    def __init__(self, interpreter: Interpreter = None) -> None:
+        self._interpreter = None  # type: Optional[Interpreter]
+        self._patched = []  # type: List[Tuple[str, Any]]
+        self._queued = {}  # type: Dict[int, List[float]]
+        self._buffered = {}  # type: Dict[int, List[float]]
+        self.reset()
+
+        if interpreter is not None:
+            self.observe(interpreter)
+
+    def reset(self) -> None:
+        """
+        Reset all counters. Queue depths are not affected, as they reflect the current state
+        of the interpreter.
+        """
+        self._start = perf_counter()
+        self._steps = 0
+        self._consumed = 0
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._cycles = 0
+        self._overruns = 0
+        self._listener_time = 0.0
+
+    def observe(self, interpreter: Interpreter) -> 'Metrics':
+        """
+        Start collecting the metrics of given interpreter.
+
+        :param interpreter: an *Interpreter* instance
+        :return: *self* so it can be chained.
+        :raise ValueError: if an interpreter is already observed.
+        """
+        if self._interpreter is not None:
+            raise ValueError('{} already observes {}'.format(self, self._interpreter))
+        self._interpreter = interpreter
+
+        execute_once = interpreter.execute_once
+        queue_event = interpreter._queue_event
+        queue_threadsafe = interpreter.queue_threadsafe
+        select_event = interpreter._select_event
+        raise_event = interpreter._raise_event
+        queued = self._queued
+        buffered = self._buffered
+
+        @wraps(execute_once)
+        def new_execute_once():
+            step = execute_once()
+            if step is not None:
+                self._steps += 1
+            return step
+
+        @wraps(queue_threadsafe)
+        def new_queue_threadsafe(event_or_name, *event_or_names, **parameters):
+            # Called from any thread: events are timestamped before being buffered
+            events = [
+                Event(event, **parameters) if isinstance(event, str) else event
+                for event in [event_or_name] + list(event_or_names)
+            ]
+            now = perf_counter()
+            for event in events:
+                buffered.setdefault(id(event), []).append(now)
+            try:
+                return queue_threadsafe(*events)
+            except BaseException:
+                # Forget the events that were not buffered
+                ids = {id(e) for e in list(interpreter._inbound)}
+                for event in events:
+                    if id(event) not in ids:
+                        buffered.pop(id(event), None)
+                raise
+
+        @wraps(queue_event)
+        def new_queue_event(event):
+            times = buffered.get(id(event), None)
+            start = times[0] if times else perf_counter()
+            queue_event(event)  # Not timestamped if the queue policy raises an exception
+
+            if times:
+                times.pop(0)
+                if not times:
+                    del buffered[id(event)]
+            queued.setdefault(id(event), []).append(start)
+
+            # Forget the events that were not queued (e.g., dropped or cancelled)
+            size = len(interpreter._internal_queue) + len(interpreter._external_queue)
+            if len(queued) > 2 * size + 16:
+                ids = {id(e) for _, e in interpreter._internal_queue}
+                ids.update(id(e) for _, e in interpreter._external_queue)
+                for key in [key for key in queued if key not in ids]:
+                    del queued[key]
+
+        @wraps(select_event)
+        def new_select_event(*, consume=False):
+            event = select_event(consume=consume)
+            if consume and event is not None:
+                self._consumed += 1
+                times = queued.get(id(event), None)
+                if times:
+                    latency = perf_counter() - times.pop(0)
+                    if not times:
+                        del queued[id(event)]
+                    self._latency_count += 1
+                    self._latency_sum += latency
+                    self._latency_max = max(self._latency_max, latency)
+            return event
+
+        @wraps(raise_event)
+        def new_raise_event(event):
+            if not isinstance(event, MetaEvent):
+                return raise_event(event)
+            start = perf_counter()
+            try:
+                return raise_event(event)
+            finally:
+                self._listener_time += perf_counter() - start
+
+        for attribute, func in [('execute_once', new_execute_once),
+                                ('_queue_event', new_queue_event),
+                                ('queue_threadsafe', new_queue_threadsafe),
+                                ('_select_event', new_select_event),
+                                ('_raise_event', new_raise_event)]:
+            self._patched.append((attribute, vars(interpreter).get(attribute, None)))
+            setattr(interpreter, attribute, func)
+
+        return self
+
+    def detach(self) -> None:
+        """
+        Stop collecting the metrics of the observed interpreter, and restore its methods.
+        """
+        while self._patched:
+            attribute, previous = self._patched.pop()
+            if previous is None:
+                delattr(self._interpreter, attribute)
+            else:
+                setattr(self._interpreter, attribute, previous)
+        self._interpreter = None
+        self._queued.clear()
+        self._buffered.clear()
+
+    def record_cycle(self, duration: float, interval: float) -> None:
+        """
+        Record a call to the *execute* method of a runner. This method is called by runners
+        that are given a *Metrics* instance.
+
+        :param duration: time spent in the call, in seconds
+        :param interval: expected interval between two calls, in seconds
+        """
+        self._cycles += 1
+        if duration > interval:
+            self._overruns += 1
+
+    def snapshot(self) -> Mapping[str, float]:
+        """
+        Return the current value of each metric.
+
+        :return: a mapping between the names of the metrics and their values.
+        """
+        uptime = perf_counter() - self._start
+        interpreter = self._interpreter
+        policy = interpreter._queue_policy if interpreter else None
+        return {
+            'uptime_seconds': uptime,
+            'steps_total': self._steps,
+            'steps_per_second': self._steps / uptime if uptime > 0 else 0.0,
+            'events_consumed_total': self._consumed,
+            'events_consumed_per_second': self._consumed / uptime if uptime > 0 else 0.0,
+            'internal_queue_depth': len(interpreter._internal_queue) if interpreter else 0,
+            'external_queue_depth': len(interpreter._external_queue) if interpreter else 0,
+            'inbound_queue_depth': len(interpreter._inbound) if interpreter else 0,
+            'events_dropped_total': policy.dropped if policy else 0,
+            'events_coalesced_total': policy.coalesced if policy else 0,
+            'event_latency_seconds_count': self._latency_count,
+            'event_latency_seconds_sum': self._latency_sum,
+            'event_latency_max_seconds': self._latency_max,
+            'cycles_total': self._cycles,
+            'interval_overruns_total': self._overruns,
+            'listener_seconds_total': self._listener_time,
+        }
+
+    def export_prometheus(self, filepath: str = None, *, prefix: str = 'sismic',
+                          labels: Mapping[str, str] = None) -> str:
+        """
+        Export the current value of the metrics using the text-based exposition format of
+        Prometheus.
+
+        If a file path is provided, the file is atomically replaced, so that it can be
+        periodically exported and read by, e.g., the textfile collector of *node_exporter*,
+        without requiring an HTTP server.
+
+        :param filepath: if provided, path to the file where the metrics are written.
+        :param prefix: prefix of the name of the metrics.
+        :param labels: labels to add to each metric. By default, the name of the statechart
+            of the observed interpreter (if any) is used as *statechart* label.
+        :return: the exported metrics.
+        """
+        if labels is None:
+            labels = {} if self._interpreter is None else {
+                'statechart': self._interpreter.statechart.name}
+        label_text = ','.join('{}="{}"'.format(k, _escape(str(v))) for k, v in labels.items())
+        label_text = '{' + label_text + '}' if label_text else ''
+
+        values = self.snapshot()
+        lines = []
+        for name, kind, description in _METRICS:
+            fullname = '{}_{}'.format(prefix, name) if prefix else name
+            lines.append('# HELP {} {}'.format(fullname, description))
+            lines.append('# TYPE {} {}'.format(fullname, kind))
+            suffixes = ['_count', '_sum'] if kind == 'summary' else ['']
+            for suffix in suffixes:
+                lines.append('{}{}{} {}'.format(
+                    fullname, suffix, label_text, repr(values[name + suffix])))
+        text = '\n'.join(lines) + '\n'
+
+        if filepath is not None:
+            directory = os.path.dirname(os.path.abspath(filepath))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(text)
+                os.replace(temp_path, filepath)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+        return text
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._interpreter)
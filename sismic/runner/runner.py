@@ -3,6 +3,7 @@ import threading
 
 from typing import List
 
+from .metrics import Metrics
 from ..interpreter import Interpreter
 from ..model import MacroStep
 
@@ -46,18 +47,27 @@ class AsyncRunner:
     set to True, then `execute_once` is repeatedly called until no macro step can be
     processed in the current cycle.
 
+    If a `Metrics` instance is provided, it observes the interpreter and also records the
+    calls to `execute` that took longer than `interval`. These metrics are available
+    through the `metrics` attribute.
+
     :param interpreter: interpreter instance to run.
     :param interval: interval between two calls to `execute`
     :param execute_all: Repeatedly call interpreter's `execute_once` method at each step.
+    :param metrics: An optional `Metrics` instance to update.
     """
 
-    def __init__(self, interpreter: Interpreter, interval: float = 0.1, execute_all=False) -> None:
+    def __init__(self, interpreter: Interpreter, interval: float = 0.1, execute_all=False,
+                 metrics: Metrics = None) -> None:
         self._unpaused = threading.Event()
         self._stop = threading.Event()
 
         self.interpreter = interpreter
         self.interval = interval
         self._execute_all = execute_all
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.observe(interpreter)
         self._thread = threading.Thread(target=self._run)
 
     @property
@@ -167,6 +177,8 @@ class AsyncRunner:
             self.after_execute(r)
 
             elapsed = time.time() - starttime
+            if self.metrics is not None:
+                self.metrics.record_cycle(elapsed, self.interval)
             time.sleep(max(0, self.interval - elapsed))
             self._unpaused.wait()
 
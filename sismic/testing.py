@@ -1,6 +1,6 @@
-from typing import Union, Optional, List, Any, Mapping
+from typing import Union, Optional, List, Any, Mapping, Dict, Set, Tuple
 from .interpreter import Interpreter
-from .model import MacroStep, Transition
+from .model import Event, MacroStep, Transition
 
 
 __all__ = [
@@ -8,6 +8,7 @@ __all__ = [
     'event_is_fired', 'event_is_consumed',
     'transition_is_processed',
     'expression_holds',
+    'TraceIndex',
 ]
 
 MacroSteps = Union[MacroStep, List[MacroStep]]
@@ -142,3 +143,139 @@ def expression_holds(interpreter: Interpreter, expression: str) -> bool:
     :return: expression holds
     """
     return interpreter._evaluator._evaluate_code(expression)
+
+
+class TraceIndex:
+    """
+    Index of the entered states, exited states and sent events of a list of macro steps,
+    to check them without going through the whole list. The list can be extended afterwards,
+    as the macro steps that were added since the last check are indexed on demand.
+
+    Sent events are indexed by name, and by name and value of each of their parameters, so
+    that checking a parameter does not depend on the number of sent events. Unhashable
+    values (e.g., lists) are compared one by one, with the events having such a value for
+    the checked parameter. Expected values that are None or unhashable are compared with
+    every event having the expected name, as in *event_is_fired*.
+
+    :param trace: a list of macro steps
+    """
+
+    def __init__(self, trace: List[MacroStep]) -> None:
+        self._trace = trace
+        self._size = 0
+        self._entered_states = set()  # type: Set[str]
+        self._exited_states = set()  # type: Set[str]
+        self._first_sent_events = []  # type: List[Event]
+
+        # Sent events, the positions of the ones with a given name (None for any name), and
+        # the positions of the ones with a given (name, parameter, value), or with a given
+        # (name, parameter) if the value is not hashable.
+        self._events = []  # type: List[Event]
+        self._names = {}  # type: Dict[Optional[str], List[int]]
+        self._parameters = {}  # type: Dict[Tuple[Optional[str], str, Any], Set[int]]
+        self._unhashable = {}  # type: Dict[Tuple[Optional[str], str], Set[int]]
+
+    @property
+    def trace(self) -> List[MacroStep]:
+        """
+        Indexed list of macro steps
+        """
+        return self._trace
+
+    def update(self) -> None:
+        """
+        Index the macro steps that were added to the trace since the last update.
+        """
+        for step in self._trace[self._size:]:
+            self._entered_states.update(step.entered_states)
+            self._exited_states.update(step.exited_states)
+            for event in step.sent_events:
+                self._index_event(event)
+            if not self._first_sent_events:
+                self._first_sent_events = list(step.sent_events)
+        self._size = len(self._trace)
+
+    def _index_event(self, event: Event) -> None:
+        position = len(self._events)
+        self._events.append(event)
+        for name in (event.name, None):
+            self._names.setdefault(name, []).append(position)
+            for key, value in event.data.items():
+                try:
+                    self._parameters.setdefault((name, key, value), set()).add(position)
+                except TypeError:
+                    self._unhashable.setdefault((name, key), set()).add(position)
+
+    def state_is_entered(self, name: str) -> bool:
+        """
+        Holds if state was entered (see *state_is_entered*).
+
+        :param name: name of a state
+        :return: given state was entered
+        """
+        self.update()
+        return name in self._entered_states
+
+    def state_is_exited(self, name: str) -> bool:
+        """
+        Holds if state was exited (see *state_is_exited*).
+
+        :param name: name of a state
+        :return: given state was exited
+        """
+        self.update()
+        return name in self._exited_states
+
+    def event_is_fired(self, name: Optional[str], parameters: Mapping[str, Any] = None) -> bool:
+        """
+        Holds if an event was fired (see *event_is_fired*).
+
+        :param name: name of an event, or None for any event
+        :param parameters: additional parameters
+        :return: event was fired
+        """
+        self.update()
+        if not parameters:
+            return name in self._names
+
+        # Positions of the events that match the parameters checked so far
+        candidates = None  # type: Optional[Set[int]]
+        for key, value in parameters.items():
+            positions = self._positions(name, key, value)
+            if positions is None:
+                return any(
+                    all(getattr(self._events[position], k, None) == v
+                        for k, v in parameters.items())
+                    for position in self._names.get(name, []))
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return False
+        return True
+
+    def _positions(self, name: Optional[str], key: str, value: Any) -> Optional[Set[int]]:
+        """
+        Return the positions of the events with given name (or any name if None) whose
+        parameter *key* equals given value, or None if they cannot be found using the index.
+        """
+        if value is None or key in ('name', 'data'):
+            # Missing parameters are None, and these are attributes of Event
+            return None
+        try:
+            positions = self._parameters.get((name, key, value), set())
+        except TypeError:
+            return None
+
+        unhashable = self._unhashable.get((name, key), None)
+        if unhashable:
+            positions = positions | {
+                position for position in unhashable
+                if self._events[position].data[key] == value}
+        return positions
+
+    @property
+    def first_sent_events(self) -> List[Event]:
+        """
+        Events sent during the first macro step that sent events, or an empty list
+        """
+        self.update()
+        return list(self._first_sent_events)
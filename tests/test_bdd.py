@@ -3,8 +3,10 @@ import pytest
 import os
 
 from sismic.exceptions import StatechartError
-from sismic.interpreter import Event
-from sismic.bdd import steps, execute_bdd
+from sismic.interpreter import Event, Interpreter
+from sismic.model import MacroStep, MicroStep
+from sismic.testing import TraceIndex
+from sismic.bdd import steps, wrappers, execute_bdd
 from sismic.bdd.__main__ import cli
 from sismic.io import import_from_yaml
 
@@ -57,6 +59,103 @@ class TestMicrowave:
             property_statecharts=property_statecharts
         )
 
+    def test_microwave_with_jobs(self, microwave, property_statecharts, tmpdir, capsys):
+        features = ['heating', 'cooking_human', 'lighting_human', 'safety_human']
+        filepaths = [os.path.join('docs', 'examples', 'microwave', f+'.feature') for f in features]
+
+        assert 0 == execute_bdd(
+            microwave.statechart,
+            filepaths,
+            step_filepaths=[os.path.join('docs', 'examples', 'microwave', 'steps.py')],
+            property_statecharts=property_statecharts,
+            jobs=2,
+        )
+        output = capsys.readouterr().out
+        assert 'Merged results of 2 jobs:\n4 features passed, 0 failed, 0 skipped' in output
+
+        failing = tmpdir.join('failing.feature')
+        failing.write('Feature: Failing\n\n  Scenario: Heating\n'
+                      '    When I send event door_opened\n    Then state door closed is active\n')
+        assert 0 != execute_bdd(microwave.statechart, [filepaths[0], str(failing)], jobs=2)
+        output = capsys.readouterr().out
+        assert 'Merged results of 2 jobs:\n1 feature passed, 1 failed, 0 skipped' in output
+
+    def test_microwave_with_cache(self, microwave, property_statecharts, tmpdir):
+        features = ['heating', 'cooking_human', 'lighting_human', 'safety_human']
+        assert 0 == execute_bdd(
+            microwave.statechart,
+            [os.path.join('docs', 'examples', 'microwave', f+'.feature') for f in features],
+            step_filepaths=[os.path.join('docs', 'examples', 'microwave', 'steps.py')],
+            property_statecharts=property_statecharts,
+            cache_given_steps=True,
+        )
+
+        # Count the events that are sent by the steps
+        class CountingInterpreter(Interpreter):
+            sent = []
+
+            def queue(self, *events):
+                self.sent.extend(events)
+                return super().queue(*events)
+
+        scenario = ('  Scenario: {}\n    Given I send event item_placed\n'
+                    '{}    When I send event {}\n    Then variable timer equals {}\n\n')
+        feature = tmpdir.join('cache.feature')
+        feature.write(
+            'Feature: Cache\n\n  Background:\n    Given I send event door_opened\n\n' +
+            scenario.format('First', '', 'door_closed', 0) +
+            scenario.format('Second', '', 'door_closed', 0) +
+            scenario.format('Third', '    And I send event door_closed\n', 'timer_inc', 1))
+
+        for cache_given_steps, expected in [(False, 10), (True, 6)]:
+            CountingInterpreter.sent.clear()
+            assert 0 == execute_bdd(microwave.statechart, [str(feature)],
+                                    interpreter_klass=CountingInterpreter,
+                                    cache_given_steps=cache_given_steps)
+            assert len(CountingInterpreter.sent) == expected
+
+
+def test_cache_with_user_steps(tmpdir):
+    # User-defined steps are never skipped, as they may affect Behave's context
+    step_file = tmpdir.join('flag_steps.py')
+    step_file.write(
+        'from behave import given, then\n\n\n'
+        '@given(\'I raise the flag\')\n'
+        'def raise_flag(context):\n'
+        '    context.flag = True\n\n\n'
+        '@then(\'the flag is raised\')\n'
+        'def check_flag(context):\n'
+        '    assert getattr(context, \'flag\', False)\n')
+
+    scenario = ('  Scenario: {}\n    Given I send event door_opened\n'
+                '    And I raise the flag\n    When I send event door_closed\n'
+                '    Then the flag is raised\n\n')
+    feature = tmpdir.join('flag.feature')
+    reproduce = ('  Scenario: {}\n    Given I reproduce "First"\n    When I do nothing\n'
+                 '    Then the flag is raised\n\n')
+    feature.write('Feature: Flag\n\n' + scenario.format('First') + scenario.format('Second') +
+                  reproduce.format('Third') + reproduce.format('Fourth'))
+
+    # Run once, as steps cannot be defined twice by Behave in a same process
+    statechart = import_from_yaml(filepath='docs/examples/microwave/microwave.yaml')
+    assert 0 == execute_bdd(statechart, [str(feature)],
+                            step_filepaths=[str(step_file)], cache_given_steps=True)
+
+
+def test_partition(tmpdir):
+    for name, size in [('a', 10), ('b', 30), ('c', 20), ('d', 5)]:
+        tmpdir.join(name + '.feature').write('x' * size)
+    tmpdir.join('other.txt').write('')
+
+    filepaths = wrappers._feature_files([str(tmpdir)])
+    assert [os.path.basename(f) for f in filepaths] == ['a.feature', 'b.feature', 'c.feature',
+                                                         'd.feature']
+
+    groups = wrappers._partition(filepaths, 2)
+    assert [[os.path.basename(f) for f in group] for group in groups] == [
+        ['b.feature', 'd.feature'], ['a.feature', 'c.feature']]
+    assert len(wrappers._partition(filepaths, 10)) == 4
+
 
 def test_cli():
     assert 0 == cli([
@@ -67,6 +166,30 @@ def test_cli():
     ])
 
 
+def test_trace_index():
+    trace = []
+    index = TraceIndex(trace)
+    assert not index.state_is_entered('a')
+    assert not index.event_is_fired(None)
+    assert index.first_sent_events == []
+
+    trace.append(MacroStep(0, [MicroStep(entered_states=['a'], exited_states=['b'],
+                                         sent_events=[Event('e', x=1)])]))
+    trace.append(MacroStep(1, [MicroStep(sent_events=[Event('e', x=2), Event('f')])]))
+    assert index.state_is_entered('a') and not index.state_is_entered('b')
+    assert index.state_is_exited('b') and not index.state_is_exited('a')
+    assert index.event_is_fired('e') and index.event_is_fired('f') and index.event_is_fired(None)
+    assert index.event_is_fired('e', {'x': 2}) and not index.event_is_fired('e', {'x': 3})
+    assert index.event_is_fired(None, {'x': 2}) and not index.event_is_fired('f', {'x': 2})
+    assert index.first_sent_events == [Event('e', x=1)]
+
+    trace.append(MacroStep(2, [MicroStep(sent_events=[Event('g', x=[1], y=2), Event('g', x=3)])]))
+    assert index.event_is_fired('g', {'x': [1], 'y': 2}) and index.event_is_fired('g', {'x': 3})
+    assert not index.event_is_fired('g', {'x': 3, 'y': 2}) and not index.event_is_fired('g', {'x': 1})
+    assert index.event_is_fired('g', {'y': None}) and not index.event_is_fired('e', {'y': 1})
+    assert index.event_is_fired('e', {'x': 1.0}) and index.event_is_fired(None, {'x': [1]})
+
+
 class TestSteps:
     @pytest.fixture
     def context(self, mocker):
@@ -85,6 +208,7 @@ class TestSteps:
         context.interpreter.statechart.state_for = mocker.MagicMock(side_effect=state_for)
         context.execute_steps = mocker.MagicMock(name='execute_steps')
         context.monitored_trace = []
+        context._skipped_step = False
 
         return context
 
@@ -237,6 +361,18 @@ class TestSteps:
 
         steps.event_is_not_fired(context, 'event')
 
+    def test_monitored_index(self, context, trace):
+        context.monitored_trace = []
+        context._monitored_index = TraceIndex(context.monitored_trace)
+        with pytest.raises(AssertionError):
+            steps.state_is_entered(context, 'a')
+
+        context.monitored_trace.extend(trace)
+        steps.state_is_entered(context, 'a')
+        steps.event_is_fired(context, 'e1')
+        with pytest.raises(AssertionError):
+            steps.no_event_is_fired(context)
+
     def test_no_event_is_fired(self, context, trace):
         context.monitored_trace = []
         steps.no_event_is_fired(context)
@@ -1,9 +1,15 @@
+import pickle
+import pstats
 import pytest
+import traceback
+
+from functools import partial
 
 from sismic import code
-from sismic.code.python import FrozenContext
+from sismic.code.python import FrozenContext, TrackedContext, _LRUCache
+from sismic.io import import_from_yaml
 from sismic.exceptions import CodeEvaluationError
-from sismic.interpreter import Event, InternalEvent, MetaEvent
+from sismic.interpreter import Event, InternalEvent, Interpreter, MetaEvent
 
 
 def test_dummy_evaluator(mocker):
@@ -97,6 +103,14 @@ class TestPythonEvaluator:
         event = events[0]
         assert event == Event('hello', delay=5)
         
+    def test_send_and_cancel(self, evaluator, mocker):
+        events = evaluator._execute_code('e1 = send("e1")\ncancel(e1)\nsend("e2")')
+        assert events == [Event('e2')]
+
+        cancel = mocker.patch.object(evaluator._interpreter, 'cancel')
+        evaluator._execute_code('cancel(e1)')
+        cancel.assert_called_once_with(evaluator.context['e1'])
+
     def test_notify(self, evaluator):
         events = evaluator._execute_code('notify("hello", x=1, y="world")')
         assert events == [MetaEvent('hello', x=1, y='world')]
@@ -113,3 +127,203 @@ class TestPythonEvaluator:
     @pytest.mark.xfail(reason='http://stackoverflow.com/questions/32894942/listcomp-unable-to-access-locals-defined-in-code-called-by-exec-if-nested-in-fun and possibly fixed with https://bugs.python.org/issue3692')
     def test_access_outer_scope(self, evaluator):
         evaluator._execute_code('d = [x for x in range(10) if x != a]', additional_context={'a': 1})
+
+
+def test_lru_cache():
+    cache = _LRUCache(2)
+    assert cache.setdefault('a', 1) == 1
+    assert cache.setdefault('b', 2) == 2
+    assert cache.setdefault('a', 3) == 1
+    assert cache.get('a') == 1  # 'b' is now the least recently used item
+
+    cache.setdefault('c', 3)
+    assert len(cache) == 2
+    assert 'b' not in cache and cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_tracked_context():
+    context = TrackedContext({'a': 1})
+    assert context.versions == {}
+
+    context['b'] = 2
+    context.setdefault('a', 3)
+    assert context.versions == {'b': 1}
+
+    del context['a']
+    context.touch(['b', 'c'])
+    assert context.versions == {'a': 2, 'b': 3, 'c': 3}
+
+    unpickled = pickle.loads(pickle.dumps(context))
+    assert unpickled == context
+    assert unpickled.versions == context.versions
+    assert unpickled.writes == context.writes
+
+
+class TestReactiveGuards:
+    @pytest.fixture
+    def interpreter(self):
+        statechart = import_from_yaml("""
+        statechart:
+          name: reactive guards
+          preamble: x, y, items = 0, 0, []
+          root state:
+            name: root
+            initial: s1
+            states:
+              - name: s1
+                transitions:
+                  - target: s2
+                    guard: x > 10
+                  - target: s3
+                    guard: len(items) > 1
+                  - event: inc
+                    action: x = x + 1
+                  - event: other
+                    action: y = y + 1
+                  - event: add
+                    action: items.append(1)
+              - name: s2
+                transitions:
+                  - target: s1
+                    guard: after(5)
+              - name: s3
+        """)
+        evaluator_klass = partial(code.PythonEvaluator, reactive_guards=True)
+        interpreter = Interpreter(statechart, evaluator_klass=evaluator_klass)
+        interpreter.execute()
+        return interpreter
+
+    @staticmethod
+    def evaluated_guards(interpreter, mocker):
+        spy = mocker.spy(interpreter._evaluator, '_evaluate_code')
+        interpreter.execute_once()
+        return [c[0][0] for c in spy.call_args_list]
+
+    def test_unchanged_guards_are_not_evaluated(self, interpreter, mocker):
+        interpreter.queue('other')
+        assert self.evaluated_guards(interpreter, mocker) == []
+
+    def test_written_variables_are_detected(self, interpreter, mocker):
+        interpreter.queue('inc')
+        interpreter.execute_once()
+        assert self.evaluated_guards(interpreter, mocker) == ['x > 10']
+
+        interpreter.context['x'] = 20
+        assert interpreter.execute_once().entered_states == ['s2']
+
+    def test_modified_variables_are_detected(self, interpreter):
+        interpreter.queue('add', 'add').execute()
+        assert interpreter.configuration == ['root', 's3']
+
+    def test_time_and_configuration_are_detected(self, interpreter, mocker):
+        interpreter.context['x'] = 20
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's2']
+
+        assert self.evaluated_guards(interpreter, mocker) == []
+        interpreter.clock.time = 5
+        assert interpreter.execute_once().entered_states == ['s1']
+        assert interpreter.configuration == ['root', 's1']
+
+    def test_same_behaviour(self, microwave):
+        evaluator_klass = partial(code.PythonEvaluator, reactive_guards=True)
+        reactive = Interpreter(microwave.statechart, evaluator_klass=evaluator_klass)
+
+        for interpreter in [microwave, reactive]:
+            interpreter.queue('door_opened', 'item_placed', 'door_closed', 'timer_inc',
+                              'timer_inc', 'cooking_start')
+            for _ in range(5):
+                interpreter.clock.time += 1
+                interpreter.queue('timer_tick')
+                interpreter.execute()
+
+        assert reactive.configuration == microwave.configuration
+        assert reactive.context == microwave.context
+
+
+class TestProfilingEvaluator:
+    @pytest.fixture
+    def statechart(self):
+        return import_from_yaml("""
+        statechart:
+          name: profiled
+          preamble: x = 0
+          root state:
+            name: root
+            initial: s1
+            states:
+              - name: s1
+                on entry: x = x + 1
+                contract:
+                  - before: x >= 0
+                transitions:
+                  - target: s2
+                    event: go
+                    guard: x > 0
+                    action: x = x * 2
+                  - event: fail
+                    action: 1 / 0
+              - name: s2
+        """)
+
+    @pytest.fixture
+    def profiler(self):
+        return code.Profiler()
+
+    @pytest.fixture
+    def interpreter(self, statechart, profiler):
+        return Interpreter(statechart, evaluator_klass=partial(code.ProfilingEvaluator, profiler=profiler))
+
+    def test_pieces_of_code_are_measured(self, interpreter, profiler):
+        interpreter.queue('go').execute()
+        assert interpreter.configuration == ['root', 's2']
+
+        assert {label: stats[0] for label, stats in profiler.stats.items()} == {
+            'statechart profiled: preamble': 1,
+            'state s1: on entry': 1,
+            'state s1: precondition x >= 0': 1,
+            'transition s1 -> s2 on go [x > 0]: guard': 1,
+            'transition s1 -> s2 on go [x > 0]: action': 1,
+        }
+        assert all(stats[1] >= 0 and stats[2] == 0 for stats in profiler.stats.values())
+
+    def test_internal_transitions_are_labelled(self, interpreter, profiler):
+        interpreter.execute()
+        with pytest.raises(CodeEvaluationError):
+            interpreter.queue('fail').execute()
+        assert 'transition s1 (internal) on fail: action' in profiler.stats
+        assert not any('->  ' in label for label in profiler.stats)
+
+    def test_exceptions_are_counted(self, interpreter, profiler):
+        interpreter.execute()
+        with pytest.raises(CodeEvaluationError) as e:
+            interpreter.queue('fail').execute()
+        assert profiler.stats['transition s1 (internal) on fail: action'][2] == 1
+
+        filenames = [frame.filename for frame in traceback.extract_tb(e.value.__cause__.__traceback__)]
+        assert 'transition s1 (internal) on fail: action' in filenames
+
+    def test_report_and_reset(self, interpreter, profiler):
+        interpreter.queue('go').execute()
+        report = profiler.report(limit=2)
+        assert report.splitlines()[0].split() == ['time', '(ms)', 'calls', 'per', 'call', 'errors', 'element']
+        assert len(report.splitlines()) == 3
+        assert [label for label, *_ in profiler.ranking()][:2] == [
+            line.split(None, 4)[4] for line in report.splitlines()[1:]]
+
+        profiler.reset()
+        assert profiler.stats == {}
+
+    def test_dump_stats(self, interpreter, profiler, tmpdir):
+        interpreter.queue('go').execute()
+        filepath = str(tmpdir.join('profile'))
+        profiler.dump_stats(filepath)
+
+        stats = pstats.Stats(filepath).stats
+        assert stats[('state s1: on entry', 1, '<code>')][0] == 1
+
+    def test_shared_profiler(self, statechart, profiler):
+        for _ in range(3):
+            Interpreter(statechart, evaluator_klass=partial(code.ProfilingEvaluator, profiler=profiler)).execute()
+        assert profiler.stats['state s1: on entry'][0] == 3
@@ -0,0 +1,163 @@
+import pytest
+
+from sismic.exceptions import InvariantError, PropertyStatechartError
+from sismic.exploration import events_from_alphabet, explore, fingerprint, fuzz, minimize
+from sismic.interpreter import Interpreter
+from sismic.io import import_from_yaml
+from sismic.model import Event
+
+
+DEADLOCK_YAML = """
+statechart:
+  name: deadlock
+  root state:
+    name: root
+    initial: s1
+    states:
+      - name: s1
+        transitions:
+          - target: s2
+            event: a
+          - target: end
+            event: b
+      - name: s2
+      - name: s3
+      - name: end
+        type: final
+"""
+
+PROPERTY_YAML = """
+statechart:
+  name: s2 must not be entered
+  root state:
+    name: root
+    initial: waiting
+    states:
+      - name: waiting
+        transitions:
+          - target: failure
+            event: state entered
+            guard: event.state == 's2'
+      - name: failure
+        type: final
+"""
+
+
+def test_events_from_alphabet():
+    events = events_from_alphabet(['a', Event('b', x=1), ('c', {'x': [1, 2], 'y': 'ab'})])
+    assert events == [Event('a'), Event('b', x=1), Event('c', x=1, y='a'), Event('c', x=1, y='b'),
+                      Event('c', x=2, y='a'), Event('c', x=2, y='b')]
+
+
+def test_fingerprint(microwave):
+    other = Interpreter(microwave.statechart)
+    assert fingerprint(microwave) == fingerprint(other)
+
+    microwave.queue('door_opened').execute()
+    other.queue('door_opened', 'item_placed', 'item_removed').execute()
+    assert fingerprint(microwave) == fingerprint(other)
+
+    other.queue('item_placed').execute()
+    assert fingerprint(microwave) != fingerprint(other)
+
+
+class TestExplore:
+    @pytest.fixture()
+    def statechart(self):
+        return import_from_yaml(DEADLOCK_YAML)
+
+    def test_complete_exploration(self, simple_statechart):
+        report = explore(simple_statechart, simple_statechart.events_for())
+        assert report.complete
+        assert report.explored == 3
+        assert report.unreachable_states == []
+        assert report.deadlocks == report.violations == []
+
+    def test_deadlocks_and_unreachable_states(self, statechart):
+        report = explore(statechart, ['a', 'b', 'c'])
+        assert report.complete
+        assert report.reachable_states == ['end', 'root', 's1', 's2']
+        assert report.unreachable_states == ['s3']
+        assert report.deadlocks == [([Event('a')], ['root', 's2'])]
+
+    def test_property_violations(self, statechart):
+        report = explore(statechart, ['a', 'b'], properties=[import_from_yaml(PROPERTY_YAML)])
+        assert len(report.violations) == 1
+        assert report.violations[0].error is PropertyStatechartError
+        assert report.violations[0].trace == [Event('a')]
+
+    def test_contract_violations(self):
+        statechart = import_from_yaml(
+            filepath='docs/examples/microwave/microwave_with_contracts.yaml')
+        report = explore(statechart, statechart.events_for(), max_depth=4)
+        assert not report.complete
+        violations = [v for v in report.violations if v.error is InvariantError]
+        assert len(violations) == 1
+        assert [event.name for event in violations[0].trace] == [
+            'door_opened', 'item_placed', 'door_closed', 'timer_dec']
+
+    def test_bounds(self, microwave):
+        events = microwave.statechart.events_for()
+        report = explore(microwave.statechart, events, max_depth=1)
+        assert not report.complete and report.explored == 2
+
+        report = explore(microwave.statechart, events, max_states=10, strategy='dfs')
+        assert not report.complete and report.explored == 10
+
+        with pytest.raises(ValueError, match='strategy'):
+            explore(microwave.statechart, events, strategy='random')
+
+    def test_processes(self, microwave):
+        events = microwave.statechart.events_for()
+        report = explore(microwave.statechart, events, max_depth=5)
+        parallel_report = explore(microwave.statechart, events, max_depth=5, processes=2)
+        assert str(report) == str(parallel_report)
+        assert report.explored == parallel_report.explored
+
+
+def test_minimize():
+    sequence = [Event(name) for name in 'abcdefgh']
+
+    def fails(candidate):
+        names = [event.name for event in candidate]
+        return 'c' in names and 'f' in names and names.index('c') < names.index('f')
+
+    assert minimize(sequence, fails) == [Event('c'), Event('f')]
+    assert minimize([Event('a')], fails) == [Event('a')]
+
+
+class TestFuzz:
+    @pytest.fixture()
+    def statechart(self):
+        return import_from_yaml(filepath='docs/examples/microwave/microwave_with_contracts.yaml')
+
+    def test_coverage_and_failures(self, statechart):
+        report = fuzz(statechart, runs=100, seed=42)
+        assert report.runs == 100
+        assert report.uncovered_transitions == []
+        assert report.uncovered_states == []
+        assert sum(report.coverage['processed transitions'].values()) > 100
+
+        assert len(report.failures) >= 1
+        failure = [f for f in report.failures if f.error is InvariantError][0]
+        assert [event.name for event in failure.trace] == [
+            'door_opened', 'item_placed', 'door_closed', 'timer_dec']
+
+    def test_seed(self, statechart):
+        report = fuzz(statechart, runs=10, length=5, seed=1, minimized=False)
+        other_report = fuzz(statechart, runs=10, length=5, seed=1, minimized=False)
+        assert report.coverage == other_report.coverage
+        assert str(report) == str(other_report)
+
+    def test_properties(self):
+        statechart = import_from_yaml(DEADLOCK_YAML)
+        report = fuzz(statechart, runs=20, seed=1, properties=[import_from_yaml(PROPERTY_YAML)])
+        assert len(report.failures) == 1
+        assert report.failures[0].error is PropertyStatechartError
+        assert report.failures[0].trace == [Event('a')]
+
+    def test_processes(self, statechart):
+        report = fuzz(statechart, runs=40, seed=3, processes=2)
+        assert report.runs == 40
+        assert len(report.uncovered_transitions) < len(statechart.transitions) // 2
+        assert len(report.failures) >= 1
@@ -1,12 +1,20 @@
 import pytest
+import functools
+import json
 import pickle
+import threading
+import time
 
 from collections import Counter
 
-from sismic.exceptions import ExecutionError, NonDeterminismError, ConflictingTransitionsError
-from sismic.code import DummyEvaluator
-from sismic.interpreter import Interpreter, Event, InternalEvent
+from sismic.exceptions import (ExecutionError, NonDeterminismError, ConflictingTransitionsError,
+                               QueueFullError)
+from sismic.interpreter import (Interpreter, Event, InternalEvent, PhaseTimer, QueuePolicy,
+                                check_determinism)
 from sismic.helpers import coverage_from_trace, log_trace, run_in_background
+from sismic.clock import UtcClock
+from sismic.code import DummyEvaluator, PythonEvaluator
+from sismic.io import import_from_yaml
 from sismic.model import Transition, MacroStep, MicroStep, MetaEvent
 from sismic import testing
 
@@ -298,6 +306,54 @@ class TestInterpreterWithInfinite:
         assert interpreter.final
         assert interpreter.context['x'] == 100
 
+    def test_iterate(self, interpreter):
+        steps = interpreter.iterate()
+        assert interpreter.context['x'] == 1
+
+        assert next(steps).entered_states == ['s2']
+        assert interpreter.context['x'] == 1
+        assert next(steps).entered_states == ['s1']
+        assert interpreter.context['x'] == 2
+
+        assert len(list(interpreter.iterate(max_steps=3))) == 3
+        assert interpreter.configuration == ['root', 's2']
+
+    def test_time_budget(self, interpreter, mocker):
+        perf_counter = mocker.patch('sismic.interpreter.default.perf_counter')
+        perf_counter.side_effect = [0, 1, 2, 3]
+        assert len(interpreter.execute(time_budget=2.5)) == 3
+
+        perf_counter.side_effect = [0, 1]
+        assert len(interpreter.execute(time_budget=0)) == 1
+
+    def test_run(self, interpreter):
+        assert interpreter.run(max_steps=3) == 3
+        assert interpreter.configuration == ['root', 's2']
+        assert interpreter.context['x'] == 2
+
+        assert interpreter.run() > 0
+        assert interpreter.final
+        assert interpreter.context['x'] == 100
+
+    def test_run_without_contract(self, infinite_statechart, mocker):
+        interpreter = Interpreter(infinite_statechart, ignore_contract=True)
+        mocker.spy(MacroStep, '__init__')
+        mocker.spy(MicroStep, '__init__')
+
+        assert interpreter.run() == 200
+        assert interpreter.final
+        assert interpreter.context['x'] == 100
+
+        # Steps to apply are built, but not the applied ones
+        assert MacroStep.__init__.call_count == 0
+        assert MicroStep.__init__.call_count == 202
+
+    def test_run_with_wrapped_execute_once(self, interpreter):
+        trace = log_trace(interpreter)
+        steps = interpreter.run()
+        assert len(trace) == steps
+        assert interpreter.final
+
 
 class TestInterpreterWithParallel:
     @pytest.fixture()
@@ -346,6 +402,23 @@ class TestInterpreterWithParallel:
         with pytest.raises(ConflictingTransitionsError):
             interpreter.execute_once()
 
+    def test_conflicts_are_cached(self, interpreter):
+        statechart = interpreter.statechart
+        interpreter.queue('nextA', 'nextB', 'conflict1').execute_once()
+        verdicts = statechart._cache['transition conflicts']
+        assert set(verdicts.values()) == {None}
+
+        interpreter.execute_once()
+        with pytest.raises(ConflictingTransitionsError):
+            interpreter.execute_once()
+        assert ConflictingTransitionsError in verdicts.values()
+
+        # Structural changes reset verdicts
+        for transition in statechart.transitions_with('conflict1'):
+            statechart.rotate_transition(transition, new_target=transition.source)
+        assert 'transition conflicts' not in statechart._cache
+        interpreter.queue('conflict1').execute_once()
+
 
 class TestInterpreterWithNestedParallel:
     common_states = ['root', 's1', 'p1', 'p2', 'r1', 'r2', 'r3', 'r4']
@@ -687,6 +760,570 @@ class TestEventQueue:
         assert event == Event('test1', delay=0)
         event = interpreter._select_event(consume=True)
         assert event == Event('test3', delay=2)
-        
-        
-    
\ No newline at end of file
+
+    def test_queue_many(self, interpreter, simple_statechart):
+        other = Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+        other.execute_once()
+
+        for i in [interpreter, other]:
+            i.queue('test0', delay=1)
+            i.queue('test1', delay=3)
+        for name, delay in [('test2', 2), ('test3', 1), ('test4', 0), ('test5', 3)]:
+            interpreter.queue(name, x=1, delay=delay)
+        other.queue_many([('test2', {'x': 1}, 2), ('test3', {'x': 1}, 1),
+                          Event('test4', x=1, delay=0), ('test5', {'x': 1, 'delay': 3})])
+
+        assert other._external_queue == interpreter._external_queue
+        assert [e.name for _, e in other._external_queue] == [
+            'test4', 'test0', 'test3', 'test2', 'test1', 'test5']
+
+        other.queue_many(['test6', InternalEvent('test7')])
+        assert other._external_queue[1][1] == Event('test6')
+        assert other._internal_queue[0][1] == Event('test7')
+
+    def test_queue_many_columns(self, interpreter):
+        parameters = [{'x': 1}, {'delay': 1}, {}]
+        interpreter.queue_many(['test1', 'test2', 'test3'], parameters=parameters)
+
+        assert [e.name for _, e in interpreter._external_queue] == ['test1', 'test3', 'test2']
+        assert interpreter._external_queue[0][1].data is parameters[0]
+        assert interpreter._external_queue[0][1].x == 1
+
+    def test_cancel(self, interpreter):
+        event = Event('test2', delay=1)
+        interpreter.queue('test1', delay=1).queue(event).queue('test3', delay=1)
+        assert interpreter.cancel(event) is interpreter
+
+        interpreter._time = 1
+        assert interpreter._select_event(consume=True) == Event('test1', delay=1)
+        assert interpreter._select_event(consume=True) == Event('test3', delay=1)
+        assert interpreter._select_event(consume=True) is None
+        assert interpreter._cancelled == {}
+
+    def test_cancel_internal_event(self, interpreter):
+        event = InternalEvent('test1', delay=1)
+        interpreter._raise_event(event)
+        interpreter.cancel(event)
+        interpreter._time = 1
+        assert interpreter._select_event() is None
+
+    def test_cancel_consumed_events(self, interpreter):
+        events = [Event('test{}'.format(i)) for i in range(10)]
+        for event in events:
+            interpreter.queue(event)
+            interpreter._select_event(consume=True)
+            interpreter.cancel(event)
+        interpreter.execute_once()
+        assert interpreter._cancelled == {}
+
+    def test_cancel_event_sent_during_same_step(self):
+        statechart = import_from_yaml("""
+        statechart:
+          name: cancel
+          root state:
+            name: root
+            initial: s1
+            states:
+              - name: s1
+                on exit: t = send('timeout', delay=5)
+                transitions:
+                  - target: s2
+                    event: go
+                    action: cancel(t)
+              - name: s2
+                transitions:
+                  - target: s3
+                    event: timeout
+              - name: s3
+        """)
+        interpreter = Interpreter(statechart)
+        interpreter.queue('go').execute()
+        assert interpreter.configuration == ['root', 's2']
+
+        interpreter.clock.time = 10
+        interpreter.execute()
+        assert interpreter.configuration == ['root', 's2']
+        assert interpreter._internal_queue == [] and interpreter._cancelled == {}
+
+    def test_cancel_and_pickle(self, interpreter):
+        event = Event('test1')
+        interpreter.queue(event).queue('test2').cancel(event)
+        copy = pickle.loads(pickle.dumps(interpreter))
+        assert copy._select_event(consume=True) == Event('test2')
+
+    def test_queue_threadsafe(self, interpreter):
+        interpreter.queue('test1')
+        interpreter.queue_threadsafe('test2', Event('test3'), x=1)
+        assert len(interpreter._external_queue) == 1
+
+        interpreter.execute_once()
+        assert interpreter._external_queue == [(0, Event('test2', x=1)), (0, Event('test3'))]
+
+    def test_cancel_queue_threadsafe(self, interpreter):
+        event = Event('test1')
+        interpreter.queue_threadsafe(event, 'test2').cancel(event)
+        consumed = []
+        interpreter.attach(lambda e: consumed.append(e.event) if e.name == 'event consumed' else None)
+        interpreter.execute()
+        assert consumed == [Event('test2')]
+
+    def test_queue_threadsafe_with_failure(self, interpreter, mocker):
+        queue_event = interpreter._queue_event
+
+        def failing_queue_event(event):
+            if event.name == 'test2':
+                raise ValueError()
+            queue_event(event)
+
+        mocker.patch.object(interpreter, '_queue_event', side_effect=failing_queue_event)
+        interpreter.queue_threadsafe('test1', 'test2', 'test3')
+        with pytest.raises(ValueError):
+            interpreter.execute_once()
+        assert [event.name for _, event in interpreter._external_queue] == ['test1']
+        assert [event.name for event in interpreter._inbound] == ['test3']
+
+    def test_queue_threadsafe_from_threads(self, interpreter):
+        def produce(i):
+            for j in range(100):
+                interpreter.queue_threadsafe('test', i=i, j=j)
+
+        producers = [threading.Thread(target=produce, args=(i, )) for i in range(4)]
+        for producer in producers:
+            producer.start()
+        consumed = []
+        interpreter.attach(lambda e: consumed.append(e.event) if e.name == 'event consumed' else None)
+        while any(producer.is_alive() for producer in producers) or interpreter._inbound:
+            interpreter.execute()
+        interpreter.execute()
+
+        assert len(consumed) == 400
+        for i in range(4):
+            assert [e.j for e in consumed if e.i == i] == list(range(100))
+
+    def test_queue_many_wrapped(self, interpreter, mocker):
+        queue_event = mocker.patch.object(interpreter, '_queue_event')
+        interpreter.queue_many(['test1', 'test2'])
+        assert [call[0][0].name for call in queue_event.call_args_list] == ['test1', 'test2']
+
+
+
+class TestQueuePolicy:
+    def names(self, interpreter):
+        return [event.name for _, event in interpreter._external_queue]
+
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            QueuePolicy(overflow='unknown')
+        with pytest.raises(ValueError):
+            QueuePolicy(coalesce='unknown')
+        with pytest.raises(ValueError):
+            QueuePolicy(max_size=0)
+
+    @pytest.mark.parametrize('overflow, expected, dropped', [
+        ('drop-newest', ['e1', 'e2'], 2),
+        ('drop-oldest', ['e3', 'e4'], 2),
+    ])
+    def test_drop(self, simple_statechart, overflow, expected, dropped):
+        policy = QueuePolicy(max_size=2, overflow=overflow)
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.queue('e1', 'e2', 'e3').queue_many(['e4'])
+
+        assert self.names(interpreter) == expected
+        assert policy.dropped == dropped
+        policy.reset()
+        assert policy.dropped == 0
+
+    def test_raise(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, queue_policy=QueuePolicy(max_size=1))
+        interpreter.queue('e1')
+        with pytest.raises(QueueFullError):
+            interpreter.queue('e2')
+        assert self.names(interpreter) == ['e1']
+
+        # Internal events are not concerned
+        interpreter._raise_event(InternalEvent('e3'))
+        assert len(interpreter._internal_queue) == 1
+
+    def test_block(self, simple_statechart):
+        policy = QueuePolicy(max_size=1, overflow='block', timeout=0.01)
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+
+        # Stabilization, by the thread that executes the interpreter
+        consumer = threading.Thread(target=interpreter.execute_once)
+        consumer.start()
+        consumer.join()
+
+        interpreter.queue_threadsafe('e1')
+        with pytest.raises(QueueFullError, match='after 0.01 seconds'):
+            interpreter.queue_threadsafe('e2')
+        assert list(interpreter._inbound) == [Event('e1')]
+
+        policy.timeout = 5
+        consumer = threading.Timer(0.01, interpreter.execute_once)
+        consumer.start()
+        interpreter.queue_threadsafe('e2')  # Blocks until e1 is consumed
+        consumer.join()
+        assert list(interpreter._inbound) == [Event('e2')]
+
+    def test_block_in_executing_thread(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart,
+                                  queue_policy=QueuePolicy(max_size=1, overflow='block'))
+        interpreter.queue('e1')
+        with pytest.raises(QueueFullError, match='queue_threadsafe'):
+            interpreter.queue('e2')
+
+        # Never executed, or called by the thread that executes the interpreter
+        interpreter.queue_threadsafe('e2')
+        interpreter.execute_once()
+        interpreter.queue_threadsafe('e3')
+        assert [event.name for event in interpreter._inbound] == ['e2', 'e3']
+
+    def test_block_from_other_threads(self, simple_statechart):
+        policy = QueuePolicy(max_size=3, overflow='block', timeout=5)
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.execute_once()
+
+        consumed = []
+        sizes = []
+        interpreter.attach(
+            lambda e: consumed.append(e.event.name) if e.name == 'event consumed' else None)
+        interpreter.attach(lambda e: sizes.append(
+            len(interpreter._external_queue) + len(interpreter._inbound))
+            if e.name == 'step started' else None)
+
+        def produce(prefix):
+            for i in range(50):
+                interpreter.queue_threadsafe('{}{}'.format(prefix, i))
+
+        producers = [threading.Thread(target=produce, args=(prefix,)) for prefix in 'ab']
+        for producer in producers:
+            producer.start()
+        while any(producer.is_alive() for producer in producers) or interpreter._inbound:
+            interpreter.execute()
+        interpreter.execute()
+
+        # Events of each producer are consumed in order, and the queue never exceeds max_size
+        for prefix in 'ab':
+            assert [name for name in consumed if name[0] == prefix] == [
+                '{}{}'.format(prefix, i) for i in range(50)]
+        assert max(sizes) <= 3
+
+    def test_block_with_queue_threadsafe(self, simple_statechart):
+        policy = QueuePolicy(max_size=2, overflow='block')
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.queue_threadsafe('e1', 'e2', 'e3', 'e4')
+
+        # Events that cannot be queued are kept for the next steps
+        assert interpreter.execute_once() is not None  # Stabilization
+        assert self.names(interpreter) == ['e1', 'e2']
+        assert [event.name for event in interpreter._inbound] == ['e3', 'e4']
+
+        interpreter.execute()
+        assert interpreter._external_queue == [] and len(interpreter._inbound) == 0
+
+    def test_cancel_events_kept_in_inbound_buffer(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, queue_policy=QueuePolicy(max_size=1))
+        event = Event('e2')
+        interpreter.queue_threadsafe('e1', event).cancel(event)
+        for i in range(5):
+            interpreter.cancel(Event('consumed'))  # Stale marks, to be forgotten
+
+        consumed = []
+        interpreter.attach(lambda e: consumed.append(e.event) if e.name == 'event consumed' else None)
+        interpreter.execute_once()  # Stabilization, e2 is kept in the inbound buffer
+        assert list(interpreter._inbound) == [event]
+        assert list(interpreter._cancelled.values()) == [event]
+
+        interpreter.execute()
+        assert consumed == [Event('e1')]
+
+    def test_block_wakes_up_on_cancelled_events(self, simple_statechart):
+        policy = QueuePolicy(max_size=1, overflow='block', timeout=5)
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        consumer = threading.Thread(target=interpreter.execute_once)
+        consumer.start()
+        consumer.join()
+
+        event = Event('e1')
+        interpreter.queue(event).cancel(event)
+        consumer = threading.Timer(0.01, interpreter.execute_once)
+        consumer.start()
+        start = time.perf_counter()
+        interpreter.queue_threadsafe('e2')  # Blocks until e1 is removed
+        assert time.perf_counter() - start < 2.5
+        consumer.join()
+        assert list(interpreter._inbound) == [Event('e2')]
+
+    def test_coalesce_latest(self, simple_statechart):
+        policy = QueuePolicy(coalesce='latest')
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.queue('e1', x=1).queue('e2').queue('e1', x=2, y=3)
+
+        assert [e for _, e in interpreter._external_queue] == [Event('e1', x=2, y=3), Event('e2')]
+        assert policy.coalesced == 1
+
+        # Consumed events are not coalesced
+        interpreter._select_event(consume=True)
+        interpreter.queue('e1', x=4)
+        assert self.names(interpreter) == ['e2', 'e1']
+
+        # Nor are cancelled ones
+        event = Event('e2', x=5)
+        interpreter.queue(event).cancel(event)  # Coalesced with the queued e2
+        interpreter.queue('e2', x=6)
+        assert policy.coalesced == 2
+        assert interpreter._select_event(consume=True) == Event('e1', x=4)
+        assert interpreter._select_event(consume=True) == Event('e2', x=6)
+
+    def test_coalesce_merge(self, simple_statechart):
+        policy = QueuePolicy(max_size=1, coalesce='merge')
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.queue('e1', x=1, y=1).queue('e1', x=2, z=3)
+
+        assert [e for _, e in interpreter._external_queue] == [Event('e1', x=2, y=1, z=3)]
+        assert policy.coalesced == 1 and policy.dropped == 0
+
+    def test_pickle(self, simple_statechart):
+        policy = QueuePolicy(max_size=1, overflow='block', coalesce='latest')
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        interpreter.queue('e1', x=1)
+
+        copy = pickle.loads(pickle.dumps(interpreter))
+        copy.queue('e1', x=2)
+        assert copy._external_queue[0][1] == Event('e1', x=2)
+        assert interpreter._external_queue[0][1] == Event('e1', x=1)
+
+
+class TestStabilization:
+    class WholeConfigurationInterpreter(Interpreter):
+        # Overriding _create_stabilization_step disables the worklist
+        def _create_stabilization_step(self, names):
+            return super()._create_stabilization_step(names)
+
+    def run(self, interpreter):
+        steps = [interpreter.execute_once()]  # type: list
+        for event in sorted(interpreter.statechart.events_for()) * 2:
+            interpreter.queue(event)
+            try:
+                steps.append(interpreter.execute_once())
+            except Exception as e:
+                steps.append(type(e))
+                break
+        return list(map(repr, steps))
+
+    @pytest.mark.parametrize('name', ['nested_parallel_statechart', 'deep_history_statechart',
+                                      'history_statechart', 'final_statechart',
+                                      'parallel_statechart'])
+    def test_same_steps_as_whole_configuration(self, request, name):
+        statechart = request.getfixturevalue(name)
+
+        expected = self.run(self.WholeConfigurationInterpreter(statechart))
+        assert self.run(Interpreter(statechart)) == expected
+
+    def test_same_steps_for_examples(self, example_from_docs):
+        expected = self.run(self.WholeConfigurationInterpreter(example_from_docs))
+        assert self.run(Interpreter(example_from_docs)) == expected
+
+    def test_default_entry_plan(self, nested_parallel_statechart, history_statechart):
+        interpreter = Interpreter(nested_parallel_statechart)
+        assert interpreter._default_entry_plan('s1') == [
+            ['p1', 'p2'], ['r1', 'r2'], ['i1'], ['i2'], ['r3', 'r4'], ['i3'], ['i4']]
+        assert interpreter._default_entry_plan('i1') == []
+
+        # Plans are shared by interpreters and reset on structural changes
+        assert 'default entry plans' in nested_parallel_statechart._cache
+        nested_parallel_statechart.remove_state('p2')
+        assert 'default entry plans' not in nested_parallel_statechart._cache
+        assert interpreter._default_entry_plan('s1') == [['p1'], ['r1', 'r2'], ['i1'], ['i2']]
+
+        # Not static
+        interpreter = Interpreter(history_statechart)
+        assert interpreter._default_entry_plan('loop') is None
+
+    def test_stabilize_given_states(self, nested_parallel_statechart):
+        interpreter = Interpreter(nested_parallel_statechart)
+        interpreter.execute_once()
+        configuration = interpreter.configuration
+
+        # Already stable
+        assert interpreter._stabilize() == []
+        assert interpreter._stabilize(['s1']) == []
+        assert interpreter.configuration == configuration
+
+
+class TestDeterminismAnalysis:
+    def test_deterministic(self, nested_parallel_statechart):
+        report = check_determinism(nested_parallel_statechart)
+        assert report.deterministic
+        assert report.unproven == []
+        assert check_determinism(nested_parallel_statechart) is report
+
+    def test_nondeterministic(self, nondeterministic_statechart):
+        report = check_determinism(nondeterministic_statechart)
+        assert not report.deterministic
+        assert [error for _, _, error in report.unproven] == [NonDeterminismError]
+        assert 'NonDeterminismError' in str(report)
+
+    def test_conflicting(self, parallel_statechart):
+        report = check_determinism(parallel_statechart)
+        assert {t1.event for t1, _, _ in report.unproven} == {'conflict1', 'conflict2'}
+        assert {error for _, _, error in report.unproven} == {ConflictingTransitionsError}
+        assert report.proven(parallel_statechart.transitions_with('nextA'))
+        assert not report.proven(parallel_statechart.transitions_with('conflict1'))
+
+    def test_runtime_checks_are_skipped(self, parallel_statechart, mocker):
+        check_determinism(parallel_statechart)
+        interpreter = Interpreter(parallel_statechart, evaluator_klass=DummyEvaluator)
+        mocker.spy(interpreter, '_transitions_conflict')
+
+        interpreter.queue('nextA', 'nextB').execute()
+        assert interpreter._transitions_conflict.call_count == 0
+
+        interpreter.queue('conflict1')
+        with pytest.raises(ConflictingTransitionsError):
+            interpreter.execute_once()
+
+    def test_structural_changes_discard_report(self, nondeterministic_statechart):
+        check_determinism(nondeterministic_statechart)
+        nondeterministic_statechart.remove_transition(nondeterministic_statechart.transitions[0])
+        assert 'determinism' not in nondeterministic_statechart._cache
+        assert check_determinism(nondeterministic_statechart).deterministic
+
+    def test_priority_changes_discard_report(self, nondeterministic_statechart):
+        assert not check_determinism(nondeterministic_statechart).deterministic
+        nondeterministic_statechart.transitions[0].priority = Transition.HIGH_PRIORITY
+        assert check_determinism(nondeterministic_statechart).deterministic
+
+        interpreter = Interpreter(nondeterministic_statechart, evaluator_klass=DummyEvaluator)
+        nondeterministic_statechart.transitions[0].priority = Transition.DEFAULT_PRIORITY
+        interpreter.execute_once()
+        with pytest.raises(NonDeterminismError):
+            interpreter.execute_once()
+
+
+class TestPhaseTimer:
+    @pytest.fixture()
+    def interpreter(self, microwave):
+        microwave.queue('door_opened', 'item_placed', 'door_closed', 'timer_inc', 'cooking_start')
+        return microwave
+
+    def test_phases_are_measured(self, interpreter):
+        with PhaseTimer(interpreter) as timer:
+            steps = interpreter.execute()
+
+        # One more call to execute_once, that returns None
+        assert len(timer.steps) == len(steps) + 1
+        assert {'execute_once', 'event selection', 'transition selection', 'transition sorting',
+                'step creation', 'step application', 'stabilization', 'on entry', 'action',
+                'on exit', 'listeners'}.issubset(timer.totals())
+        for phases in timer.steps:
+            assert all(duration <= phases['execute_once'] for duration in phases.values())
+
+        timer.reset()
+        assert timer.spans == [] and timer.steps == []
+
+    def test_detach(self, interpreter):
+        timer = PhaseTimer(interpreter)
+        timer.detach()
+
+        assert 'execute_once' not in vars(interpreter)
+        assert '_apply_step' not in vars(interpreter)
+        assert 'execute_on_entry' not in vars(interpreter._evaluator)
+        interpreter.execute()
+        assert timer.spans == []
+        pickle.dumps(interpreter)
+
+        # Previously wrapped methods are restored
+        log_trace(interpreter)
+        wrapped = interpreter.execute_once
+        with PhaseTimer(interpreter):
+            pass
+        assert interpreter.execute_once is wrapped
+
+    def test_chrome_trace(self, interpreter, tmpdir):
+        timer = PhaseTimer(interpreter)
+        interpreter.execute_once()
+        filepath = str(tmpdir.join('trace.json'))
+        trace = timer.export_chrome_trace(filepath)
+
+        with open(filepath) as f:
+            assert json.load(f) == trace
+
+        events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        assert len(events) == len(timer.spans)
+        assert events[0]['name'] == 'execute_once'
+        assert all(event['ts'] >= events[0]['ts'] and event['dur'] >= 0 for event in events)
+        assert all(event['args']['step'] == 0 for event in events)
+
+
+class TestRunUntil:
+    @pytest.fixture()
+    def interpreter(self):
+        return Interpreter(import_from_yaml(filepath='tests/yaml/timer.yaml'))
+
+    def test_run_until(self, interpreter, mocker):
+        mocker.spy(interpreter, 'execute_once')
+
+        assert interpreter.run_until(4) == 2
+        assert interpreter.configuration == ['root', 's2']
+        assert interpreter.clock.time == 4
+
+        # One call per relevant instant (0, 3, 4), plus one call per macro step
+        assert interpreter.execute_once.call_count == 5
+
+        assert interpreter.run_until(100) == 2
+        assert interpreter.final
+        assert interpreter.time == interpreter.clock.time == 100
+
+        with pytest.raises(ValueError, match='monotonic'):
+            interpreter.run_until(50)
+
+    def test_run_until_quiescent(self, interpreter):
+        assert interpreter.run_until_quiescent() == 4
+        assert interpreter.final
+        assert interpreter.clock.time == 7
+
+    @pytest.mark.parametrize('reactive_guards', [False, True])
+    def test_guards_and_delayed_events(self, elevator, reactive_guards):
+        elevator = Interpreter(elevator.statechart, evaluator_klass=functools.partial(
+            PythonEvaluator, reactive_guards=reactive_guards))
+        elevator.queue(Event('floorSelected', floor=4, delay=5))
+
+        elevator.run_until(15)
+        assert elevator.context['current'] == 0
+
+        # after(10) is still evaluated to False at 15, but "current > 0" prevents the transition
+        elevator.run_until_quiescent()
+        assert 'doorsOpen' in elevator.configuration
+        assert elevator.clock.time == 25
+
+    def test_max_time(self, infinite_statechart):
+        interpreter = Interpreter(infinite_statechart)
+        interpreter.queue('e', delay=10)
+        interpreter.run_until_quiescent(max_time=5)
+        assert interpreter.clock.time == 5
+        assert interpreter._external_queue[0] == (10, Event('e', delay=10))
+
+    def test_deadlines_are_only_tracked_when_needed(self, interpreter):
+        interpreter.execute()
+        interpreter.clock.time = 1
+        interpreter.execute()
+        assert interpreter._evaluator._deadlines == {}
+
+        assert interpreter.run_until(2) == 0
+        assert list(interpreter._evaluator._deadlines.values()) == [3]
+        assert interpreter.run_until(3) == 1
+
+    def test_cancelled_events_are_ignored(self, interpreter):
+        event = Event('e', delay=1)
+        interpreter.queue(event, Event('f', delay=2))
+        interpreter.cancel(event)
+        interpreter.run_until(2.5)
+        assert interpreter.clock.time == 2.5
+
+    def test_requires_simulated_clock(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, clock=UtcClock())
+        with pytest.raises(ValueError, match='SimulatedClock'):
+            interpreter.run_until(10)
+        with pytest.raises(ValueError, match='SimulatedClock'):
+            interpreter.run_until_quiescent()
@@ -1,9 +1,19 @@
+import os
 import pytest
+import ruamel.yaml
+import schema
 
-from sismic.model import Statechart
-from sismic.exceptions import StatechartError
+from sismic.code.python import _compiled_code
+from sismic.interpreter import Interpreter, QueuePolicy
+from sismic.model import Event, Statechart
+from sismic.exceptions import ExecutionError, QueueFullError, StatechartError
 from sismic.io import import_from_yaml, export_to_yaml, export_to_plantuml
+from sismic.io import import_from_json, export_to_json, import_from_msgpack, export_to_msgpack
+from sismic.io import TraceWriter, read_trace, replay_trace
 from sismic.io.plantuml import cli
+from sismic.io.cache import cache_key
+from sismic.io.datadict import validate_dict
+from sismic.io.yaml import SCHEMA
 
 
 def compare_statecharts(s1, s2):
@@ -95,6 +105,131 @@ class TestImportFromYaml:
         assert 'root cannot declare both a "states" and a "parallel states" property' in str(e.value)
 
 
+class TestValidateDict:
+    @staticmethod
+    def load(text):
+        return ruamel.yaml.YAML(typ='safe', pure=True).load(text)
+
+    @pytest.fixture(params=['actions', 'composite', 'history', 'deep_history', 'final', 'infinite',
+                            'internal', 'priority', 'nested_parallel', 'nondeterministic', 'parallel',
+                            'simple', 'timer'])
+    def data(self, request):
+        with open(os.path.join('tests', 'yaml', request.param + '.yaml')) as f:
+            return self.load(f.read())
+
+    def test_equivalent_to_schema(self, data):
+        assert validate_dict(data) == schema.Schema(SCHEMA.statechart).validate(data)
+
+    @pytest.mark.parametrize('text', [
+        'statechart:\n  root state:\n    name: s1',
+        'statechart:\n  name: test',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    unknown: x',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    type: initial',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    states: s2',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    contract:\n      - {}',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    contract:\n      - sometimes: x',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    transitions:\n      - priority: x',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n    transitions:\n      - source: x',
+        'statechart:\n  name: test\n  root state:\n    name: s1\n  other: x',
+        'statecharts:\n  name: test\n  root state:\n    name: s1',
+        '- statechart',
+    ])
+    def test_invalid_data(self, text):
+        data = self.load(text)
+        with pytest.raises(schema.SchemaError):
+            schema.Schema(SCHEMA.statechart).validate(data)
+        with pytest.raises(ValueError):
+            validate_dict(data)
+        with pytest.raises(StatechartError):
+            import_from_yaml(text)
+
+    def test_conversions(self):
+        data = self.load(
+            'statechart:\n  name: 1\n  root state:\n    name: 2\n'
+            '    transitions:\n      - priority: "3"\n      - priority: high')
+        validated = validate_dict(data)
+        assert validated == schema.Schema(SCHEMA.statechart).validate(data)
+        assert validated['statechart']['name'] == '1'
+        assert validated['statechart']['root state']['transitions'][0]['priority'] == 3
+        assert validated['statechart']['root state']['transitions'][1]['priority'] == 'high'
+
+
+def test_import_from_yaml_timings():
+    timings = {}
+    import_from_yaml(filepath='docs/examples/elevator/elevator.yaml', timings=timings)
+    assert set(timings.keys()) == {'parsing', 'validation', 'import', 'statechart validation'}
+
+
+def test_import_from_yaml_not_pure(example_from_docs):
+    text = export_to_yaml(example_from_docs)
+    compare_statecharts(example_from_docs, import_from_yaml(text, pure=False))
+
+
+class TestCache:
+    FILEPATH = 'docs/examples/elevator/elevator_contract.yaml'
+
+    @pytest.fixture()
+    def cache_dir(self, tmpdir):
+        return str(tmpdir.join('cache'))
+
+    def test_cache_miss_then_hit(self, cache_dir):
+        timings = {}
+        statechart = import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir, timings=timings)
+        assert 'cache' not in timings
+        assert len(os.listdir(cache_dir)) == 1
+
+        timings = {}
+        cached = import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir, timings=timings)
+        assert set(timings.keys()) == {'cache'}
+        compare_statecharts(statechart, cached)
+
+        interpreter = Interpreter(cached)
+        interpreter.queue('floorSelected', floor=4)
+        assert interpreter.execute()[-1].entered_states == ['doorsOpen']
+
+    def test_cached_code_is_registered(self, cache_dir):
+        import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir)
+        _compiled_code.clear()
+
+        import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir)
+        assert ('current > destination', 'eval') in _compiled_code
+        assert ('current = current - 1', 'exec') in _compiled_code
+
+    def test_options_are_part_of_the_key(self, cache_dir):
+        with open(self.FILEPATH) as f:
+            text = f.read()
+        assert cache_key(text, False, False) != cache_key(text, True, False)
+
+        import_from_yaml(text, cache_dir=cache_dir)
+        import_from_yaml(text, cache_dir=cache_dir, ignore_validation=True)
+        assert len(os.listdir(cache_dir)) == 2
+
+        # Both parsers could build different statecharts
+        import_from_yaml(text, cache_dir=cache_dir, pure=False)
+        assert len(os.listdir(cache_dir)) == 3
+
+    def test_corrupted_cache_file(self, cache_dir):
+        import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir)
+        for name in os.listdir(cache_dir):
+            with open(os.path.join(cache_dir, name), 'wb') as f:
+                f.write(b'garbage')
+
+        timings = {}
+        import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir, timings=timings)
+        assert 'cache' not in timings
+
+        timings = {}
+        import_from_yaml(filepath=self.FILEPATH, cache_dir=cache_dir, timings=timings)
+        assert 'cache' in timings
+
+    def test_invalid_code_is_not_cached(self, cache_dir):
+        yaml = ('statechart:\n  name: test\n  root state:\n    name: root\n'
+                '    on entry: x = = 1\n')
+        import_from_yaml(yaml, cache_dir=cache_dir)
+        statechart = import_from_yaml(yaml, cache_dir=cache_dir)
+        assert statechart.state_for('root').on_entry == 'x = = 1'
+
+
 class TestExportToYaml:
     def test_export_example_from_tests(self, example_from_tests):
         assert len(export_to_yaml(example_from_tests)) > 0
@@ -115,6 +250,45 @@ class TestExportToYaml:
         compare_statecharts(example_from_docs, import_from_yaml(export_to_yaml(example_from_docs)))
 
 
+class TestJSON:
+    def test_identity_for_example_from_tests(self, example_from_tests):
+        compare_statecharts(example_from_tests, import_from_json(export_to_json(example_from_tests)))
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        compare_statecharts(example_from_docs, import_from_json(export_to_json(example_from_docs)))
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.json'))
+        export_to_json(elevator.statechart, filepath, indent=2)
+        compare_statecharts(elevator.statechart, import_from_json(filepath=filepath))
+
+    def test_invalid(self):
+        with pytest.raises(StatechartError, match='parsing'):
+            import_from_json('{"statechart": ')
+        with pytest.raises(StatechartError, match='validation'):
+            import_from_json('{"statechart": {"name": "test"}}')
+
+
+class TestMsgPack:
+    @pytest.fixture(autouse=True)
+    def msgpack(self):
+        return pytest.importorskip('msgpack')
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        data = export_to_msgpack(example_from_docs)
+        assert isinstance(data, bytes)
+        compare_statecharts(example_from_docs, import_from_msgpack(data))
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.msgpack'))
+        export_to_msgpack(elevator.statechart, filepath)
+        compare_statecharts(elevator.statechart, import_from_msgpack(filepath=filepath))
+
+    def test_invalid(self, msgpack):
+        with pytest.raises(StatechartError, match='validation'):
+            import_from_msgpack(msgpack.packb({'statechart': {'name': 'test'}}))
+
+
 class TestExportToPlantUML:
     def test_export_example_from_tests(self, example_from_tests):
         export = export_to_plantuml(
@@ -168,3 +342,82 @@ class TestExportToPlantUML:
         export = export_to_plantuml(statechart, based_on_filepath='docs/examples/elevator/elevator.plantuml', statechart_description=True, statechart_preamble=True, state_contracts=True, transition_contracts=True, state_action=False, statechart_name=False, transition_action=False)
         assert export == out.strip()
 
+
+
+class TestTrace:
+    @pytest.fixture()
+    def filepath(self, tmpdir):
+        return str(tmpdir.join('trace.jsonl'))
+
+    @pytest.fixture()
+    def recorded(self, elevator, filepath):
+        with TraceWriter(filepath).record(elevator):
+            elevator.execute()
+            elevator.queue('floorSelected', floor=4)
+            elevator.clock.time += 1
+            elevator.execute()
+            elevator.clock.time += 20
+            elevator.execute()
+        return elevator
+
+    def test_records(self, recorded, filepath):
+        records = list(read_trace(filepath))
+        assert records[0]['type'] == 'header'
+        assert records[0]['statechart'] == recorded.statechart.name
+        assert {'type': 'event', 'name': 'floorSelected', 'parameters': {'floor': 4}} in records
+        assert records[-1] == {'type': 'execute', 'time': 21, 'step': None}
+
+    def test_replay(self, recorded, filepath):
+        steps = replay_trace(recorded.statechart, filepath)
+        assert len(steps) > 0
+        assert steps[-1].time == 21
+
+    def test_replay_detects_divergence(self, recorded, filepath):
+        statechart = recorded.statechart
+        statechart.remove_transition(statechart.transitions_with('floorSelected')[0])
+
+        with pytest.raises(ExecutionError):
+            replay_trace(statechart, filepath)
+
+        # No verification
+        replay_trace(statechart, filepath, verify=False)
+
+    def test_replay_cancelled_events(self, elevator, filepath):
+        with TraceWriter(filepath).record(elevator):
+            elevator.execute()
+            event = Event('floorSelected', floor=4)
+            elevator.queue(event, Event('floorSelected', floor=2)).cancel(event)
+            elevator.execute()
+
+            # Cancelled before it is moved to the external queue
+            event = Event('floorSelected', floor=1)
+            elevator.queue_threadsafe(event, Event('floorSelected', floor=3)).cancel(event)
+            elevator.execute()
+
+        records = list(read_trace(filepath))
+        assert [r['event'] for r in records if r['type'] == 'cancel'] == [0, 2]
+
+        steps = replay_trace(elevator.statechart, filepath)
+        assert [step.event for step in steps if step.event] == [
+            Event('floorSelected', floor=2), Event('floorSelected', floor=3)]
+
+    @pytest.mark.parametrize('overflow', ['raise', 'drop-newest', 'drop-oldest'])
+    def test_replay_with_queue_policy(self, filepath, overflow):
+        statechart = import_from_yaml(filepath='docs/examples/elevator/elevator.yaml')
+        interpreter = Interpreter(statechart, queue_policy=QueuePolicy(max_size=1, overflow=overflow))
+        with TraceWriter(filepath).record(interpreter):
+            interpreter.execute()
+            interpreter.queue('floorSelected', floor=4)
+            try:
+                interpreter.queue('floorSelected', floor=2)
+            except QueueFullError:
+                pass
+            interpreter.execute()
+
+        records = list(read_trace(filepath))
+        assert records[0]['queue policy'] == {'max_size': 1, 'overflow': overflow, 'coalesce': None}
+        assert len([r for r in records if r['type'] == 'event']) == (1 if overflow == 'raise' else 2)
+
+        steps = replay_trace(statechart, filepath)
+        assert [step.event for step in steps if step.event] == [
+            Event('floorSelected', floor=2 if overflow == 'drop-oldest' else 4)]
@@ -1,5 +1,8 @@
+import pickle
 import pytest
 
+from copy import deepcopy
+
 from sismic.exceptions import StatechartError
 from sismic.model import Statechart, Transition, CompoundState, BasicState
 from sismic.interpreter import Event
@@ -78,6 +81,10 @@ class TestStatechartTraveral:
         assert sorted(composite_statechart.leaf_for(['s1', 's2'])) == ['s1', 's2']
         assert sorted(composite_statechart.leaf_for(['s1', 's1b1', 's2'])) == ['s1b1', 's2']
         assert sorted(composite_statechart.leaf_for(['s1', 's1b', 's1b1'])) == ['s1b1']
+        assert sorted(composite_statechart.leaf_for(['root', 's1b1', 's1b1', 's2'])) == ['s1b1', 's2']
+
+        with pytest.raises(StatechartError):
+            composite_statechart.leaf_for(['s1', 'unknown'])
 
     def test_events_for(self, composite_statechart):
         assert set(composite_statechart.events_for()) == {'click', 'close', 'validate'}
@@ -500,6 +507,42 @@ class TestStatechartStates:
         history_statechart.validate()
 
 
+class TestStatechartCache:
+    def test_structural_changes_clear_cache(self, composite_statechart):
+        composite_statechart._cache['test'] = True
+        composite_statechart.rename_state('s1', 'new s1')
+        assert composite_statechart._cache == {}
+
+        composite_statechart._cache['test'] = True
+        composite_statechart.add_state(BasicState('new'), 'root')
+        assert composite_statechart._cache == {}
+
+    def test_attribute_changes_clear_cache(self, composite_statechart):
+        composite_statechart._cache['test'] = True
+        Transition('s1', 's2', event='e', priority=1)
+        assert composite_statechart._cache == {'test': True}
+
+        composite_statechart.transitions[0].priority = 1
+        assert composite_statechart._cache == {}
+
+        for attribute in ['event', 'guard']:
+            composite_statechart._cache['test'] = True
+            setattr(composite_statechart.transitions[0], attribute, 'x')
+            assert composite_statechart._cache == {}
+
+        composite_statechart._cache['test'] = True
+        composite_statechart.transitions[0].action = 'x = 1'
+        assert composite_statechart._cache == {'test': True}
+
+        composite_statechart.state_for('s1').initial = 's1b'
+        assert composite_statechart._cache == {}
+
+    def test_cache_is_not_copied(self, composite_statechart):
+        composite_statechart._cache['test'] = True
+        assert deepcopy(composite_statechart)._cache == {}
+        assert pickle.loads(pickle.dumps(composite_statechart))._cache == {}
+
+
 class TestCopyFromStatechart:
     @pytest.fixture
     def modified_simple_statechart(self, simple_statechart):
@@ -2,8 +2,8 @@ import pytest
 
 from time import sleep
 
-from sismic.runner import AsyncRunner
-from sismic.interpreter import Interpreter
+from sismic.runner import AsyncRunner, Metrics
+from sismic.interpreter import Interpreter, QueuePolicy
 
 
 class TestAsyncRunner:
@@ -143,3 +143,101 @@ class TestAsyncRunner:
         runner.start()
         runner.stop()
         runner.wait()
+
+
+class TestMetrics:
+    @pytest.fixture()
+    def interpreter(self, simple_statechart):
+        return Interpreter(simple_statechart)
+
+    @pytest.fixture()
+    def metrics(self, interpreter):
+        return Metrics(interpreter)
+
+    def test_interpreter_metrics(self, interpreter, metrics):
+        interpreter.attach(lambda event: sleep(0.001))
+        interpreter.queue('goto s2', 'goto final')
+        assert metrics.snapshot()['external_queue_depth'] == 2
+
+        steps = interpreter.execute()
+        snapshot = metrics.snapshot()
+        assert snapshot['steps_total'] == len(steps)
+        assert snapshot['events_consumed_total'] == 2
+        assert snapshot['event_latency_seconds_count'] == 2
+        assert 0 < snapshot['event_latency_max_seconds'] <= snapshot['event_latency_seconds_sum']
+        assert snapshot['external_queue_depth'] == 0
+        assert snapshot['listener_seconds_total'] > 0
+        assert snapshot['steps_per_second'] > 0
+
+        metrics.reset()
+        snapshot = metrics.snapshot()
+        assert snapshot['steps_total'] == snapshot['events_consumed_total'] == 0
+
+    def test_threadsafe_metrics(self, interpreter, metrics):
+        interpreter.queue_threadsafe('goto s2', 'goto final')
+        snapshot = metrics.snapshot()
+        assert snapshot['inbound_queue_depth'] == 2
+        assert snapshot['external_queue_depth'] == 0
+
+        sleep(0.01)  # Time spent in the inbound buffer is part of the latency
+        interpreter.execute()
+        snapshot = metrics.snapshot()
+        assert snapshot['inbound_queue_depth'] == 0
+        assert snapshot['event_latency_seconds_count'] == 2
+        assert snapshot['event_latency_seconds_sum'] >= 0.02
+        assert not metrics._buffered
+
+    def test_queue_policy_metrics(self, simple_statechart):
+        policy = QueuePolicy(max_size=1, overflow='drop-newest', coalesce='latest')
+        interpreter = Interpreter(simple_statechart, queue_policy=policy)
+        metrics = Metrics(interpreter)
+        interpreter.queue('e1', 'e1', 'e2', 'e3')
+
+        snapshot = metrics.snapshot()
+        assert snapshot['events_coalesced_total'] == 1
+        assert snapshot['events_dropped_total'] == 2
+
+    def test_detach(self, interpreter, metrics):
+        metrics.detach()
+        assert 'execute_once' not in vars(interpreter)
+        assert '_queue_event' not in vars(interpreter)
+        interpreter.execute()
+        assert metrics.snapshot()['steps_total'] == 0
+
+        metrics.observe(interpreter)
+        with pytest.raises(ValueError):
+            metrics.observe(interpreter)
+
+    def test_runner_metrics(self, interpreter):
+        runner = AsyncRunner(interpreter, interval=0, metrics=Metrics())
+        runner.start()
+        sleep(0.02)
+        runner.stop()
+
+        snapshot = runner.metrics.snapshot()
+        assert snapshot['steps_total'] == 1
+        assert snapshot['cycles_total'] > 0
+        assert snapshot['interval_overruns_total'] <= snapshot['cycles_total']
+
+        runner.metrics.reset()
+        runner.metrics.record_cycle(0.2, 0.1)
+        runner.metrics.record_cycle(0.05, 0.1)
+        snapshot = runner.metrics.snapshot()
+        assert (snapshot['cycles_total'], snapshot['interval_overruns_total']) == (2, 1)
+
+    def test_prometheus_export(self, interpreter, metrics, tmpdir):
+        interpreter.queue('goto s2').execute()
+        filepath = str(tmpdir.join('sismic.prom'))
+        text = metrics.export_prometheus(filepath)
+
+        with open(filepath) as f:
+            assert f.read() == text
+
+        lines = text.splitlines()
+        assert '# TYPE sismic_steps_total counter' in lines
+        assert 'sismic_steps_total{statechart="simple statechart"} 3' in lines
+        assert '# TYPE sismic_event_latency_seconds summary' in lines
+        assert 'sismic_event_latency_seconds_count{statechart="simple statechart"} 1' in lines
+
+        text = metrics.export_prometheus(prefix='app', labels={'name': 'a "quoted"\nvalue'})
+        assert 'app_events_consumed_total{name="a \\"quoted\\"\\nvalue"} 1' in text.splitlines()